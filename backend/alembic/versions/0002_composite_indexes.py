@@ -0,0 +1,87 @@
+"""Composite indexes for the list and report queries
+
+The ledger is read newest first filtered by product, location or type, so
+each of those gets a ``(column, created_at)`` index in place of its single
+column one; inventory lists get ``last_updated`` ordered indexes and the
+low-stock alerts a partial index over the rows at or below their reorder
+level. Product lists filtered by category or supplier are ordered by name.
+
+On PostgreSQL the indexes are built and dropped ``CONCURRENTLY``, so writes
+to the tables carry on while this runs. Indexes that already exist or are
+already gone are skipped: databases adopted from ``create_all`` may have
+tables created at a later schema. An index left invalid by a concurrent
+build that failed is built again when the revision is retried.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 09:38:03.858409
+
+"""
+from contextlib import nullcontext
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.migrations import create_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LOW_STOCK = sa.text('quantity <= reorder_level')
+
+
+def _concurrently():
+    """Outside a transaction on PostgreSQL, where CONCURRENTLY requires it."""
+    if op.get_bind().dialect.name == "postgresql":
+        return op.get_context().autocommit_block()
+    return nullcontext()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with _concurrently():
+        # New indexes first, so queries are never left without one
+        create_index_concurrently('ix_transactions_product_created', 'transactions', ['product_id', 'created_at'])
+        create_index_concurrently('ix_transactions_location_created', 'transactions', ['location_id', 'created_at'])
+        create_index_concurrently('ix_transactions_type_created', 'transactions', ['type', 'created_at'])
+        create_index_concurrently('ix_inventory_last_updated', 'inventory', ['last_updated'])
+        create_index_concurrently('ix_inventory_location_updated', 'inventory', ['location_id', 'last_updated'])
+        create_index_concurrently('ix_inventory_low_stock', 'inventory', ['quantity'], postgresql_where=LOW_STOCK, sqlite_where=LOW_STOCK)
+        create_index_concurrently('ix_products_category_name', 'products', ['category_id', 'name'])
+        create_index_concurrently('ix_products_supplier_name', 'products', ['supplier_id', 'name'])
+        create_index_concurrently('ix_jobs_status_type', 'jobs', ['status', 'type'])
+
+        # Leading columns of the indexes above; uq_product_location covers inventory.product_id
+        op.drop_index('ix_transactions_product_id', table_name='transactions', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_transactions_location_id', table_name='transactions', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_transactions_type', table_name='transactions', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_inventory_location_id', table_name='inventory', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_inventory_product_id', table_name='inventory', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_jobs_status', table_name='jobs', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_jobs_type', table_name='jobs', postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_jobs_type', 'jobs', ['type'])
+    op.create_index('ix_jobs_status', 'jobs', ['status'])
+    op.create_index('ix_inventory_product_id', 'inventory', ['product_id'])
+    op.create_index('ix_inventory_location_id', 'inventory', ['location_id'])
+    op.create_index('ix_transactions_type', 'transactions', ['type'])
+    op.create_index('ix_transactions_location_id', 'transactions', ['location_id'])
+    op.create_index('ix_transactions_product_id', 'transactions', ['product_id'])
+
+    op.drop_index('ix_jobs_status_type', table_name='jobs')
+    op.drop_index('ix_products_supplier_name', table_name='products')
+    op.drop_index('ix_products_category_name', table_name='products')
+    op.drop_index('ix_inventory_low_stock', table_name='inventory')
+    op.drop_index('ix_inventory_location_updated', table_name='inventory')
+    op.drop_index('ix_inventory_last_updated', table_name='inventory')
+    op.drop_index('ix_transactions_type_created', table_name='transactions')
+    op.drop_index('ix_transactions_location_created', table_name='transactions')
+    op.drop_index('ix_transactions_product_created', table_name='transactions')
@@ -0,0 +1,62 @@
+"""Change log versions assigned in commit order
+
+``change_log.version`` is the number the delta-sync feed pages by. Existing
+rows keep their ``seq`` as their version, so clients carry on from the
+version they last saw. Later rows get theirs once committed: right away on
+SQLite, from the change sequencer on PostgreSQL. A ``change_log`` created by
+``create_all`` on adoption already has the column and indexes.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 16:12:40.512377
+
+"""
+from contextlib import nullcontext
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.migrations import create_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+UNSEQUENCED = sa.text('version IS NULL')
+
+
+def _concurrently():
+    """Outside a transaction on PostgreSQL, where CONCURRENTLY requires it."""
+    if op.get_bind().dialect.name == "postgresql":
+        return op.get_context().autocommit_block()
+    return nullcontext()
+
+
+def _has_column(table: str, column: str) -> bool:
+    if op.get_context().as_sql:
+        return False
+    return column in {c['name'] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not _has_column('change_log', 'version'):
+        op.add_column('change_log', sa.Column('version', sa.BigInteger(), nullable=True))
+    op.execute('UPDATE change_log SET version = seq')
+
+    with _concurrently():
+        create_index_concurrently('ix_change_log_version', 'change_log', ['version'], unique=True)
+        create_index_concurrently('ix_change_log_unsequenced', 'change_log', ['seq'], postgresql_where=UNSEQUENCED, sqlite_where=UNSEQUENCED)
+        create_index_concurrently('ix_change_log_entity', 'change_log', ['entity', 'entity_id', 'version'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_change_log_entity', table_name='change_log')
+    op.drop_index('ix_change_log_unsequenced', table_name='change_log')
+    op.drop_index('ix_change_log_version', table_name='change_log')
+    op.drop_column('change_log', 'version')
@@ -0,0 +1,40 @@
+"""Job attempts
+
+``jobs.attempts`` counts the times a job was claimed by a worker, so a job
+whose worker keeps dying is failed after ``JOB_MAX_ATTEMPTS`` instead of
+being queued again forever. Jobs already recorded start at 0. A ``jobs``
+table created by ``create_all`` on adoption already has the column.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 18:04:51.207316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_column(table: str, column: str) -> bool:
+    if op.get_context().as_sql:
+        return False
+    return column in {c['name'] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not _has_column('jobs', 'attempts'):
+        op.add_column('jobs', sa.Column('attempts', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('jobs', 'attempts')
@@ -0,0 +1,41 @@
+"""Job result node
+
+``jobs.result_node`` names the host that wrote a job's result file, so a
+worker asked for a result it cannot find can tell a result that expired from
+one written to a ``JOB_RESULTS_DIR`` it does not share. Results already
+recorded have none. A ``jobs`` table created by ``create_all`` on adoption
+already has the column.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 21:12:37.640512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_column(table: str, column: str) -> bool:
+    if op.get_context().as_sql:
+        return False
+    return column in {c['name'] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not _has_column('jobs', 'result_node'):
+        op.add_column('jobs', sa.Column('result_node', sa.String(length=255), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('jobs', 'result_node')
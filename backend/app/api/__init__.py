@@ -8,6 +8,11 @@ from app.api.routes import (
     locations_router,
     inventory_router,
     transactions_router,
+    system_router,
+    sync_router,
+    catalog_router,
+    scanner_router,
+    jobs_router,
 )
 
 __all__ = [
@@ -21,4 +26,9 @@ __all__ = [
     "locations_router",
     "inventory_router",
     "transactions_router",
+    "system_router",
+    "sync_router",
+    "catalog_router",
+    "scanner_router",
+    "jobs_router",
 ]
@@ -1,23 +1,25 @@
 from typing import Annotated
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy import select
 
-from app.core.database import get_db
+from app.core.database import read_session_maker
 from app.core.security import decode_token
+from app.core.tracing import traced
 from app.models.user import User, UserRole
 
 
 security = HTTPBearer()
 
 
-async def get_current_user(
-    credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)],
-    db: Annotated[AsyncSession, Depends(get_db)]
-) -> User:
-    """Get current authenticated user from JWT token."""
-    token = credentials.credentials
+async def user_for_token(token: str, session_maker: async_sessionmaker) -> User:
+    """Resolve an access token to its active user.
+    
+    The user is loaded in a session of its own, closed before returning, so
+    a request never holds a connection for authentication next to the one
+    its handler uses.
+    """
     payload = decode_token(token)
     
     if payload is None:
@@ -42,8 +44,9 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    result = await db.execute(select(User).where(User.id == int(user_id)))
-    user = result.scalar_one_or_none()
+    async with session_maker() as db:
+        result = await db.execute(select(User).where(User.id == int(user_id)))
+        user = result.scalar_one_or_none()
     
     if user is None:
         raise HTTPException(
@@ -61,6 +64,15 @@ async def get_current_user(
     return user
 
 
+@traced()
+async def get_current_user(
+    request: Request,
+    credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)],
+) -> User:
+    """Get current authenticated user from JWT token."""
+    return await user_for_token(credentials.credentials, read_session_maker(request))
+
+
 async def get_current_active_user(
     current_user: Annotated[User, Depends(get_current_user)]
 ) -> User:
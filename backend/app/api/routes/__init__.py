@@ -6,6 +6,11 @@ from app.api.routes.products import router as products_router
 from app.api.routes.locations import router as locations_router
 from app.api.routes.inventory import router as inventory_router
 from app.api.routes.transactions import router as transactions_router
+from app.api.routes.system import router as system_router
+from app.api.routes.sync import router as sync_router
+from app.api.routes.catalog import router as catalog_router
+from app.api.routes.scanner import router as scanner_router
+from app.api.routes.jobs import router as jobs_router
 
 __all__ = [
     "auth_router",
@@ -15,4 +20,9 @@ __all__ = [
     "locations_router",
     "inventory_router",
     "transactions_router",
+    "system_router",
+    "sync_router",
+    "catalog_router",
+    "scanner_router",
+    "jobs_router",
 ]
@@ -0,0 +1,61 @@
+from typing import Annotated
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_read_db
+from app.core.snapshot import snapshot_store
+from app.api.deps import CurrentUser
+
+
+router = APIRouter(prefix="/catalog", tags=["Catalog"])
+
+
+@router.get("/snapshot", response_class=FileResponse)
+async def get_catalog_snapshot(
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    current_user: CurrentUser,
+):
+    """Download the latest offline catalog snapshot.
+
+    The ``X-Catalog-Version`` header carries the snapshot version; send it
+    back as ``If-None-Match`` to get 304 while the snapshot is current.
+    """
+    version = await snapshot_store.latest(db)
+    headers = {"ETag": f'"{version}"', "X-Catalog-Version": str(version)}
+    if request.headers.get("if-none-match") in (headers["ETag"], str(version)):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return FileResponse(
+        snapshot_store.path(version),
+        media_type="application/octet-stream",
+        filename=f"catalog-{version}.smcs",
+        headers=headers,
+    )
+
+
+@router.get("/snapshot/diff", response_class=FileResponse)
+async def get_catalog_snapshot_diff(
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    current_user: CurrentUser,
+    from_version: int = Query(..., ge=0, description="Version of the snapshot the client has"),
+):
+    """Download a binary diff from a snapshot version to the latest one."""
+    version = await snapshot_store.latest(db)
+    if from_version == version:
+        return Response(status_code=status.HTTP_204_NO_CONTENT, headers={"X-Catalog-Version": str(version)})
+
+    path = await snapshot_store.diff(from_version, version)
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Snapshot version is no longer kept, download the full snapshot"
+        )
+
+    return FileResponse(
+        path,
+        media_type="application/octet-stream",
+        filename=path.name,
+        headers={"X-Catalog-Version": str(version)},
+    )
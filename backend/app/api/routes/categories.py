@@ -1,9 +1,13 @@
 from typing import Annotated, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 
-from app.core.database import get_db
+from app.core.cache import request_cache_key, response_cache
+from app.core.conditional import collection_validators, not_modified
+from app.core.database import get_db, get_read_db, reads_primary
+from app.core.events import invalidation_bus
+from app.core.refdata import reference_data
 from app.models.category import Category
 from app.schemas.category import (
     CategoryCreate, CategoryUpdate, CategoryResponse, CategoryListResponse
@@ -16,56 +20,79 @@ router = APIRouter(prefix="/categories", tags=["Categories"])
 
 @router.get("", response_model=CategoryListResponse)
 async def get_categories(
-    db: Annotated[AsyncSession, Depends(get_db)],
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_read_db)],
     current_user: CurrentUser,
     parent_id: Optional[int] = Query(None, description="Filter by parent category"),
 ):
     """Get all categories."""
-    query = select(Category)
-    if parent_id is not None:
-        query = query.where(Category.parent_id == parent_id)
-    else:
-        query = query.where(Category.parent_id.is_(None))  # Root categories
-    
-    result = await db.execute(query.order_by(Category.name))
-    categories = result.scalars().all()
-    
-    # Get total count
-    count_result = await db.execute(select(func.count(Category.id)))
-    total = count_result.scalar()
+    async def load():
+        query = select(Category)
+        if parent_id is not None:
+            query = query.where(Category.parent_id == parent_id)
+        else:
+            query = query.where(Category.parent_id.is_(None))  # Root categories
+        
+        result = await db.execute(query.order_by(Category.name))
+        categories = result.scalars().all()
+        
+        # Get total count
+        count_result = await db.execute(select(func.count(Category.id)))
+        total = count_result.scalar()
+        
+        return CategoryListResponse(items=list(categories), total=total)
     
-    return CategoryListResponse(items=list(categories), total=total)
+    return await response_cache.response(
+        request_cache_key(request), ("categories",), load, store=reads_primary(db)
+    )
 
 
 @router.get("/all", response_model=CategoryListResponse)
 async def get_all_categories(
-    db: Annotated[AsyncSession, Depends(get_db)],
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_read_db)],
     current_user: CurrentUser,
 ):
     """Get all categories (flat list)."""
-    result = await db.execute(select(Category).order_by(Category.name))
-    categories = result.scalars().all()
+    validators = await collection_validators(request, db, "categories")
+    unchanged = not_modified(request, validators)
+    if unchanged is not None:
+        return unchanged
+    
+    async def load():
+        result = await db.execute(select(Category).order_by(Category.name))
+        categories = result.scalars().all()
+        
+        return CategoryListResponse(items=list(categories), total=len(categories))
     
-    return CategoryListResponse(items=list(categories), total=len(categories))
+    return await response_cache.response(
+        request_cache_key(request), ("categories",), load, headers=validators, store=reads_primary(db)
+    )
 
 
 @router.get("/{category_id}", response_model=CategoryResponse)
 async def get_category(
     category_id: int,
-    db: Annotated[AsyncSession, Depends(get_db)],
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_read_db)],
     current_user: CurrentUser,
 ):
     """Get a specific category by ID."""
-    result = await db.execute(select(Category).where(Category.id == category_id))
-    category = result.scalar_one_or_none()
-    
-    if not category:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Category not found"
-        )
+    async def load():
+        result = await db.execute(select(Category).where(Category.id == category_id))
+        category = result.scalar_one_or_none()
+        
+        if not category:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Category not found"
+            )
+        
+        return CategoryResponse.model_validate(category)
     
-    return category
+    return await response_cache.response(
+        request_cache_key(request), (f"category:{category_id}",), load, store=reads_primary(db)
+    )
 
 
 @router.post("", response_model=CategoryResponse, status_code=status.HTTP_201_CREATED)
@@ -77,10 +104,7 @@ async def create_category(
     """Create a new category (Manager/Admin only)."""
     # Validate parent exists if provided
     if category_data.parent_id:
-        result = await db.execute(
-            select(Category).where(Category.id == category_data.parent_id)
-        )
-        if not result.scalar_one_or_none():
+        if not await reference_data.categories.get(category_data.parent_id):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Parent category not found"
@@ -88,7 +112,7 @@ async def create_category(
     
     category = Category(**category_data.model_dump())
     db.add(category)
-    await db.commit()
+    await invalidation_bus.commit(db, "categories")
     await db.refresh(category)
     
     return category
@@ -117,12 +141,17 @@ async def update_category(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Category cannot be its own parent"
         )
+    if category_data.parent_id and not await reference_data.categories.get(category_data.parent_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Parent category not found"
+        )
     
     update_data = category_data.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(category, field, value)
     
-    await db.commit()
+    await invalidation_bus.commit(db, "categories", f"category:{category_id}", "products")
     await db.refresh(category)
     
     return category
@@ -144,5 +173,11 @@ async def delete_category(
             detail="Category not found"
         )
     
+    # Children lose their parent when the category goes away
+    children_result = await db.execute(
+        select(Category.id).where(Category.parent_id == category_id)
+    )
+    child_tags = [f"category:{child_id}" for child_id in children_result.scalars().all()]
+    
     await db.delete(category)
-    await db.commit()
+    await invalidation_bus.commit(db, "categories", f"category:{category_id}", "products", *child_tags)
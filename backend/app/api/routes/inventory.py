@@ -1,10 +1,19 @@
 from typing import Annotated, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import Boolean, select, func, type_coerce
 from sqlalchemy.orm import selectinload
 
-from app.core.database import get_db
+from app.core.broker import stock_broker
+from app.core.coalesce import coalesce_requests
+from app.core.config import settings
+from app.core.database import async_read_session_maker, get_db, get_read_db
+from app.core.events import inventory_tags, invalidation_bus
+from app.core.exports import EXPORT_FORMATS, CsvColumns, export_chunks, export_filename
+from app.core.jobs import JobContext, job_engine
+from app.core.refdata import reference_data
+from app.core.responses import FastJSONResponse, Projection, row_dicts
 from app.models.inventory import Inventory
 from app.models.product import Product
 from app.models.location import Location
@@ -12,75 +21,85 @@ from app.schemas.inventory import (
     InventoryCreate, InventoryUpdate, InventoryResponse, 
     InventoryListResponse, LowStockAlert, LowStockAlertList
 )
+from app.schemas.job import InventoryReportJobParams
 from app.api.deps import CurrentUser, ManagerUser
 
 
 router = APIRouter(prefix="/inventory", tags=["Inventory"])
 
 
+# Columns of InventoryResponse, so list pages serialize rows without building models
+INVENTORY_PROJECTION = Projection(InventoryResponse, Inventory, columns={
+    "product_id": Inventory.product_id,
+    "location_id": Inventory.location_id,
+    "quantity": Inventory.quantity,
+    "reorder_level": Inventory.reorder_level,
+    "reorder_quantity": Inventory.reorder_quantity,
+    "id": Inventory.id,
+    "last_updated": Inventory.last_updated,
+    "product_name": Product.name,
+    "product_sku": Product.sku,
+    "location_name": Location.name,
+    "is_low_stock": type_coerce(Inventory.quantity <= Inventory.reorder_level, Boolean),
+}, joins={
+    "product_name": (Product, Inventory.product_id == Product.id),
+    "product_sku": (Product, Inventory.product_id == Product.id),
+    "location_name": (Location, Inventory.location_id == Location.id),
+})
+
+
 @router.get("", response_model=InventoryListResponse)
 async def get_inventory(
-    db: Annotated[AsyncSession, Depends(get_db)],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
     current_user: CurrentUser,
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
     product_id: Optional[int] = None,
     location_id: Optional[int] = None,
     low_stock_only: bool = False,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,sku,name"),
 ):
     """Get inventory items with pagination and filtering."""
-    query = select(Inventory).options(
-        selectinload(Inventory.product),
-        selectinload(Inventory.location)
-    )
-    
+    selected = INVENTORY_PROJECTION.parse_fields(fields)
+    conditions = []
     if product_id:
-        query = query.where(Inventory.product_id == product_id)
+        conditions.append(Inventory.product_id == product_id)
     if location_id:
-        query = query.where(Inventory.location_id == location_id)
+        conditions.append(Inventory.location_id == location_id)
     if low_stock_only:
-        query = query.where(Inventory.quantity <= Inventory.reorder_level)
+        conditions.append(Inventory.quantity <= Inventory.reorder_level)
     
-    count_query = select(func.count()).select_from(query.subquery())
+    count_query = select(func.count(Inventory.id)).where(*conditions)
     total = (await db.execute(count_query)).scalar()
     
-    query = query.order_by(Inventory.last_updated.desc())
+    query = INVENTORY_PROJECTION.select(selected).where(*conditions).order_by(Inventory.last_updated.desc())
     query = query.offset((page - 1) * size).limit(size)
     
     result = await db.execute(query)
-    items = [
-        InventoryResponse(
-            id=inv.id, product_id=inv.product_id, location_id=inv.location_id,
-            quantity=inv.quantity, reorder_level=inv.reorder_level,
-            reorder_quantity=inv.reorder_quantity, last_updated=inv.last_updated,
-            product_name=inv.product.name if inv.product else None,
-            product_sku=inv.product.sku if inv.product else None,
-            location_name=inv.location.name if inv.location else None,
-            is_low_stock=inv.quantity <= inv.reorder_level
-        ) for inv in result.scalars().all()
-    ]
-    
-    return InventoryListResponse(items=items, total=total, page=page, size=size)
+    return FastJSONResponse({"items": row_dicts(result), "total": total, "page": page, "size": size})
 
 
 @router.get("/low-stock", response_model=LowStockAlertList)
+@coalesce_requests
 async def get_low_stock_alerts(
-    db: Annotated[AsyncSession, Depends(get_db)],
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_read_db)],
     current_user: CurrentUser,
 ):
     """Get all low stock alerts."""
     query = select(Inventory).options(
-        selectinload(Inventory.product), selectinload(Inventory.location)
+        selectinload(Inventory.product)
     ).where(Inventory.quantity <= Inventory.reorder_level)
     
     result = await db.execute(query.order_by(Inventory.quantity))
+    location_names = await reference_data.locations.rows()
     alerts = [
         LowStockAlert(
             product_id=inv.product_id,
             product_name=inv.product.name if inv.product else "Unknown",
             product_sku=inv.product.sku if inv.product else "Unknown",
             location_id=inv.location_id,
-            location_name=inv.location.name if inv.location else "Unknown",
+            location_name=location_names.get(inv.location_id, "Unknown"),
             current_quantity=inv.quantity,
             reorder_level=inv.reorder_level,
             reorder_quantity=inv.reorder_quantity
@@ -89,6 +108,32 @@ async def get_low_stock_alerts(
     return LowStockAlertList(items=alerts, total=len(alerts))
 
 
+@router.get("/stream", response_class=StreamingResponse)
+async def stream_inventory(
+    request: Request,
+    current_user: CurrentUser,
+    location_id: Annotated[Optional[list[int]], Query(description="Only these locations")] = None,
+    product_id: Annotated[Optional[list[int]], Query(description="Only these products")] = None,
+):
+    """Stream stock level changes as server-sent events.
+    
+    Each ``stock`` event carries the new level of one inventory row. A
+    ``resync`` event means updates were missed and current levels should be
+    reloaded. Reconnecting with ``Last-Event-ID`` resumes where the stream left off.
+    """
+    events = stock_broker.server_sent_events(
+        location_id,
+        product_id,
+        request.headers.get("last-event-id") or None,
+        settings.STREAM_KEEPALIVE_SECONDS,
+    )
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("", response_model=InventoryResponse, status_code=status.HTTP_201_CREATED)
 async def create_inventory(
     data: InventoryCreate,
@@ -100,7 +145,7 @@ async def create_inventory(
     if not product:
         raise HTTPException(status_code=400, detail="Product not found")
     
-    location = (await db.execute(select(Location).where(Location.id == data.location_id))).scalar_one_or_none()
+    location = await reference_data.locations.get(data.location_id)
     if not location:
         raise HTTPException(status_code=400, detail="Location not found")
     
@@ -114,8 +159,9 @@ async def create_inventory(
     
     inventory = Inventory(**data.model_dump())
     db.add(inventory)
-    await db.commit()
+    await invalidation_bus.commit(db, *inventory_tags(inventory.location_id))
     await db.refresh(inventory)
+    stock_broker.publish_stock(inventory)
     
     return InventoryResponse(
         id=inventory.id, product_id=inventory.product_id, location_id=inventory.location_id,
@@ -135,7 +181,7 @@ async def update_inventory(
 ):
     """Update an inventory record."""
     result = await db.execute(
-        select(Inventory).options(selectinload(Inventory.product), selectinload(Inventory.location))
+        select(Inventory).options(selectinload(Inventory.product))
         .where(Inventory.id == inventory_id)
     )
     inventory = result.scalar_one_or_none()
@@ -145,8 +191,9 @@ async def update_inventory(
     for field, value in data.model_dump(exclude_unset=True).items():
         setattr(inventory, field, value)
     
-    await db.commit()
+    await invalidation_bus.commit(db, *inventory_tags(inventory.location_id))
     await db.refresh(inventory)
+    stock_broker.publish_stock(inventory)
     
     return InventoryResponse(
         id=inventory.id, product_id=inventory.product_id, location_id=inventory.location_id,
@@ -154,6 +201,39 @@ async def update_inventory(
         reorder_quantity=inventory.reorder_quantity, last_updated=inventory.last_updated,
         product_name=inventory.product.name if inventory.product else None,
         product_sku=inventory.product.sku if inventory.product else None,
-        location_name=inventory.location.name if inventory.location else None,
+        location_name=await reference_data.locations.name(inventory.location_id),
         is_low_stock=inventory.quantity <= inventory.reorder_level
     )
+
+
+# Spreadsheet columns of the stock report
+INVENTORY_REPORT_CSV = CsvColumns(
+    ['SKU', 'Product', 'Location', 'Quantity', 'Reorder Level', 'Reorder Quantity', 'Low Stock'],
+    lambda i: [
+        i.product_sku or '',
+        i.product_name or '',
+        i.location_name or '',
+        i.quantity,
+        i.reorder_level,
+        i.reorder_quantity,
+        'yes' if i.is_low_stock else 'no'
+    ],
+)
+
+
+@job_engine.job("inventory_report", InventoryReportJobParams)
+async def run_inventory_report(job: JobContext):
+    """Background job writing stock levels per product and location to a file."""
+    export_format = EXPORT_FORMATS[job.params.format]
+    conditions = []
+    if job.params.location_id:
+        conditions.append(Inventory.location_id == job.params.location_id)
+    if job.params.low_stock_only:
+        conditions.append(Inventory.quantity <= Inventory.reorder_level)
+    
+    async with async_read_session_maker() as db:
+        job.total = (await db.execute(select(func.count(Inventory.id)).where(*conditions))).scalar()
+        job.media_type = export_format
+        job.filename = export_filename("inventory", export_format)
+        query = INVENTORY_PROJECTION.select().where(*conditions).order_by(Location.name, Product.name)
+        await job.write(export_chunks(db, query, export_format, INVENTORY_REPORT_CSV, job.advance))
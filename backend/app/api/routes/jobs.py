@@ -0,0 +1,120 @@
+from typing import Annotated, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+
+from app.core.database import get_db
+from app.core.jobs import job_engine
+from app.models.job import Job, JobStatus
+from app.models.user import User, UserRole
+from app.schemas.job import JobCreate, JobResponse, JobListResponse
+from app.api.deps import CurrentUser
+
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+def _job_response(job: Job) -> JobResponse:
+    response = JobResponse.model_validate(job)
+    if job.status == JobStatus.SUCCEEDED:
+        response.progress = 1.0
+    elif job.total:
+        response.progress = min(job.processed / job.total, 1.0)
+    return response
+
+
+async def _get_job(db: AsyncSession, job_id: int, user: User) -> Job:
+    """Load a job of the user, any job for admins."""
+    job = await db.get(Job, job_id)
+    if not job or (job.user_id != user.id and user.role != UserRole.ADMIN):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    return job
+
+
+@router.post("", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(
+    data: JobCreate,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: CurrentUser,
+):
+    """Submit a background job: ``products_export``, ``transactions_export`` or ``inventory_report``.
+    
+    Poll the job until it has succeeded, then download ``/jobs/{id}/result``.
+    """
+    job = await job_engine.submit(db, data.type, data.params, current_user.id)
+    return _job_response(job)
+
+
+@router.get("", response_model=JobListResponse)
+async def get_jobs(
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: CurrentUser,
+    page: int = Query(1, ge=1),
+    size: int = Query(20, ge=1, le=100),
+    job_status: Optional[JobStatus] = Query(None, alias="status"),
+):
+    """Get the current user's jobs, newest first."""
+    conditions = [Job.user_id == current_user.id]
+    if job_status:
+        conditions.append(Job.status == job_status)
+    
+    total = (await db.execute(select(func.count(Job.id)).where(*conditions))).scalar()
+    
+    query = select(Job).where(*conditions).order_by(Job.id.desc())
+    query = query.offset((page - 1) * size).limit(size)
+    result = await db.execute(query)
+    
+    return JobListResponse(
+        items=[_job_response(job) for job in result.scalars().all()],
+        total=total,
+        page=page,
+        size=size
+    )
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: int,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: CurrentUser,
+):
+    """Get a job with its progress."""
+    return _job_response(await _get_job(db, job_id, current_user))
+
+
+@router.get("/{job_id}/result", response_class=FileResponse)
+async def download_job_result(
+    job_id: int,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: CurrentUser,
+):
+    """Download the result file of a succeeded job."""
+    job = await _get_job(db, job_id, current_user)
+    path = job_engine.result_path(job)
+    if job.status == JobStatus.EXPIRED or (job.status == JobStatus.SUCCEEDED and not path.exists()):
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Job result has expired, submit the job again"
+        )
+    if job.status != JobStatus.SUCCEEDED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job is {job.status.value}, no result to download"
+        )
+    
+    return FileResponse(path, media_type=job.media_type, filename=job.filename)
+
+
+@router.post("/{job_id}/cancel", response_model=JobResponse)
+async def cancel_job(
+    job_id: int,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: CurrentUser,
+):
+    """Cancel a queued or running job."""
+    job = await _get_job(db, job_id, current_user)
+    return _job_response(await job_engine.cancel(db, job))
@@ -1,9 +1,13 @@
 from typing import Annotated, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 
-from app.core.database import get_db
+from app.core.cache import request_cache_key, response_cache
+from app.core.conditional import collection_validators, not_modified
+from app.core.database import get_db, get_read_db, reads_primary
+from app.core.events import invalidation_bus
+from app.core.responses import Projection
 from app.models.location import Location
 from app.models.inventory import Inventory
 from app.schemas.location import (
@@ -15,24 +19,108 @@ from app.api.deps import CurrentUser, ManagerUser
 router = APIRouter(prefix="/locations", tags=["Locations"])
 
 
+# Columns of LocationResponse, so synced rows serialize without building models
+LOCATION_PROJECTION = Projection(LocationResponse, Location, columns={
+    "name": Location.name,
+    "type": Location.type,
+    "address": Location.address,
+    "phone": Location.phone,
+    "id": Location.id,
+    "is_active": Location.is_active,
+    "created_at": Location.created_at,
+    "updated_at": Location.updated_at,
+    "products_count": (
+        select(func.count(Inventory.id))
+        .where(Inventory.location_id == Location.id)
+        .correlate(Location)
+        .scalar_subquery()
+    ),
+    "total_items": (
+        select(func.coalesce(func.sum(Inventory.quantity), 0))
+        .where(Inventory.location_id == Location.id)
+        .correlate(Location)
+        .scalar_subquery()
+    ),
+})
+
+
 @router.get("", response_model=LocationListResponse)
 async def get_locations(
-    db: Annotated[AsyncSession, Depends(get_db)],
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_read_db)],
     current_user: CurrentUser,
     is_active: Optional[bool] = None,
 ):
     """Get all locations."""
-    query = select(Location)
-    
-    if is_active is not None:
-        query = query.where(Location.is_active == is_active)
-    
-    result = await db.execute(query.order_by(Location.name))
-    locations = result.scalars().all()
+    validators = await collection_validators(request, db, "locations", "inventory")
+    unchanged = not_modified(request, validators)
+    if unchanged is not None:
+        return unchanged
+    
+    async def load():
+        # Inventory stats for every location in one grouped aggregate
+        stats = (
+            select(
+                Inventory.location_id,
+                func.count(Inventory.id).label("products_count"),
+                func.sum(Inventory.quantity).label("total_items")
+            )
+            .group_by(Inventory.location_id)
+            .subquery()
+        )
+        query = select(
+            Location,
+            func.coalesce(stats.c.products_count, 0),
+            func.coalesce(stats.c.total_items, 0)
+        ).outerjoin(stats, stats.c.location_id == Location.id)
+        
+        if is_active is not None:
+            query = query.where(Location.is_active == is_active)
+        
+        result = await db.execute(query.order_by(Location.name))
+        
+        # Build response with counts
+        items = []
+        for location, products_count, total_items in result.all():
+            item = LocationResponse(
+                id=location.id,
+                name=location.name,
+                type=location.type,
+                address=location.address,
+                phone=location.phone,
+                is_active=location.is_active,
+                created_at=location.created_at,
+                updated_at=location.updated_at,
+                products_count=products_count,
+                total_items=total_items
+            )
+            items.append(item)
+        
+        return LocationListResponse(items=items, total=len(items))
     
-    # Build response with counts
-    items = []
-    for location in locations:
+    return await response_cache.response(
+        request_cache_key(request), ("locations", "inventory"), load, headers=validators, store=reads_primary(db)
+    )
+
+
+@router.get("/{location_id}", response_model=LocationResponse)
+async def get_location(
+    location_id: int,
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    current_user: CurrentUser,
+):
+    """Get a specific location by ID."""
+    async def load():
+        result = await db.execute(select(Location).where(Location.id == location_id))
+        location = result.scalar_one_or_none()
+        
+        if not location:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Location not found"
+            )
+        
         # Get inventory stats
         inv_result = await db.execute(
             select(
@@ -42,7 +130,7 @@ async def get_locations(
         )
         products_count, total_items = inv_result.one()
         
-        item = LocationResponse(
+        return LocationResponse(
             id=location.id,
             name=location.name,
             type=location.type,
@@ -54,47 +142,12 @@ async def get_locations(
             products_count=products_count,
             total_items=total_items
         )
-        items.append(item)
-    
-    return LocationListResponse(items=items, total=len(items))
-
-
-@router.get("/{location_id}", response_model=LocationResponse)
-async def get_location(
-    location_id: int,
-    db: Annotated[AsyncSession, Depends(get_db)],
-    current_user: CurrentUser,
-):
-    """Get a specific location by ID."""
-    result = await db.execute(select(Location).where(Location.id == location_id))
-    location = result.scalar_one_or_none()
-    
-    if not location:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Location not found"
-        )
-    
-    # Get inventory stats
-    inv_result = await db.execute(
-        select(
-            func.count(Inventory.id),
-            func.coalesce(func.sum(Inventory.quantity), 0)
-        ).where(Inventory.location_id == location.id)
-    )
-    products_count, total_items = inv_result.one()
     
-    return LocationResponse(
-        id=location.id,
-        name=location.name,
-        type=location.type,
-        address=location.address,
-        phone=location.phone,
-        is_active=location.is_active,
-        created_at=location.created_at,
-        updated_at=location.updated_at,
-        products_count=products_count,
-        total_items=total_items
+    return await response_cache.response(
+        request_cache_key(request),
+        (f"location:{location_id}", f"inventory:location:{location_id}"),
+        load,
+        store=reads_primary(db),
     )
 
 
@@ -107,7 +160,7 @@ async def create_location(
     """Create a new location (Manager/Admin only)."""
     location = Location(**location_data.model_dump())
     db.add(location)
-    await db.commit()
+    await invalidation_bus.commit(db, "locations")
     await db.refresh(location)
     
     return LocationResponse(
@@ -145,7 +198,7 @@ async def update_location(
     for field, value in update_data.items():
         setattr(location, field, value)
     
-    await db.commit()
+    await invalidation_bus.commit(db, "locations", f"location:{location_id}")
     await db.refresh(location)
     
     # Get inventory stats
@@ -198,4 +251,4 @@ async def delete_location(
         )
     
     await db.delete(location)
-    await db.commit()
+    await invalidation_bus.commit(db, "locations", f"location:{location_id}")
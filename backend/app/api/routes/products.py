@@ -1,14 +1,27 @@
 from typing import Annotated, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-from sqlalchemy.orm import selectinload
 
-from app.core.database import get_db
+from app.core.broker import stock_broker
+from app.core.coalesce import coalesced
+from app.core.conditional import collection_validators, not_modified
+from app.core.exports import (
+    CSV, EXPORT_FORMATS, CsvColumns, export_chunks, export_filename, export_response, negotiate_export_format
+)
+from app.core.jobs import JobContext, job_engine
+from app.core.responses import Projection, dumps, row_dicts
+from app.core.database import async_read_session_maker, get_db, get_read_db
+from app.core.events import inventory_tags, invalidation_bus
+from app.core.refdata import reference_data
+from app.core.tracing import span
 from app.models.product import Product
+from app.models.category import Category
+from app.models.supplier import Supplier
 from app.models.inventory import Inventory
 from app.models.location import Location
 from app.models.transaction import Transaction, TransactionType
+from app.schemas.job import ExportJobParams
 from app.schemas.product import (
     ProductCreate, ProductUpdate, ProductResponse, ProductListResponse
 )
@@ -18,9 +31,55 @@ from app.api.deps import CurrentUser
 router = APIRouter(prefix="/products", tags=["Products"])
 
 
+# Columns of ProductResponse, so list pages serialize rows without building models
+_product_stock = (
+    select(func.coalesce(func.sum(Inventory.quantity), 0))
+    .where(Inventory.product_id == Product.id)
+    .correlate(Product)
+    .scalar_subquery()
+)
+PRODUCT_PROJECTION = Projection(ProductResponse, Product, columns={
+    "sku": Product.sku,
+    "name": Product.name,
+    "description": Product.description,
+    "unit_price": Product.unit_price,
+    "cost_price": Product.cost_price,
+    "barcode": Product.barcode,
+    "unit": Product.unit,
+    "image_url": Product.image_url,
+    "category_id": Product.category_id,
+    "supplier_id": Product.supplier_id,
+    "id": Product.id,
+    "is_active": Product.is_active,
+    "created_at": Product.created_at,
+    "updated_at": Product.updated_at,
+    "category_name": Category.name,
+    "supplier_name": Supplier.name,
+    "total_stock": _product_stock,
+}, joins={
+    "category_name": (Category, Product.category_id == Category.id),
+    "supplier_name": (Supplier, Product.supplier_id == Supplier.id),
+})
+
+
+async def _check_references(category_id: Optional[int], supplier_id: Optional[int]) -> None:
+    """Reject a category or supplier id that does not exist."""
+    if category_id is not None and not await reference_data.categories.get(category_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Category not found"
+        )
+    if supplier_id is not None and not await reference_data.suppliers.get(supplier_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Supplier not found"
+        )
+
+
 @router.get("", response_model=ProductListResponse)
 async def get_products(
-    db: Annotated[AsyncSession, Depends(get_db)],
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_read_db)],
     current_user: CurrentUser,
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
@@ -28,92 +87,61 @@ async def get_products(
     category_id: Optional[int] = None,
     supplier_id: Optional[int] = None,
     is_active: Optional[bool] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,sku,name"),
 ):
     """Get all products with pagination and filtering."""
-    query = select(Product).options(
-        selectinload(Product.category),
-        selectinload(Product.supplier)
-    )
-    
-    if search:
-        query = query.where(
-            (Product.name.ilike(f"%{search}%")) |
-            (Product.sku.ilike(f"%{search}%")) |
-            (Product.barcode.ilike(f"%{search}%"))
-        )
-    
-    if category_id:
-        query = query.where(Product.category_id == category_id)
-    
-    if supplier_id:
-        query = query.where(Product.supplier_id == supplier_id)
-    
-    if is_active is not None:
-        query = query.where(Product.is_active == is_active)
-    
-    # Get total count
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
-    
-    # Apply pagination
-    query = query.order_by(Product.name)
-    query = query.offset((page - 1) * size).limit(size)
-    
-    result = await db.execute(query)
-    products = result.scalars().all()
-    
-    # Build response with additional data
-    items = []
-    for product in products:
-        # Get total stock
-        stock_result = await db.execute(
-            select(func.sum(Inventory.quantity))
-            .where(Inventory.product_id == product.id)
-        )
-        total_stock = stock_result.scalar() or 0
+    selected = PRODUCT_PROJECTION.parse_fields(fields)
+    # Items embed stock levels and category/supplier names
+    validators = await collection_validators(request, db, "products", "inventory", "categories", "suppliers")
+    unchanged = not_modified(request, validators)
+    if unchanged is not None:
+        return unchanged
+    
+    async def load():
+        conditions = []
+        if search:
+            conditions.append(
+                (Product.name.ilike(f"%{search}%")) |
+                (Product.sku.ilike(f"%{search}%")) |
+                (Product.barcode.ilike(f"%{search}%"))
+            )
         
-        item = ProductResponse(
-            id=product.id,
-            sku=product.sku,
-            name=product.name,
-            description=product.description,
-            unit_price=product.unit_price,
-            cost_price=product.cost_price,
-            barcode=product.barcode,
-            unit=product.unit,
-            image_url=product.image_url,
-            category_id=product.category_id,
-            supplier_id=product.supplier_id,
-            is_active=product.is_active,
-            created_at=product.created_at,
-            updated_at=product.updated_at,
-            category_name=product.category.name if product.category else None,
-            supplier_name=product.supplier.name if product.supplier else None,
-            total_stock=total_stock
-        )
-        items.append(item)
+        if category_id:
+            conditions.append(Product.category_id == category_id)
+        
+        if supplier_id:
+            conditions.append(Product.supplier_id == supplier_id)
+        
+        if is_active is not None:
+            conditions.append(Product.is_active == is_active)
+        
+        # Get total count
+        count_query = select(func.count(Product.id)).where(*conditions)
+        total_result = await db.execute(count_query)
+        total = total_result.scalar()
+        
+        # Fetch the page as plain rows with only the requested columns
+        query = PRODUCT_PROJECTION.select(selected).where(*conditions).order_by(Product.name)
+        query = query.offset((page - 1) * size).limit(size)
+        result = await db.execute(query)
+        
+        with span("serialize"):
+            return dumps({"items": row_dicts(result), "total": total, "page": page, "size": size})
     
-    return ProductListResponse(
-        items=items,
-        total=total,
-        page=page,
-        size=size
-    )
+    # Dashboards poll the same pages at once, share one load between callers
+    # that saw the same collection state
+    body = await coalesced(request, current_user, db, load, validators["ETag"])
+    return Response(content=body, media_type="application/json", headers=validators)
 
 
 @router.get("/{product_id}", response_model=ProductResponse)
 async def get_product(
     product_id: int,
-    db: Annotated[AsyncSession, Depends(get_db)],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
     current_user: CurrentUser,
 ):
     """Get a specific product by ID."""
-    result = await db.execute(
-        select(Product)
-        .options(selectinload(Product.category), selectinload(Product.supplier))
-        .where(Product.id == product_id)
-    )
+    result = await db.execute(select(Product).where(Product.id == product_id))
     product = result.scalar_one_or_none()
     
     if not product:
@@ -144,8 +172,8 @@ async def get_product(
         is_active=product.is_active,
         created_at=product.created_at,
         updated_at=product.updated_at,
-        category_name=product.category.name if product.category else None,
-        supplier_name=product.supplier.name if product.supplier else None,
+        category_name=await reference_data.categories.name(product.category_id),
+        supplier_name=await reference_data.suppliers.name(product.supplier_id),
         total_stock=total_stock
     )
 
@@ -165,6 +193,8 @@ async def create_product(
             detail="SKU already exists"
         )
     
+    await _check_references(product_data.category_id, product_data.supplier_id)
+    
     # Extract initial_stock before creating product
     initial_stock = product_data.initial_stock
     product_dict = product_data.model_dump(exclude={'initial_stock'})
@@ -175,14 +205,17 @@ async def create_product(
     
     # If initial stock is provided, create inventory and transaction
     total_stock = 0
+    stale_tags = ["products"]
+    changed_inventory = []
     if initial_stock > 0:
         # Get or create default location
-        location_result = await db.execute(select(Location).limit(1))
-        location = location_result.scalar_one_or_none()
+        location = await reference_data.default_location()
         if not location:
             location = Location(name="Main Warehouse", type="warehouse")
             db.add(location)
             await db.flush()
+            stale_tags.append("locations")
+        stale_tags.extend(inventory_tags(location.id))
         
         # Create inventory record
         inventory = Inventory(
@@ -193,6 +226,7 @@ async def create_product(
             reorder_quantity=50
         )
         db.add(inventory)
+        changed_inventory.append(inventory)
         
         # Create transaction record
         transaction = Transaction(
@@ -207,8 +241,9 @@ async def create_product(
         db.add(transaction)
         total_stock = initial_stock
     
-    await db.commit()
+    await invalidation_bus.commit(db, *stale_tags)
     await db.refresh(product)
+    stock_broker.publish_stock(*changed_inventory)
     
     return ProductResponse(
         id=product.id,
@@ -225,6 +260,8 @@ async def create_product(
         is_active=product.is_active,
         created_at=product.created_at,
         updated_at=product.updated_at,
+        category_name=await reference_data.categories.name(product.category_id),
+        supplier_name=await reference_data.suppliers.name(product.supplier_id),
         total_stock=total_stock
     )
 
@@ -237,11 +274,7 @@ async def update_product(
     current_user: CurrentUser,
 ):
     """Update a product."""
-    result = await db.execute(
-        select(Product)
-        .options(selectinload(Product.category), selectinload(Product.supplier))
-        .where(Product.id == product_id)
-    )
+    result = await db.execute(select(Product).where(Product.id == product_id))
     product = result.scalar_one_or_none()
     
     if not product:
@@ -264,19 +297,22 @@ async def update_product(
     # Handle stock update
     new_stock = product_data.new_stock
     update_data = product_data.model_dump(exclude_unset=True, exclude={'new_stock'})
+    await _check_references(update_data.get("category_id"), update_data.get("supplier_id"))
     
     for field, value in update_data.items():
         setattr(product, field, value)
     
     # Update stock if new_stock is provided
+    stale_tags = ["products", f"product:{product_id}"]
+    changed_inventory = []
     if new_stock is not None:
         # Get or create default location
-        location_result = await db.execute(select(Location).limit(1))
-        location = location_result.scalar_one_or_none()
+        location = await reference_data.default_location()
         if not location:
             location = Location(name="Main Warehouse", type="warehouse")
             db.add(location)
             await db.flush()
+            stale_tags.append("locations")
         
         # Get current inventory
         inv_result = await db.execute(
@@ -314,9 +350,12 @@ async def update_product(
                 user_id=current_user.id
             )
             db.add(transaction)
+            stale_tags.extend(inventory_tags(location.id))
+            changed_inventory.append(inventory)
     
-    await db.commit()
+    await invalidation_bus.commit(db, *stale_tags)
     await db.refresh(product)
+    stock_broker.publish_stock(*changed_inventory)
     
     # Get total stock
     stock_result = await db.execute(
@@ -340,8 +379,8 @@ async def update_product(
         is_active=product.is_active,
         created_at=product.created_at,
         updated_at=product.updated_at,
-        category_name=product.category.name if product.category else None,
-        supplier_name=product.supplier.name if product.supplier else None,
+        category_name=await reference_data.categories.name(product.category_id),
+        supplier_name=await reference_data.suppliers.name(product.supplier_id),
         total_stock=total_stock
     )
 
@@ -362,55 +401,60 @@ async def delete_product(
             detail="Product not found"
         )
     
+    # Inventory rows go with the product
+    location_result = await db.execute(
+        select(Inventory.location_id).where(Inventory.product_id == product_id)
+    )
+    location_ids = location_result.scalars().all()
+    
     await db.delete(product)
-    await db.commit()
+    await invalidation_bus.commit(db, "products", f"product:{product_id}", *inventory_tags(*location_ids))
+
+
+# Spreadsheet columns of the CSV export
+PRODUCT_CSV = CsvColumns(
+    ['SKU', 'Name', 'Description', 'Sale Price', 'Cost Price', 'Unit', 'Stock'],
+    lambda p: [
+        p.sku,
+        p.name,
+        p.description or '',
+        float(p.unit_price),
+        float(p.cost_price),
+        p.unit,
+        p.total_stock
+    ],
+)
+
+
+def _export_query(export_format: str):
+    if export_format != CSV:
+        return PRODUCT_PROJECTION.select().order_by(Product.name)
+    return select(
+        Product.sku, Product.name, Product.description, Product.unit_price,
+        Product.cost_price, Product.unit, _product_stock.label("total_stock")
+    ).order_by(Product.name)
 
 
 @router.get("/export/csv")
 async def export_products_csv(
-    db: Annotated[AsyncSession, Depends(get_db)],
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_read_db)],
     current_user: CurrentUser,
 ):
-    """Export products to CSV."""
-    from fastapi.responses import StreamingResponse
-    from datetime import datetime
-    import io
-    import csv
-    
-    query = select(Product).options(
-        selectinload(Product.category),
-        selectinload(Product.supplier)
-    ).order_by(Product.name)
-    
-    result = await db.execute(query)
-    products = result.scalars().all()
+    """Export products to CSV, or to MessagePack/Arrow as negotiated via ``Accept``.
     
-    output = io.StringIO()
-    output.write('\ufeff')  # BOM for Excel
-    writer = csv.writer(output, delimiter=';')
-    writer.writerow(['SKU', 'Name', 'Description', 'Sale Price', 'Cost Price', 'Unit', 'Stock'])
-    
-    for p in products:
-        # Get total stock
-        stock_result = await db.execute(
-            select(func.sum(Inventory.quantity))
-            .where(Inventory.product_id == p.id)
-        )
-        total_stock = stock_result.scalar() or 0
-        
-        writer.writerow([
-            p.sku,
-            p.name,
-            p.description or '',
-            float(p.unit_price),
-            float(p.cost_price),
-            p.unit,
-            total_stock
-        ])
-    
-    output.seek(0)
-    return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename=products_{datetime.now().strftime('%Y%m%d')}.csv"}
-    )
+    For large catalogs submit a ``products_export`` job instead.
+    """
+    export_format = negotiate_export_format(request)
+    return export_response(db, _export_query(export_format), export_format, "products", PRODUCT_CSV)
+
+
+@job_engine.job("products_export", ExportJobParams)
+async def run_products_export(job: JobContext):
+    """Background job writing the product export to a file."""
+    export_format = EXPORT_FORMATS[job.params.format]
+    async with async_read_session_maker() as db:
+        job.total = (await db.execute(select(func.count(Product.id)))).scalar()
+        job.media_type = export_format
+        job.filename = export_filename("products", export_format)
+        await job.write(export_chunks(db, _export_query(export_format), export_format, PRODUCT_CSV, job.advance))
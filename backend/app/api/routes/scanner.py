@@ -0,0 +1,194 @@
+import asyncio
+import json
+from typing import Any, Optional
+
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, status
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.core.security import decode_token
+from app.models.product import Product
+from app.models.transaction import TransactionType
+from app.models.user import User
+from app.schemas.transaction import TransactionCreate
+from app.services.stock import StockMovement, apply_stock_transaction, commit_stock_movements
+from app.api.deps import user_for_token
+
+
+router = APIRouter(prefix="/scanner", tags=["Scanner"])
+
+SCAN_TYPES = {TransactionType.STOCK_IN.value, TransactionType.STOCK_OUT.value}
+_CLOSED = object()
+
+
+class ScanError(Exception):
+    """A scan that cannot be applied; reported in its ack."""
+
+
+def _bearer_token(websocket: WebSocket) -> Optional[str]:
+    scheme, _, token = websocket.headers.get("authorization", "").partition(" ")
+    return token if scheme.lower() == "bearer" and token else None
+
+
+async def _authenticate(token: str) -> Optional[User]:
+    try:
+        return await user_for_token(token, async_session_maker)
+    except HTTPException:
+        return None
+
+
+def _scan(message: Any, products_by_barcode: dict[str, int]) -> TransactionCreate:
+    if not isinstance(message, dict):
+        raise ScanError("Scan must be a JSON object")
+    if message.get("type") not in SCAN_TYPES:
+        raise ScanError(f"type must be one of: {', '.join(sorted(SCAN_TYPES))}")
+    product_id = message.get("product_id")
+    if product_id is None:
+        product_id = products_by_barcode.get(message.get("barcode"))
+        if product_id is None:
+            raise ScanError("Unknown barcode" if message.get("barcode") else "product_id or barcode required")
+    try:
+        return TransactionCreate(
+            product_id=product_id,
+            location_id=message.get("location_id"),
+            type=message["type"],
+            quantity=message.get("quantity", 1),
+            reference=message.get("reference"),
+            notes=message.get("notes"),
+        )
+    except ValidationError as e:
+        raise ScanError("; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+
+
+async def _apply_scans(messages: list, user: User) -> list[dict[str, Any]]:
+    """Apply a batch of scans in one transaction and return their acks in order."""
+    acks: list[dict[str, Any]] = []
+    # Each scan's stock level is taken as it is applied: a later scan of the same row changes it
+    applied: list[tuple[dict[str, Any], StockMovement, int]] = []
+    async with async_session_maker() as db:
+        barcodes = {
+            message["barcode"] for message in messages
+            if isinstance(message, dict) and message.get("product_id") is None and message.get("barcode")
+        }
+        products_by_barcode: dict[str, int] = {}
+        if barcodes:
+            result = await db.execute(
+                select(Product.barcode, Product.id).where(Product.barcode.in_(barcodes)).order_by(Product.id)
+            )
+            for barcode, product_id in result:
+                products_by_barcode.setdefault(barcode, product_id)
+
+        for message in messages:
+            ack = {"seq": message.get("seq") if isinstance(message, dict) else None}
+            acks.append(ack)
+            try:
+                data = _scan(message, products_by_barcode)
+                async with db.begin_nested():
+                    movement = await apply_stock_transaction(db, data, user.id)
+            except ScanError as e:
+                ack.update(status="error", detail=str(e))
+            except HTTPException as e:
+                ack.update(status="error", detail=e.detail)
+            except SQLAlchemyError:
+                # The savepoint rolled back this scan only, the rest of the batch goes on
+                ack.update(status="error", detail="Scan could not be saved, resend")
+            else:
+                applied.append((ack, movement, movement.inventories[0].quantity))
+
+        try:
+            await commit_stock_movements(db, *(movement for _, movement, _ in applied))
+        except SQLAlchemyError:
+            await db.rollback()
+            for ack, _, _ in applied:
+                ack.update(status="error", detail="Batch could not be saved, resend")
+            return acks
+
+    for ack, movement, quantity in applied:
+        ack.update(
+            status="ok",
+            transaction_id=movement.transaction.id,
+            product_id=movement.transaction.product_id,
+            location_id=movement.transaction.location_id,
+            quantity=quantity,
+        )
+    return acks
+
+
+@router.websocket("/ws")
+async def scanner_socket(websocket: WebSocket):
+    """Stream stock-in and stock-out scans from a scanner station.
+
+    The station authenticates once, with an ``Authorization: Bearer`` header on
+    the handshake or a first ``{"token": "..."}`` message, and is answered with
+    ``{"status": "ready"}``. It then sends scans::
+
+        {"seq": 17, "type": "stock_in", "barcode": "4600000000017", "quantity": 1, "location_id": 2}
+
+    ``type`` is ``stock_in`` or ``stock_out``; the product is given by
+    ``product_id`` or ``barcode``; ``quantity`` defaults to 1 and
+    ``location_id`` to the default location. Each scan is answered with an ack
+    carrying its ``seq``, either ``{"seq": 17, "status": "ok", "transaction_id": ...,
+    "quantity": ...}`` with the new stock level or ``{"seq": 17, "status": "error",
+    "detail": ...}``. Resend only scans without an ack.
+
+    Scans waiting on the connection are applied together, each in its own
+    savepoint through the same logic as ``POST /transactions``, with one
+    commit per batch.
+    """
+    await websocket.accept()
+    try:
+        token = _bearer_token(websocket)
+        if token is None:
+            message = await websocket.receive_json()
+            token = message.get("token") if isinstance(message, dict) else None
+            if not isinstance(token, str):
+                token = None
+        user = await _authenticate(token) if token else None
+    except (WebSocketDisconnect, ValueError):
+        return
+    if user is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Invalid or expired token")
+        return
+    await websocket.send_json({"status": "ready", "user_id": user.id})
+
+    pending: asyncio.Queue = asyncio.Queue(settings.SCANNER_MAX_PENDING)
+
+    async def receive():
+        try:
+            while True:
+                text = await websocket.receive_text()
+                try:
+                    message = json.loads(text)
+                except ValueError:
+                    message = None
+                await pending.put(message)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            await pending.put(_CLOSED)
+
+    receiver = asyncio.create_task(receive())
+    try:
+        closed = False
+        while not closed:
+            batch = [await pending.get()]
+            while len(batch) < settings.SCANNER_BATCH_SIZE and not pending.empty():
+                batch.append(pending.get_nowait())
+            if _CLOSED in batch:
+                closed = True
+                batch = batch[:batch.index(_CLOSED)]
+            if not batch:
+                continue
+            # Tokens expire; the cache keeps this check cheap
+            if decode_token(token) is None:
+                await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Token expired")
+                return
+            for ack in await _apply_scans(batch, user):
+                await websocket.send_json(ack)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
@@ -1,9 +1,11 @@
 from typing import Annotated, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 
-from app.core.database import get_db
+from app.core.cache import request_cache_key, response_cache
+from app.core.database import get_db, get_read_db, reads_primary
+from app.core.events import invalidation_bus
 from app.models.supplier import Supplier
 from app.schemas.supplier import (
     SupplierCreate, SupplierUpdate, SupplierResponse, SupplierListResponse
@@ -16,7 +18,8 @@ router = APIRouter(prefix="/suppliers", tags=["Suppliers"])
 
 @router.get("", response_model=SupplierListResponse)
 async def get_suppliers(
-    db: Annotated[AsyncSession, Depends(get_db)],
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_read_db)],
     current_user: CurrentUser,
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
@@ -24,55 +27,66 @@ async def get_suppliers(
     is_active: Optional[bool] = None,
 ):
     """Get all suppliers with pagination and filtering."""
-    query = select(Supplier)
-    
-    if search:
-        query = query.where(
-            (Supplier.name.ilike(f"%{search}%")) |
-            (Supplier.contact_person.ilike(f"%{search}%")) |
-            (Supplier.email.ilike(f"%{search}%"))
+    async def load():
+        query = select(Supplier)
+        
+        if search:
+            query = query.where(
+                (Supplier.name.ilike(f"%{search}%")) |
+                (Supplier.contact_person.ilike(f"%{search}%")) |
+                (Supplier.email.ilike(f"%{search}%"))
+            )
+        
+        if is_active is not None:
+            query = query.where(Supplier.is_active == is_active)
+        
+        # Get total count
+        count_query = select(func.count()).select_from(query.subquery())
+        total_result = await db.execute(count_query)
+        total = total_result.scalar()
+        
+        # Apply pagination
+        query = query.order_by(Supplier.name)
+        query = query.offset((page - 1) * size).limit(size)
+        
+        result = await db.execute(query)
+        suppliers = result.scalars().all()
+        
+        return SupplierListResponse(
+            items=list(suppliers),
+            total=total,
+            page=page,
+            size=size
         )
     
-    if is_active is not None:
-        query = query.where(Supplier.is_active == is_active)
-    
-    # Get total count
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
-    
-    # Apply pagination
-    query = query.order_by(Supplier.name)
-    query = query.offset((page - 1) * size).limit(size)
-    
-    result = await db.execute(query)
-    suppliers = result.scalars().all()
-    
-    return SupplierListResponse(
-        items=list(suppliers),
-        total=total,
-        page=page,
-        size=size
+    return await response_cache.response(
+        request_cache_key(request), ("suppliers",), load, store=reads_primary(db)
     )
 
 
 @router.get("/{supplier_id}", response_model=SupplierResponse)
 async def get_supplier(
     supplier_id: int,
-    db: Annotated[AsyncSession, Depends(get_db)],
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_read_db)],
     current_user: CurrentUser,
 ):
     """Get a specific supplier by ID."""
-    result = await db.execute(select(Supplier).where(Supplier.id == supplier_id))
-    supplier = result.scalar_one_or_none()
+    async def load():
+        result = await db.execute(select(Supplier).where(Supplier.id == supplier_id))
+        supplier = result.scalar_one_or_none()
+        
+        if not supplier:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Supplier not found"
+            )
+        
+        return SupplierResponse.model_validate(supplier)
     
-    if not supplier:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Supplier not found"
-        )
-    
-    return supplier
+    return await response_cache.response(
+        request_cache_key(request), (f"supplier:{supplier_id}",), load, store=reads_primary(db)
+    )
 
 
 @router.post("", response_model=SupplierResponse, status_code=status.HTTP_201_CREATED)
@@ -84,7 +98,7 @@ async def create_supplier(
     """Create a new supplier (Manager/Admin only)."""
     supplier = Supplier(**supplier_data.model_dump())
     db.add(supplier)
-    await db.commit()
+    await invalidation_bus.commit(db, "suppliers")
     await db.refresh(supplier)
     
     return supplier
@@ -111,7 +125,8 @@ async def update_supplier(
     for field, value in update_data.items():
         setattr(supplier, field, value)
     
-    await db.commit()
+    # Product responses embed the supplier name
+    await invalidation_bus.commit(db, "suppliers", f"supplier:{supplier_id}", "products")
     await db.refresh(supplier)
     
     return supplier
@@ -134,4 +149,4 @@ async def delete_supplier(
         )
     
     await db.delete(supplier)
-    await db.commit()
+    await invalidation_bus.commit(db, "suppliers", f"supplier:{supplier_id}", "products")
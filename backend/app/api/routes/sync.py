@@ -0,0 +1,60 @@
+from typing import Annotated
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.changes import changes_since, latest_version
+from app.core.database import get_read_db
+from app.core.responses import FastJSONResponse, row_dicts
+from app.models.product import Product
+from app.models.inventory import Inventory
+from app.models.location import Location
+from app.schemas.sync import SyncResponse
+from app.api.deps import CurrentUser
+from app.api.routes.products import PRODUCT_PROJECTION
+from app.api.routes.inventory import INVENTORY_PROJECTION
+from app.api.routes.locations import LOCATION_PROJECTION
+
+
+router = APIRouter(prefix="/sync", tags=["Sync"])
+
+
+# Entities in the feed, with the projection their current rows are read through
+SYNCED = {
+    "products": (Product, PRODUCT_PROJECTION),
+    "inventory": (Inventory, INVENTORY_PROJECTION),
+    "locations": (Location, LOCATION_PROJECTION),
+}
+
+
+@router.get("", response_model=SyncResponse)
+async def get_changes(
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    current_user: CurrentUser,
+    since: int = Query(0, ge=0, description="Version from the previous sync, 0 for a full sync"),
+    limit: int = Query(1000, ge=1, le=10000, description="Maximum number of changes to read"),
+):
+    """Get products, inventory and locations changed since a version.
+
+    Pass the returned ``version`` as ``since`` on the next call, and call
+    again right away while ``has_more`` is true.
+    """
+    changed, version, has_more = await changes_since(db, since, limit)
+    if version == since and since > await latest_version(db):
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Sync version is ahead of the server, sync again from 0"
+        )
+
+    content = {"version": version, "has_more": has_more}
+    deleted = {}
+    for entity, (model, projection) in SYNCED.items():
+        ids = changed[entity]
+        items = []
+        if ids:
+            result = await db.execute(projection.select().where(model.id.in_(ids)).order_by(model.id))
+            items = row_dicts(result)
+        content[entity] = items
+        deleted[entity] = sorted(ids - {item["id"] for item in items})
+    content["deleted"] = deleted
+
+    return FastJSONResponse(content)
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Query, status
+
+from app.core.database import get_pool_stats
+from app.core.slowlog import slow_query_log
+from app.schemas.system import PoolStatsResponse, SlowQueryListResponse, SlowQueryStats
+from app.api.deps import AdminUser
+
+
+router = APIRouter(prefix="/system", tags=["System"])
+
+
+@router.get("/pool", response_model=PoolStatsResponse)
+async def get_pool_status(current_user: AdminUser):
+    """Get database connection pool statistics (Admin only)."""
+    return PoolStatsResponse(**get_pool_stats())
+
+
+@router.get("/slow-queries", response_model=SlowQueryListResponse)
+async def get_slow_queries(
+    current_user: AdminUser,
+    limit: int = Query(20, ge=1, le=500),
+):
+    """Get the slowest statement shapes by total time in this process, with their plans (Admin only)."""
+    items = [
+        SlowQueryStats(
+            statement=entry.shape,
+            count=entry.count,
+            total_seconds=entry.total,
+            mean_seconds=entry.total / entry.count,
+            max_seconds=entry.max,
+            last_seen=entry.last_seen,
+            routes=dict(entry.routes.most_common()),
+            params=entry.params,
+            plan=entry.plan,
+            plan_error=entry.plan_error,
+        )
+        for entry in slow_query_log.top(limit)
+    ]
+    return SlowQueryListResponse(threshold_seconds=slow_query_log.threshold, items=items)
+
+
+@router.delete("/slow-queries", status_code=status.HTTP_204_NO_CONTENT)
+async def reset_slow_queries(current_user: AdminUser):
+    """Clear the slow query totals of this process (Admin only)."""
+    slow_query_log.reset()
@@ -1,25 +1,56 @@
 from typing import Annotated, Optional
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, status, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, func, null
 
-from app.core.database import get_db
+from app.core.database import async_read_session_maker, get_db, get_read_db
+from app.core.exports import (
+    CSV, EXPORT_FORMATS, CsvColumns, export_chunks, export_filename, export_response, negotiate_export_format
+)
+from app.core.jobs import JobContext, job_engine
+from app.core.responses import FastJSONResponse, Projection, row_dicts
 from app.models.transaction import Transaction, TransactionType
-from app.models.inventory import Inventory
 from app.models.product import Product
 from app.models.location import Location
+from app.models.user import User
+from app.schemas.job import TransactionExportJobParams
 from app.schemas.transaction import TransactionCreate, TransactionResponse, TransactionListResponse
+from app.services.stock import apply_stock_transaction, commit_stock_movements
 from app.api.deps import CurrentUser
 
 
 router = APIRouter(prefix="/transactions", tags=["Transactions"])
 
 
+# Columns of TransactionResponse, so list pages serialize rows without building models
+TRANSACTION_PROJECTION = Projection(TransactionResponse, Transaction, columns={
+    "product_id": Transaction.product_id,
+    "location_id": Transaction.location_id,
+    "type": Transaction.type,
+    "quantity": Transaction.quantity,
+    "reference": Transaction.reference,
+    "notes": Transaction.notes,
+    "destination_location_id": Transaction.destination_location_id,
+    "id": Transaction.id,
+    "user_id": Transaction.user_id,
+    "created_at": Transaction.created_at,
+    "product_name": Product.name,
+    "product_sku": Product.sku,
+    "location_name": Location.name,
+    "destination_location_name": null(),
+    "user_name": User.full_name,
+}, joins={
+    "product_name": (Product, Transaction.product_id == Product.id),
+    "product_sku": (Product, Transaction.product_id == Product.id),
+    "location_name": (Location, Transaction.location_id == Location.id),
+    "user_name": (User, Transaction.user_id == User.id),
+})
+
+
 @router.get("", response_model=TransactionListResponse)
 async def get_transactions(
-    db: Annotated[AsyncSession, Depends(get_db)],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
     current_user: CurrentUser,
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
@@ -28,46 +59,30 @@ async def get_transactions(
     type: Optional[TransactionType] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,sku,name"),
 ):
     """Get transactions with pagination and filtering."""
-    query = select(Transaction).options(
-        selectinload(Transaction.product),
-        selectinload(Transaction.location),
-        selectinload(Transaction.user)
-    )
-    
+    selected = TRANSACTION_PROJECTION.parse_fields(fields)
+    conditions = []
     if product_id:
-        query = query.where(Transaction.product_id == product_id)
+        conditions.append(Transaction.product_id == product_id)
     if location_id:
-        query = query.where(Transaction.location_id == location_id)
+        conditions.append(Transaction.location_id == location_id)
     if type:
-        query = query.where(Transaction.type == type)
+        conditions.append(Transaction.type == type)
     if start_date:
-        query = query.where(Transaction.created_at >= start_date)
+        conditions.append(Transaction.created_at >= start_date)
     if end_date:
-        query = query.where(Transaction.created_at <= end_date)
+        conditions.append(Transaction.created_at <= end_date)
     
-    count_query = select(func.count()).select_from(query.subquery())
+    count_query = select(func.count(Transaction.id)).where(*conditions)
     total = (await db.execute(count_query)).scalar()
     
-    query = query.order_by(Transaction.created_at.desc())
+    query = TRANSACTION_PROJECTION.select(selected).where(*conditions).order_by(Transaction.created_at.desc())
     query = query.offset((page - 1) * size).limit(size)
     
     result = await db.execute(query)
-    items = [
-        TransactionResponse(
-            id=t.id, product_id=t.product_id, location_id=t.location_id,
-            type=t.type, quantity=t.quantity, reference=t.reference,
-            notes=t.notes, destination_location_id=t.destination_location_id,
-            user_id=t.user_id, created_at=t.created_at,
-            product_name=t.product.name if t.product else None,
-            product_sku=t.product.sku if t.product else None,
-            location_name=t.location.name if t.location else None,
-            user_name=t.user.full_name if t.user else None
-        ) for t in result.scalars().all()
-    ]
-    
-    return TransactionListResponse(items=items, total=total, page=page, size=size)
+    return FastJSONResponse({"items": row_dicts(result), "total": total, "page": page, "size": size})
 
 
 @router.post("", response_model=TransactionResponse, status_code=status.HTTP_201_CREATED)
@@ -77,82 +92,11 @@ async def create_transaction(
     current_user: CurrentUser,
 ):
     """Create a stock transaction and update inventory."""
-    # Validate product
-    product = (await db.execute(select(Product).where(Product.id == data.product_id))).scalar_one_or_none()
-    if not product:
-        raise HTTPException(status_code=400, detail="Product not found")
-    
-    # Get or create default location
-    location_id = data.location_id
-    if not location_id:
-        # Find or create default location
-        location_result = await db.execute(select(Location).limit(1))
-        location = location_result.scalar_one_or_none()
-        if not location:
-            location = Location(name="Main Warehouse", type="warehouse")
-            db.add(location)
-            await db.flush()
-        location_id = location.id
-    else:
-        location = (await db.execute(select(Location).where(Location.id == location_id))).scalar_one_or_none()
-        if not location:
-            raise HTTPException(status_code=400, detail="Location not found")
-    
-    # Get or create inventory record
-    inv_result = await db.execute(
-        select(Inventory).where(
-            (Inventory.product_id == data.product_id) & (Inventory.location_id == location_id)
-        )
-    )
-    inventory = inv_result.scalar_one_or_none()
-    
-    if not inventory:
-        inventory = Inventory(product_id=data.product_id, location_id=location_id, quantity=0)
-        db.add(inventory)
-    
-    # Update inventory based on transaction type
-    if data.type == TransactionType.STOCK_IN or data.type == TransactionType.RETURN:
-        inventory.quantity += data.quantity
-    elif data.type == TransactionType.STOCK_OUT:
-        if inventory.quantity < data.quantity:
-            raise HTTPException(status_code=400, detail="Insufficient stock")
-        inventory.quantity -= data.quantity
-    elif data.type == TransactionType.ADJUSTMENT:
-        inventory.quantity = data.quantity  # Direct set for adjustments
-    elif data.type == TransactionType.TRANSFER:
-        if not data.destination_location_id:
-            raise HTTPException(status_code=400, detail="Destination required for transfer")
-        if inventory.quantity < data.quantity:
-            raise HTTPException(status_code=400, detail="Insufficient stock")
-        
-        inventory.quantity -= data.quantity
-        
-        # Get or create destination inventory
-        dest_inv = (await db.execute(
-            select(Inventory).where(
-                (Inventory.product_id == data.product_id) & 
-                (Inventory.location_id == data.destination_location_id)
-            )
-        )).scalar_one_or_none()
-        
-        if not dest_inv:
-            dest_inv = Inventory(product_id=data.product_id, location_id=data.destination_location_id, quantity=0)
-            db.add(dest_inv)
-        dest_inv.quantity += data.quantity
-    
-    # Create transaction record
-    transaction = Transaction(
-        product_id=data.product_id, location_id=location_id,
-        type=data.type, quantity=data.quantity, reference=data.reference,
-        notes=data.notes, destination_location_id=data.destination_location_id,
-        user_id=current_user.id
-    )
-    db.add(transaction)
-    await db.commit()
+    movement = await apply_stock_transaction(db, data, current_user.id)
+    await commit_stock_movements(db, movement)
+    transaction = movement.transaction
     await db.refresh(transaction)
-    
-    # Get location name
-    location_obj = (await db.execute(select(Location).where(Location.id == location_id))).scalar_one_or_none()
+    product, location = movement.product, movement.location
     
     return TransactionResponse(
         id=transaction.id, product_id=transaction.product_id, location_id=transaction.location_id,
@@ -160,56 +104,72 @@ async def create_transaction(
         notes=transaction.notes, destination_location_id=transaction.destination_location_id,
         user_id=transaction.user_id, created_at=transaction.created_at,
         product_name=product.name, product_sku=product.sku, 
-        location_name=location_obj.name if location_obj else None,
+        location_name=location.name,
         user_name=current_user.full_name
     )
 
 
+# Spreadsheet columns of the CSV export
+TRANSACTION_CSV = CsvColumns(
+    ['Дата', 'Тип', 'Товар', 'Артикул', 'Количество', 'Документ', 'Примечание', 'Пользователь'],
+    lambda t: [
+        t.created_at.strftime('%Y-%m-%d %H:%M'),
+        'Приход' if t.type == TransactionType.STOCK_IN else 'Расход',
+        t.product_name or '',
+        t.product_sku or '',
+        t.quantity,
+        t.reference or '',
+        t.notes or '',
+        t.user_name or ''
+    ],
+)
+
+
+def _export_query(export_format: str, type: Optional[TransactionType]):
+    if export_format != CSV:
+        query = TRANSACTION_PROJECTION.select()
+    else:
+        query = select(
+            Transaction.created_at, Transaction.type, Transaction.quantity,
+            Transaction.reference, Transaction.notes,
+            Product.name.label("product_name"), Product.sku.label("product_sku"),
+            User.full_name.label("user_name"),
+        ).outerjoin(Product, Transaction.product_id == Product.id).outerjoin(
+            User, Transaction.user_id == User.id
+        )
+    
+    if type:
+        query = query.where(Transaction.type == type)
+    
+    return query.order_by(Transaction.created_at.desc())
+
+
 @router.get("/export/csv")
 async def export_transactions_csv(
-    db: Annotated[AsyncSession, Depends(get_db)],
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_read_db)],
     current_user: CurrentUser,
     type: Optional[TransactionType] = None,
 ):
-    """Export transactions to CSV."""
-    from fastapi.responses import StreamingResponse
-    import io
-    import csv
-    
-    query = select(Transaction).options(
-        selectinload(Transaction.product),
-        selectinload(Transaction.location),
-        selectinload(Transaction.user)
-    )
+    """Export transactions to CSV, or to MessagePack/Arrow as negotiated via ``Accept``.
     
-    if type:
-        query = query.where(Transaction.type == type)
-    
-    query = query.order_by(Transaction.created_at.desc())
-    result = await db.execute(query)
-    transactions = result.scalars().all()
-    
-    output = io.StringIO()
-    output.write('\ufeff')  # BOM for Excel
-    writer = csv.writer(output, delimiter=';')
-    writer.writerow(['Дата', 'Тип', 'Товар', 'Артикул', 'Количество', 'Документ', 'Примечание', 'Пользователь'])
-    
-    for t in transactions:
-        type_name = 'Приход' if t.type == TransactionType.STOCK_IN else 'Расход'
-        writer.writerow([
-            t.created_at.strftime('%Y-%m-%d %H:%M'),
-            type_name,
-            t.product.name if t.product else '',
-            t.product.sku if t.product else '',
-            t.quantity,
-            t.reference or '',
-            t.notes or '',
-            t.user.full_name if t.user else ''
-        ])
-    
-    output.seek(0)
-    return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename=transactions_{datetime.now().strftime('%Y%m%d')}.csv"}
-    )
+    For long histories submit a ``transactions_export`` job instead.
+    """
+    export_format = negotiate_export_format(request)
+    return export_response(db, _export_query(export_format, type), export_format, "transactions", TRANSACTION_CSV)
+
+
+@job_engine.job("transactions_export", TransactionExportJobParams)
+async def run_transactions_export(job: JobContext):
+    """Background job writing the transaction export to a file."""
+    export_format = EXPORT_FORMATS[job.params.format]
+    async with async_read_session_maker() as db:
+        count_query = select(func.count(Transaction.id))
+        if job.params.type:
+            count_query = count_query.where(Transaction.type == job.params.type)
+        job.total = (await db.execute(count_query)).scalar()
+        job.media_type = export_format
+        job.filename = export_filename("transactions", export_format)
+        await job.write(export_chunks(
+            db, _export_query(export_format, job.params.type), export_format, TRANSACTION_CSV, job.advance
+        ))
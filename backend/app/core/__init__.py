@@ -1,6 +1,14 @@
 """Core module initialization."""
 from app.core.config import settings
-from app.core.database import Base, get_db, init_db, engine
+from app.core.database import (
+    Base,
+    get_db,
+    get_read_db,
+    init_db,
+    engine,
+    read_engine,
+    get_pool_stats,
+)
 from app.core.security import (
     verify_password,
     get_password_hash,
@@ -13,8 +21,11 @@ __all__ = [
     "settings",
     "Base",
     "get_db",
+    "get_read_db",
     "init_db",
     "engine",
+    "read_engine",
+    "get_pool_stats",
     "verify_password",
     "get_password_hash",
     "create_access_token",
@@ -0,0 +1,207 @@
+"""Admission control: bounded concurrency per route class, with load shedding.
+
+Requests are sorted into classes before routing:
+
+* ``write`` - POST, PUT, PATCH and DELETE;
+* ``heavy`` - reads matching ``ADMISSION_HEAVY_PATHS`` (exports, sync, snapshots);
+* ``read`` - every other read.
+
+Each class runs at most ``ADMISSION_LIMITS[class]`` requests at once and all
+of them together at most ``ADMISSION_CAPACITY``, sized to the connection pool.
+The last ``ADMISSION_WRITE_RESERVE`` slots are kept for writes, and when a
+slot frees up queued writes go first, then reads, then heavy reads, so a
+burst of exports cannot stall stock postings. A request that finds its class
+full waits in a bounded queue for at most ``ADMISSION_MAX_WAIT_SECONDS``; when
+the queue is full or the wait runs out it gets 429 with a ``Retry-After``
+estimated from the queue length and recent service times.
+
+Paths in ``ADMISSION_EXEMPT_PATHS`` (health, metrics, long-lived streams),
+CORS preflights and WebSockets are not limited. Limits apply per worker process.
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from fnmatch import fnmatchcase
+from typing import Optional
+
+from app.core.config import settings
+from app.core.metrics import Counter, LabeledCallbackMetric, LabeledHistogram, registry
+from app.core.responses import dumps
+
+
+WRITE = "write"
+READ = "read"
+HEAVY = "heavy"
+
+# Order in which queued requests are admitted
+PRIORITY = (WRITE, READ, HEAVY)
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+ADMISSION_REJECTED = registry.register(Counter(
+    "stockmaster_admission_rejected_total",
+    "Requests answered with 429, by route class and reason (queue_full or timeout).",
+    ("route_class", "reason"),
+))
+ADMISSION_WAIT = registry.register(LabeledHistogram(
+    "stockmaster_admission_wait_seconds",
+    "Time admitted requests waited for a slot, by route class.",
+    ("route_class",),
+))
+
+
+class Rejected(Exception):
+    """Over capacity; ``retry_after`` is the suggested wait in seconds."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Slots and wait queues for each route class."""
+
+    def __init__(
+        self,
+        capacity: int,
+        write_reserve: int,
+        limits: dict[str, int],
+        queue_sizes: dict[str, int],
+        max_wait: float,
+    ):
+        self.capacity = capacity
+        self.write_reserve = write_reserve
+        self.limits = {name: limits.get(name, capacity) for name in PRIORITY}
+        self.queue_sizes = {name: queue_sizes.get(name, 0) for name in PRIORITY}
+        self.max_wait = max_wait
+        self.active = dict.fromkeys(PRIORITY, 0)
+        self.waiting: dict[str, deque[asyncio.Future]] = {name: deque() for name in PRIORITY}
+        # Moving average of time in the handler, for Retry-After
+        self.service_time = dict.fromkeys(PRIORITY, 0.1)
+
+    def _can_run(self, route_class: str) -> bool:
+        ceiling = self.capacity if route_class == WRITE else self.capacity - self.write_reserve
+        return self.active[route_class] < self.limits[route_class] and sum(self.active.values()) < ceiling
+
+    def retry_after(self, route_class: str) -> int:
+        """Seconds until the queue ahead has likely drained."""
+        ahead = len(self.waiting[route_class]) + 1
+        return max(1, math.ceil(ahead * self.service_time[route_class] / max(self.limits[route_class], 1)))
+
+    async def acquire(self, route_class: str) -> None:
+        """Take a slot, waiting in the class queue if needed; raise ``Rejected`` when over capacity."""
+        if not self.waiting[route_class] and self._can_run(route_class):
+            self.active[route_class] += 1
+            ADMISSION_WAIT.observe((route_class,), 0.0)
+            return
+        if len(self.waiting[route_class]) >= self.queue_sizes[route_class]:
+            ADMISSION_REJECTED.inc((route_class, "queue_full"))
+            raise Rejected("queue_full", self.retry_after(route_class))
+
+        start = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiting[route_class].append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as the wait ended: hand the slot on
+                self.release(route_class)
+            else:
+                waiter.cancel()
+                self.waiting[route_class].remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            ADMISSION_REJECTED.inc((route_class, "timeout"))
+            raise Rejected("timeout", self.retry_after(route_class))
+        ADMISSION_WAIT.observe((route_class,), time.perf_counter() - start)
+
+    def release(self, route_class: str, elapsed: Optional[float] = None) -> None:
+        """Give a slot back and admit queued requests in priority order."""
+        self.active[route_class] -= 1
+        if elapsed is not None:
+            self.service_time[route_class] += 0.1 * (elapsed - self.service_time[route_class])
+        for name in PRIORITY:
+            queue = self.waiting[name]
+            while queue and self._can_run(name):
+                waiter = queue.popleft()
+                self.active[name] += 1
+                waiter.set_result(None)
+
+
+def _matches(path: str, patterns: list[str]) -> bool:
+    return any(fnmatchcase(path, pattern) for pattern in patterns)
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    """Class of a request, None when it is exempt."""
+    if method == "OPTIONS" or _matches(path, settings.ADMISSION_EXEMPT_PATHS):
+        return None
+    if method in WRITE_METHODS:
+        return WRITE
+    if _matches(path, settings.ADMISSION_HEAVY_PATHS):
+        return HEAVY
+    return READ
+
+
+admission_controller = AdmissionController(
+    settings.ADMISSION_CAPACITY,
+    settings.ADMISSION_WRITE_RESERVE,
+    settings.ADMISSION_LIMITS,
+    settings.ADMISSION_QUEUE_SIZES,
+    settings.ADMISSION_MAX_WAIT_SECONDS,
+)
+
+registry.register(LabeledCallbackMetric(
+    "stockmaster_admission_queue_depth",
+    "Requests waiting for a slot, by route class.",
+    ("route_class",),
+    lambda: {(name,): len(queue) for name, queue in admission_controller.waiting.items()},
+))
+registry.register(LabeledCallbackMetric(
+    "stockmaster_admission_active",
+    "Requests holding a slot, by route class.",
+    ("route_class",),
+    lambda: {(name,): count for name, count in admission_controller.active.items()},
+))
+
+
+class AdmissionMiddleware:
+    """ASGI middleware holding a slot of the request's class for the whole response."""
+
+    def __init__(self, app, controller: AdmissionController = admission_controller):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        name = route_class(scope["method"], scope["path"])
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.controller.acquire(name)
+        except Rejected as e:
+            body = dumps({"detail": "Server is busy, retry later"})
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(e.retry_after).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(name, time.perf_counter() - start)
@@ -0,0 +1,170 @@
+"""In-process pub/sub for live stock updates.
+
+Routes publish a ``stock`` event for every inventory row they change, after
+committing. Server-sent event streams subscribe with optional location and
+product filters. Each subscriber reads from a bounded queue: one that falls
+behind loses its backlog and receives a single ``resync`` event instead, so a
+slow screen reloads current levels rather than holding memory or slowing the
+writers down. Recent events are kept so a reconnecting client can resume from
+its ``Last-Event-ID``.
+
+Events reach the subscribers of the worker process that published them. Event
+ids carry an epoch drawn when the process starts (``3f9c02ab-1234``): an id
+issued by another worker, or before a restart, does not resume a stream here
+but gets a ``resync``, since its number says nothing about this process's
+events.
+"""
+import asyncio
+import secrets
+from collections import deque
+from typing import Any, AsyncIterator, NamedTuple, Optional
+
+from app.core.config import settings
+from app.core.metrics import CallbackMetric, Counter, registry
+from app.core.responses import dumps
+
+
+STREAM_EVENTS = registry.register(Counter(
+    "stockmaster_stream_events_total",
+    "Live stock events by outcome per subscriber (delivered, or dropped when its queue was full).",
+    ("result",),
+))
+
+
+class StreamEvent(NamedTuple):
+    id: int
+    kind: str
+    data: dict[str, Any]
+
+
+# Sent in place of a backlog the subscriber could not keep up with
+RESYNC = StreamEvent(0, "resync", {})
+
+
+def stock_event(inventory) -> dict[str, Any]:
+    """Payload describing the current level of an inventory row."""
+    return {
+        "inventory_id": inventory.id,
+        "product_id": inventory.product_id,
+        "location_id": inventory.location_id,
+        "quantity": inventory.quantity,
+        "reorder_level": inventory.reorder_level,
+        "is_low_stock": inventory.quantity <= inventory.reorder_level,
+    }
+
+
+class Subscription:
+    """Events for one subscriber, filtered by location and product."""
+
+    def __init__(self, location_ids=None, product_ids=None, maxsize: int = 100):
+        self.location_ids = set(location_ids) if location_ids else None
+        self.product_ids = set(product_ids) if product_ids else None
+        self.queue: asyncio.Queue[StreamEvent] = asyncio.Queue(maxsize)
+
+    def matches(self, event: StreamEvent) -> bool:
+        if self.location_ids is not None and event.data.get("location_id") not in self.location_ids:
+            return False
+        if self.product_ids is not None and event.data.get("product_id") not in self.product_ids:
+            return False
+        return True
+
+    def offer(self, event: StreamEvent) -> None:
+        """Queue an event without waiting; on overflow replace the backlog with ``RESYNC``."""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            STREAM_EVENTS.inc(("dropped",), self.queue.qsize() + 1)
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+        else:
+            STREAM_EVENTS.inc(("delivered",))
+
+    async def get(self) -> StreamEvent:
+        return await self.queue.get()
+
+
+class StockBroker:
+    """Fans published events out to matching subscriptions."""
+
+    def __init__(self, queue_size: int, replay_size: int):
+        self.queue_size = queue_size
+        self.epoch = secrets.token_hex(4)
+        self._subscriptions: set[Subscription] = set()
+        self._recent: deque[StreamEvent] = deque(maxlen=replay_size)
+        self._last_id = 0
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
+
+    def event_id(self, event: StreamEvent) -> str:
+        """The id a client sees: the process epoch and the event's number."""
+        return f"{self.epoch}-{event.id}"
+
+    def _number(self, last_event_id: str) -> Optional[int]:
+        """Number of an event id issued by this process, None for any other id."""
+        epoch, _, number = last_event_id.partition("-")
+        return int(number) if epoch == self.epoch and number.isdigit() else None
+
+    def subscribe(self, location_ids=None, product_ids=None, last_event_id: Optional[str] = None) -> Subscription:
+        """Start receiving events, replaying those after ``last_event_id`` when still kept."""
+        subscription = Subscription(location_ids, product_ids, self.queue_size)
+        number = self._number(last_event_id) if last_event_id is not None else None
+        if last_event_id is not None and number != self._last_id:
+            oldest = self._recent[0].id if self._recent else self._last_id + 1
+            if number is None or not oldest - 1 <= number < self._last_id:
+                # Missed events are gone, or the id is from another worker or before a restart
+                subscription.offer(RESYNC)
+            else:
+                for event in self._recent:
+                    if event.id > number and subscription.matches(event):
+                        subscription.offer(event)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscriptions.discard(subscription)
+
+    def publish(self, kind: str, data: dict[str, Any]) -> None:
+        """Deliver an event to every matching subscriber. Call after committing."""
+        self._last_id += 1
+        event = StreamEvent(self._last_id, kind, data)
+        self._recent.append(event)
+        for subscription in self._subscriptions:
+            if subscription.matches(event):
+                subscription.offer(event)
+
+    def publish_stock(self, *inventories) -> None:
+        """Publish the current level of each changed inventory row."""
+        for inventory in inventories:
+            self.publish("stock", stock_event(inventory))
+
+    async def server_sent_events(
+        self,
+        location_ids=None,
+        product_ids=None,
+        last_event_id: Optional[str] = None,
+        keepalive: float = 15.0,
+    ) -> AsyncIterator[bytes]:
+        """Subscribe and yield events in ``text/event-stream`` framing until cancelled."""
+        subscription = self.subscribe(location_ids, product_ids, last_event_id)
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), keepalive)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                frame = f"id: {self.event_id(event)}\n".encode() if event.id else b""
+                yield frame + b"event: " + event.kind.encode() + b"\ndata: " + dumps(event.data) + b"\n\n"
+        finally:
+            self.unsubscribe(subscription)
+
+
+stock_broker = StockBroker(settings.STREAM_QUEUE_SIZE, settings.STREAM_REPLAY_SIZE)
+
+registry.register(CallbackMetric(
+    "stockmaster_stream_subscribers",
+    "Live stock streams currently open in this process.",
+    lambda: len(stock_broker),
+))
@@ -0,0 +1,239 @@
+"""Tag-based response cache.
+
+Each entry records the version of every tag it depends on (``"suppliers"``,
+``"supplier:5"``, ...). Writes bump the versions of the tags they affect, which
+makes every dependent entry stale at once without scanning keys. Concurrent
+misses for the same key share a single load, so a hot entry expiring does not
+send a burst of identical queries to the database.
+
+Only loads from the primary are stored. Versions are bumped as soon as a
+write commits, when a replica may not have it yet: a load from the replica
+would file pre-write data under post-write versions, and serve it to every
+client, the writer included, until the next change.
+"""
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Iterable, Optional
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+from app.core.coalesce import SingleFlight
+from app.core.config import settings
+from app.core.events import invalidation_bus
+from app.core.metrics import Counter, registry
+
+
+CACHE_REQUESTS = registry.register(Counter(
+    "stockmaster_cache_requests_total",
+    "Response cache lookups by result (hit, miss, coalesced).",
+    ("result",),
+))
+
+
+@dataclass
+class CacheEntry:
+    payload: bytes
+    versions: dict[str, int]
+
+
+class CacheBackend(ABC):
+    """Storage for cache entries and tag versions."""
+
+    # Whether every worker sees the same tag versions
+    shared = False
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, entry: CacheEntry, ttl: int) -> None:
+        ...
+
+    @abstractmethod
+    async def get_tag_versions(self, tags: Iterable[str]) -> dict[str, int]:
+        ...
+
+    @abstractmethod
+    async def bump_tags(self, tags: Iterable[str]) -> None:
+        ...
+
+    @abstractmethod
+    async def clear(self) -> None:
+        ...
+
+
+class MemoryBackend(CacheBackend):
+    """Per-process LRU backend."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, CacheEntry]] = OrderedDict()
+        self._tags: dict[str, int] = {}
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires_at, entry = item
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    async def set(self, key: str, entry: CacheEntry, ttl: int) -> None:
+        self._entries[key] = (time.monotonic() + ttl, entry)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_tag_versions(self, tags: Iterable[str]) -> dict[str, int]:
+        return {tag: self._tags.get(tag, 0) for tag in tags}
+
+    async def bump_tags(self, tags: Iterable[str]) -> None:
+        for tag in tags:
+            self._tags[tag] = self._tags.get(tag, 0) + 1
+
+    async def clear(self) -> None:
+        self._entries.clear()
+        self._tags.clear()
+
+
+class RedisBackend(CacheBackend):
+    """Backend shared by all workers, requires the optional ``redis`` package."""
+
+    shared = True
+
+    def __init__(self, url: str, prefix: str = "stockmaster:cache:"):
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package") from e
+        self._redis = redis_asyncio.from_url(url)
+        self._prefix = prefix
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        raw = await self._redis.get(self._prefix + "entry:" + key)
+        if raw is None:
+            return None
+        header, _, payload = raw.partition(b"\n")
+        return CacheEntry(payload=payload, versions=json.loads(header))
+
+    async def set(self, key: str, entry: CacheEntry, ttl: int) -> None:
+        raw = json.dumps(entry.versions).encode() + b"\n" + entry.payload
+        await self._redis.set(self._prefix + "entry:" + key, raw, ex=ttl)
+
+    async def get_tag_versions(self, tags: Iterable[str]) -> dict[str, int]:
+        tags = list(tags)
+        if not tags:
+            return {}
+        values = await self._redis.mget([self._prefix + "tag:" + tag for tag in tags])
+        return {tag: int(value or 0) for tag, value in zip(tags, values)}
+
+    async def bump_tags(self, tags: Iterable[str]) -> None:
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for tag in tags:
+                pipe.incr(self._prefix + "tag:" + tag)
+            await pipe.execute()
+
+    async def clear(self) -> None:
+        async for key in self._redis.scan_iter(match=self._prefix + "*"):
+            await self._redis.delete(key)
+
+
+class ResponseCache:
+    """Caches serialized responses and invalidates them by tag."""
+
+    def __init__(self, backend: CacheBackend, ttl: int, enabled: bool = True):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+        self._flight = SingleFlight()
+
+    async def get_or_load(
+        self,
+        key: str,
+        tags: Iterable[str],
+        loader: Callable[[], Awaitable[BaseModel]],
+        ttl: Optional[int] = None,
+        store: bool = True,
+    ) -> bytes:
+        """Return the cached JSON payload for ``key``, loading it at most once.
+
+        ``store`` is False when the loader reads from a replica: its payload is
+        returned but not kept.
+        """
+        if not self.enabled:
+            return (await loader()).model_dump_json().encode()
+
+        tags = tuple(tags)
+        # Versions are read before loading, so a write racing with the load
+        # leaves the stored entry already stale instead of hiding the change.
+        versions = await self.backend.get_tag_versions(tags)
+        entry = await self.backend.get(key)
+        if entry is not None and entry.versions == versions:
+            CACHE_REQUESTS.inc(("hit",))
+            return entry.payload
+
+        async def load() -> bytes:
+            payload = (await loader()).model_dump_json().encode()
+            if store:
+                await self.backend.set(key, CacheEntry(payload, versions), ttl or self.ttl)
+            return payload
+
+        # Replica and primary loads are not shared: a client reading the
+        # primary must not get what a replica returned
+        payload, shared = await self._flight.run((key, store), load)
+        CACHE_REQUESTS.inc(("coalesced" if shared else "miss",))
+        return payload
+
+    async def response(
+        self,
+        key: str,
+        tags: Iterable[str],
+        loader: Callable[[], Awaitable[BaseModel]],
+        ttl: Optional[int] = None,
+        headers: Optional[dict[str, str]] = None,
+        store: bool = True,
+    ) -> Response:
+        """Like ``get_or_load`` but wrapped in a JSON response."""
+        payload = await self.get_or_load(key, tags, loader, ttl, store)
+        return Response(content=payload, media_type="application/json", headers=headers)
+
+    async def invalidate(self, *tags: str) -> None:
+        """Mark every entry depending on any of ``tags`` as stale."""
+        if self.enabled and tags:
+            await self.backend.bump_tags(tags)
+
+    async def on_change(self, tags: tuple[str, ...], local: bool) -> None:
+        """Invalidation bus subscriber.
+
+        A shared backend is bumped once, by the worker that made the change.
+        """
+        if local or not self.backend.shared:
+            await self.invalidate(*tags)
+
+
+def request_cache_key(request: Request) -> str:
+    """Cache key from the request path and its sorted query parameters."""
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    return f"{request.url.path}?{query}"
+
+
+def _create_backend() -> CacheBackend:
+    if settings.CACHE_BACKEND == "redis":
+        return RedisBackend(settings.CACHE_REDIS_URL)
+    return MemoryBackend(settings.CACHE_MAX_ENTRIES)
+
+
+response_cache = ResponseCache(
+    _create_backend(),
+    ttl=settings.CACHE_TTL_SECONDS,
+    enabled=settings.CACHE_ENABLED,
+)
+invalidation_bus.subscribe(response_cache.on_change)
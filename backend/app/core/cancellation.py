@@ -0,0 +1,91 @@
+"""Stop work for requests whose client has gone away.
+
+The middleware runs the request handler as a task and keeps reading the
+ASGI receive channel alongside it. When the client disconnects before the
+response is complete, the handler task is cancelled: a query in flight is
+interrupted (asyncpg asks the server to cancel it), streaming generators
+and dependency cleanups run, and the pooled connection is returned instead
+of being held until the work would have finished.
+
+Only reads are cancelled. A write goes on to its end once started: cancelled
+at its commit it would leave the client not knowing whether it happened, and
+cancelled just after, it would skip invalidating this worker's caches and
+publishing to stock streams.
+
+A cancelled request that had not started its response is answered with the
+nginx-style status 499, which the server drops but the metrics record.
+"""
+import asyncio
+
+from app.core.admission import WRITE_METHODS
+from app.core.instrumentation import route_template
+from app.core.metrics import Counter, registry
+
+
+CLIENT_CLOSED_REQUEST = 499
+
+REQUESTS_CANCELLED = registry.register(Counter(
+    "stockmaster_http_requests_cancelled_total",
+    "Requests cancelled because the client disconnected before the response completed.",
+    ("method", "route"),
+))
+
+
+class CancelOnDisconnectMiddleware:
+    """ASGI middleware cancelling a read's handler when the client disconnects mid-request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in WRITE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        messages: asyncio.Queue = asyncio.Queue()
+        response_started = False
+        response_complete = False
+
+        async def receive_forwarded():
+            message = await messages.get()
+            if message["type"] == "http.disconnect":
+                # Keep answering disconnect to anything that asks again
+                messages.put_nowait(message)
+            return message
+
+        async def send_wrapper(message):
+            nonlocal response_started, response_complete
+            await send(message)
+            if message["type"] == "http.response.start":
+                response_started = True
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_complete = True
+
+        async def watch():
+            while True:
+                message = await receive()
+                messages.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    return
+
+        handler = asyncio.create_task(self.app(scope, receive_forwarded, send_wrapper))
+        watcher = asyncio.create_task(watch())
+        try:
+            await asyncio.wait((handler, watcher), return_when=asyncio.FIRST_COMPLETED)
+            if not handler.done() and not response_complete:
+                handler.cancel()
+                REQUESTS_CANCELLED.inc((scope["method"], route_template(scope)))
+                try:
+                    await handler
+                except asyncio.CancelledError:
+                    pass
+                if not response_started:
+                    await send({"type": "http.response.start", "status": CLIENT_CLOSED_REQUEST, "headers": []})
+                    await send({"type": "http.response.body", "body": b""})
+                return
+            # Finished, or past its response (background tasks still run)
+            await handler
+        finally:
+            watcher.cancel()
+            if not handler.done():
+                handler.cancel()
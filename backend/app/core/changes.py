@@ -0,0 +1,331 @@
+"""Change log behind the delta-sync feed for store clients.
+
+Every flush that creates, updates or deletes a product, inventory row or
+location appends ``(entity, entity_id)`` rows to ``change_log`` in the same
+transaction. Rows whose response embeds the changed one are logged too: a
+product's inventory rows when it is renamed, and the product and location
+totals when stock moves. Editing a category, supplier or location can reach
+thousands of rows, so the flush logs a single marker row instead and
+``ChangeSequencer`` expands it into the dependent rows in batches, outside
+the request. A delete still logs its dependents in the flush, while they can
+be found before the foreign key nulls or removes them.
+
+The feed reads the log after a client's last ``version`` and returns the
+current state of each entity it names; an entity that no longer exists is a
+delete. Versions must become visible in order, or a client that has seen N
+could later find a committed change below N. Writers therefore append rows
+without one and ``ChangeSequencer`` numbers rows once they are committed, in
+batches after the highest version so far: a transaction committing later is
+numbered later. On SQLite, where writers are serialized, the writing
+transaction numbers its own rows.
+
+The feed skips markers. The sequencer also compacts the log: a row followed by a later change to the
+same entity tells a client nothing the later row does not, so it is removed.
+The log stays about as large as the number of synced rows, with the last row
+of a deleted entity kept so clients that knew it still learn of the delete.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Optional
+
+from sqlalchemy import and_, delete, event, exists, func, insert, literal, select, update
+from sqlalchemy.orm import aliased
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import engine
+from app.models.category import Category
+from app.models.change_log import ChangeLog
+from app.models.inventory import Inventory
+from app.models.location import Location
+from app.models.product import Product
+from app.models.supplier import Supplier
+
+
+logger = logging.getLogger(__name__)
+
+# Synced models and their entity names in the feed
+ENTITIES = {Product: "products", Inventory: "inventory", Location: "locations"}
+
+# Marker entities, with the rows an edit is expanded into: model, referencing column, entity
+FAN_OUT = {
+    "category": (Product, Product.category_id, "products"),
+    "supplier": (Product, Product.supplier_id, "products"),
+    "location": (Inventory, Inventory.location_id, "inventory"),
+}
+MARKERS = {Category: "category", Supplier: "supplier", Location: "location"}
+
+# Held by the sequencer numbering rows, so two workers never assign the same versions
+_SEQUENCER_LOCK_KEY = 0x73796E63  # "sync"
+# Held while expanding markers, so two workers never log the same dependents
+_EXPANDER_LOCK_KEY = 0x6578706E  # "expn"
+
+
+def _pending(session: Session) -> defaultdict:
+    return session.info.setdefault("changed_entities", defaultdict(set))
+
+
+def _log_stock(pending: defaultdict, inventory: Inventory) -> None:
+    pending["inventory"].add(inventory.id)
+    pending["products"].add(inventory.product_id)
+    pending["locations"].add(inventory.location_id)
+
+
+def _ids(connection, query) -> list[int]:
+    return list(connection.execute(query).scalars())
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_updates(session, flush_context, instances):
+    # Updated and deleted rows still have their keys, and dependent rows must be
+    # looked up before a delete cascades or nulls them
+    pending = _pending(session)
+    connection = session.connection()
+    changed = [obj for obj in session.dirty if session.is_modified(obj, include_collections=False)]
+    for obj in changed + list(session.deleted):
+        if isinstance(obj, Product):
+            pending["products"].add(obj.id)
+            pending["inventory"].update(_ids(connection, select(Inventory.id).where(Inventory.product_id == obj.id)))
+        elif isinstance(obj, Inventory):
+            _log_stock(pending, obj)
+        elif isinstance(obj, Location):
+            pending["locations"].add(obj.id)
+
+        marker = MARKERS.get(type(obj))
+        if marker is None:
+            continue
+        if obj in session.deleted:
+            model, column, entity = FAN_OUT[marker]
+            pending[entity].update(_ids(connection, select(model.id).where(column == obj.id)))
+        else:
+            pending[marker].add(obj.id)
+
+
+@event.listens_for(Session, "after_flush")
+def _write_change_log(session, flush_context):
+    pending = _pending(session)
+    for obj in session.new:
+        if isinstance(obj, Inventory):
+            _log_stock(pending, obj)
+        elif type(obj) in ENTITIES:
+            pending[ENTITIES[type(obj)]].add(obj.id)
+
+    rows = [
+        {"entity": entity, "entity_id": entity_id}
+        for entity, ids in sorted(pending.items())
+        for entity_id in sorted(ids)
+        if entity_id is not None
+    ]
+    pending.clear()
+    if not rows:
+        return
+
+    connection = session.connection()
+    connection.execute(insert(ChangeLog), rows)
+    if connection.dialect.name != "postgresql":
+        _number_own_rows(connection)
+
+
+def _number_own_rows(connection) -> None:
+    """Version this transaction's rows by ``seq``; only valid where writers are serialized."""
+    connection.execute(update(ChangeLog).where(ChangeLog.version.is_(None)).values(version=ChangeLog.seq))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop("changed_entities", None)
+
+
+async def backfill_change_log() -> None:
+    """Log every existing row once if the change log is empty, so version 0 is a full sync."""
+    async with engine.begin() as conn:
+        if await conn.scalar(select(ChangeLog.seq).limit(1)) is not None:
+            return
+        for model, entity in ENTITIES.items():
+            await conn.execute(
+                insert(ChangeLog).from_select(
+                    ["entity", "entity_id"],
+                    select(literal(entity), model.id).order_by(model.id),
+                )
+            )
+        if conn.dialect.name != "postgresql":
+            await conn.run_sync(_number_own_rows)
+
+
+async def changes_since(
+    db: AsyncSession, since: int, limit: int
+) -> tuple[dict[str, set[int]], int, bool]:
+    """Return the entity ids changed after ``since``, the version reached and whether more remain."""
+    result = await db.execute(
+        select(ChangeLog.version, ChangeLog.entity, ChangeLog.entity_id)
+        .where(ChangeLog.version > since, ChangeLog.entity.in_(ENTITIES.values()))
+        .order_by(ChangeLog.version)
+        .limit(limit + 1)
+    )
+    rows = result.all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    changed: dict[str, set[int]] = {entity: set() for entity in ENTITIES.values()}
+    for _, entity, entity_id in rows:
+        changed[entity].add(entity_id)
+    version = rows[-1].version if rows else since
+    return changed, version, has_more
+
+
+async def latest_version(db: AsyncSession) -> int:
+    """Highest version in the change log, 0 when it is empty."""
+    return await db.scalar(select(func.coalesce(func.max(ChangeLog.version), 0)))
+
+
+def _number_rows(batch_size: int):
+    """Version the oldest unnumbered rows after the highest version, in ``seq`` order."""
+    pending = (
+        select(ChangeLog.seq).where(ChangeLog.version.is_(None)).order_by(ChangeLog.seq).limit(batch_size)
+    ).cte("pending")
+    highest = select(func.coalesce(func.max(ChangeLog.version), 0)).scalar_subquery()
+    numbered = select(
+        pending.c.seq, (highest + func.row_number().over(order_by=pending.c.seq)).label("version")
+    ).cte("numbered")
+    return update(ChangeLog).where(ChangeLog.seq == numbered.c.seq).values(version=numbered.c.version)
+
+
+class ChangeSequencer:
+    """Background task numbering committed change log rows, expanding markers and compacting the log."""
+
+    def __init__(self, interval: float, compact_interval: float, batch_size: int):
+        self.interval = interval
+        self.compact_interval = compact_interval
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def sequence(self) -> int:
+        """Number the committed rows still without a version, returning how many were numbered.
+
+        Only PostgreSQL leaves rows unnumbered. The advisory lock is taken in
+        its own statement, so the update's snapshot is taken after it and sees
+        every version assigned by the previous holder.
+        """
+        if engine.dialect.name != "postgresql":
+            return 0
+        numbered = 0
+        while True:
+            async with engine.begin() as conn:
+                if not await conn.scalar(select(func.pg_try_advisory_xact_lock(_SEQUENCER_LOCK_KEY))):
+                    return numbered  # Another worker is numbering
+                count = (await conn.execute(_number_rows(self.batch_size))).rowcount
+            numbered += count
+            if count < self.batch_size:
+                return numbered
+
+    async def expand(self) -> int:
+        """Log the rows referencing each marked entity, returning how many rows were logged.
+
+        Dependents are read in batches of ``batch_size``, each logged in its
+        own transaction, and the marker is removed with the last batch. On
+        PostgreSQL a session advisory lock keeps a single worker expanding; if
+        it dies midway the next one starts the marker over, and compaction
+        removes the rows logged twice.
+        """
+        async with engine.connect() as conn:
+            postgres = conn.dialect.name == "postgresql"
+            if postgres:
+                locked = await conn.scalar(select(func.pg_try_advisory_lock(_EXPANDER_LOCK_KEY)))
+                await conn.commit()
+                if not locked:
+                    return 0  # Another worker is expanding
+            try:
+                logged = 0
+                while True:
+                    marker = (await conn.execute(
+                        select(ChangeLog.seq, ChangeLog.entity, ChangeLog.entity_id)
+                        .where(ChangeLog.entity.in_(FAN_OUT))
+                        .order_by(ChangeLog.seq)
+                        .limit(1)
+                    )).first()
+                    await conn.commit()
+                    if marker is None:
+                        return logged
+                    logged += await self._expand_marker(conn, marker)
+            finally:
+                if postgres:
+                    await conn.execute(select(func.pg_advisory_unlock(_EXPANDER_LOCK_KEY)))
+                    await conn.commit()
+
+    async def _expand_marker(self, conn, marker) -> int:
+        model, column, entity = FAN_OUT[marker.entity]
+        after = 0
+        logged = 0
+        while True:
+            async with conn.begin():
+                ids = list((await conn.execute(
+                    select(model.id)
+                    .where(column == marker.entity_id, model.id > after)
+                    .order_by(model.id)
+                    .limit(self.batch_size)
+                )).scalars())
+                if ids:
+                    await conn.execute(insert(ChangeLog), [{"entity": entity, "entity_id": entity_id} for entity_id in ids])
+                if len(ids) < self.batch_size:
+                    await conn.execute(delete(ChangeLog).where(ChangeLog.seq == marker.seq))
+                if conn.dialect.name != "postgresql":
+                    await conn.run_sync(_number_own_rows)
+            logged += len(ids)
+            if len(ids) < self.batch_size:
+                return logged
+            after = ids[-1]
+
+    async def compact(self) -> int:
+        """Remove rows superseded by a later change to the same entity, returning how many."""
+        later = aliased(ChangeLog)
+        superseded = select(ChangeLog.seq).where(
+            ChangeLog.version.is_not(None),
+            exists().where(and_(
+                later.entity == ChangeLog.entity,
+                later.entity_id == ChangeLog.entity_id,
+                later.version > ChangeLog.version,
+            )),
+        ).limit(self.batch_size)
+        removed = 0
+        while True:
+            async with engine.begin() as conn:
+                count = (await conn.execute(delete(ChangeLog).where(ChangeLog.seq.in_(superseded)))).rowcount
+            removed += count
+            if count < self.batch_size:
+                return removed
+
+    async def _run_forever(self) -> None:
+        loop = asyncio.get_running_loop()
+        compact_at = loop.time() + self.compact_interval
+        while True:
+            try:
+                await self.sequence()
+                expanded = await self.expand()
+                if expanded:
+                    logger.info("Expanded entity-level changes into %d change log row(s)", expanded)
+                if self.compact_interval > 0 and loop.time() >= compact_at:
+                    compact_at = loop.time() + self.compact_interval
+                    removed = await self.compact()
+                    if removed:
+                        logger.info("Compacted the change log, %d superseded row(s) removed", removed)
+            except Exception:
+                logger.exception("Change sequencer failed, retrying in %.0fs", self.interval)
+            await asyncio.sleep(self.interval)
+
+
+change_sequencer = ChangeSequencer(settings.SYNC_SEQUENCE_SECONDS, settings.SYNC_COMPACT_SECONDS, settings.SYNC_BATCH_SIZE)
@@ -0,0 +1,115 @@
+"""Single-flight execution for identical concurrent reads.
+
+While a call for a key is running, later callers with the same key wait for
+it and share its result (or exception) instead of repeating the work. Routes
+use it through ``coalesce_requests``, keyed by method, path, query string,
+the caller's role and whether the session reads the primary, so callers only
+ever share results they may all see, no staler than their own read would be.
+"""
+import asyncio
+import functools
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import reads_primary
+from app.core.instrumentation import route_template
+from app.core.metrics import Counter, registry
+
+
+COALESCED_REQUESTS = registry.register(Counter(
+    "stockmaster_coalesced_requests_total",
+    "Coalesced GET requests by route and result (leader ran the handler, follower shared it).",
+    ("route", "result"),
+))
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent callers share its outcome."""
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        """Return ``(result, shared)``, where ``shared`` is True if another caller ran ``fn``."""
+        while True:
+            future = self._calls.get(key)
+            if future is None:
+                break
+            try:
+                return await asyncio.shield(future), True
+            except asyncio.CancelledError:
+                if not future.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                # The leading caller was cancelled, take over its work
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else is waiting
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+
+_route_flights = SingleFlight()
+
+
+def request_scope(current_user) -> str:
+    """Permission scope a shared result is valid for."""
+    role = getattr(current_user, "role", None)
+    return getattr(role, "value", str(role))
+
+
+async def coalesced(
+    request: Request,
+    current_user,
+    db: AsyncSession,
+    loader: Callable[[], Awaitable[Any]],
+    extra_key: Hashable = None,
+) -> Any:
+    """Run ``loader`` once for identical concurrent requests and share its result.
+
+    ``db`` is the session ``loader`` reads through: a client pinned to the
+    primary never shares a replica read. ``extra_key`` narrows sharing
+    further, e.g. to callers that saw the same ETag.
+    """
+    key = (
+        request.method,
+        request.url.path,
+        tuple(sorted(request.query_params.multi_items())),
+        request_scope(current_user),
+        reads_primary(db),
+        extra_key,
+    )
+    result, shared = await _route_flights.run(key, loader)
+    COALESCED_REQUESTS.inc((route_template(request.scope), "follower" if shared else "leader"))
+    return result
+
+
+def coalesce_requests(func):
+    """Route decorator sharing one execution between identical concurrent requests.
+
+    The route must take ``request: Request``, ``db`` and ``current_user`` parameters.
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        request: Optional[Request] = kwargs.get("request")
+        if request is None:
+            return await func(*args, **kwargs)
+        return await coalesced(request, kwargs.get("current_user"), kwargs["db"], lambda: func(*args, **kwargs))
+    return wrapper
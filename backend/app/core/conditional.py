@@ -0,0 +1,65 @@
+"""Conditional GET support for collections that clients poll.
+
+Validators come from the ``entity_versions`` rows of the invalidation tags a
+response is built from: every write route commits through the invalidation
+bus, which bumps the versions of the collection tags it changes right after
+the change commits, deletions included. Versions are read before the rows, so
+a response goes with data at least as new as its validator: a client may
+fetch a collection once more than needed, but never keeps stale data, and a
+replica replays the bump after the change. Reading them is a primary-key
+lookup, cheap enough for every poll. When the client's ``If-None-Match`` still
+matches, the route answers 304 before loading any rows. ``Last-Modified`` is
+the time of the latest of those changes, sent for information only.
+"""
+import hashlib
+from datetime import timezone
+from email.utils import format_datetime
+from typing import Optional
+
+from fastapi import Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.entity_version import EntityVersion
+
+
+async def collection_validators(request: Request, db: AsyncSession, *tags: str) -> dict[str, str]:
+    """Build ``ETag``/``Last-Modified`` headers for a response built from the data behind ``tags``."""
+    result = await db.execute(
+        select(EntityVersion.tag, EntityVersion.version, EntityVersion.updated_at)
+        .where(EntityVersion.tag.in_(tags))
+    )
+    rows = {tag: (version, updated_at) for tag, version, updated_at in result}
+    # Tags never written have no row yet and count as version 0
+    versions = tuple((tag, rows[tag][0] if tag in rows else 0) for tag in sorted(tags))
+
+    digest = hashlib.sha1()
+    digest.update(request.url.path.encode())
+    digest.update(str(sorted(request.query_params.multi_items())).encode())
+    digest.update(repr(versions).encode())
+    headers = {
+        "ETag": f'W/"{digest.hexdigest()[:32]}"',
+        "Cache-Control": "private, no-cache",
+    }
+
+    if rows:
+        last_modified = max(updated_at for _, updated_at in rows.values()).replace(tzinfo=timezone.utc)
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    return headers
+
+
+def _opaque_tag(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def not_modified(request: Request, validators: dict[str, str]) -> Optional[Response]:
+    """Return a 304 response if the client's ``If-None-Match`` matches the current ETag."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return None
+    current = _opaque_tag(validators["ETag"])
+    candidates = [_opaque_tag(tag) for tag in if_none_match.split(",")]
+    if "*" in candidates or current in candidates:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validators)
+    return None
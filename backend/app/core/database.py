@@ -1,16 +1,82 @@
+import time
+from typing import Any
+from fastapi import Request
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.orm import DeclarativeBase, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from app.core.admission import READ, route_class
 from app.core.config import settings
+from app.core.metrics import Histogram
+from app.core.security import decode_token
+from app.core.tracing import span, start_span
+
+
+# SQLSTATE of a statement cancelled by statement_timeout or a cancel request
+QUERY_CANCELED = "57014"
+
+class PoolStats:
+    """Checkout wait times and timeouts observed on the instrumented pool."""
+
+    def __init__(self):
+        self.wait_time = Histogram()
+        self.timeouts = 0
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Async queue pool that records how long callers wait for a connection."""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            pool_stats.timeouts += 1
+            raise
+        finally:
+            pool_stats.wait_time.observe(time.perf_counter() - start)
+
+
+def engine_options(url: str) -> dict[str, Any]:
+    """Build pool and driver options for an engine URL from settings."""
+    options: dict[str, Any] = {"echo": settings.DEBUG, "future": True}
+    url_obj = make_url(url)
+    if url_obj.get_backend_name() == "sqlite" and url_obj.database in (None, "", ":memory:"):
+        # In-memory SQLite uses a single static connection, pool sizing does not apply
+        return options
+
+    options.update(
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+    if url_obj.get_driver_name() == "asyncpg":
+        options["connect_args"] = {
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        }
+    return options
 
 
 # Create async engine
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=settings.DEBUG,
-    future=True,
-)
+engine = create_async_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+
+# Read engine: the replica when configured, otherwise the primary
+if settings.DATABASE_REPLICA_URL:
+    read_engine = create_async_engine(
+        settings.DATABASE_REPLICA_URL, **engine_options(settings.DATABASE_REPLICA_URL)
+    )
+else:
+    read_engine = engine
 
-# Session factory
+# Session factories
 async_session_maker = async_sessionmaker(
     engine,
     class_=AsyncSession,
@@ -19,26 +85,179 @@ async_session_maker = async_sessionmaker(
     autoflush=False,
 )
 
+async_read_session_maker = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autocommit=False,
+    autoflush=False,
+)
+
+
+class PrimaryPins:
+    """Clients that wrote recently and must read from the primary for a while.
+
+    Replicas lag behind the primary, so a client that just committed is pinned
+    to the primary for ``ttl`` seconds to keep read-your-writes consistency.
+    Pins are kept per process.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._until: dict[str, float] = {}
+
+    def pin(self, key: str) -> None:
+        """Route reads for this client to the primary for the next ``ttl`` seconds."""
+        now = time.monotonic()
+        if len(self._until) >= self.max_entries:
+            self._until = {k: v for k, v in self._until.items() if v > now}
+        self._until[key] = now + self.ttl
+
+    def is_pinned(self, key: str) -> bool:
+        """Check whether a client's reads must still go to the primary."""
+        until = self._until.get(key)
+        if until is None:
+            return False
+        if until <= time.monotonic():
+            self._until.pop(key, None)
+            return False
+        return True
+
+
+primary_pins = PrimaryPins(settings.DB_PRIMARY_PIN_SECONDS)
+
+
+def client_key(request: Request) -> str:
+    """Identify a client by the user its bearer token names, falling back to its address.
+
+    Keyed on the ``sub`` claim rather than the header, so pins hold no
+    credentials and cover every token of the user that wrote.
+    """
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        payload = decode_token(token)
+        if payload is not None and payload.get("sub") is not None:
+            return f"user:{payload['sub']}"
+    return request.client.host if request.client else ""
+
+
+def statement_timeout(request: Request) -> float:
+    """Statement timeout in seconds for the request's admission route class, 0 for none."""
+    return settings.DB_STATEMENT_TIMEOUTS.get(route_class(request.method, request.url.path) or READ, 0)
+
+
+@event.listens_for(Session, "after_begin")
+def _set_statement_timeout(session, transaction, connection):
+    timeout = session.info.get("statement_timeout")
+    if timeout and connection.dialect.name == "postgresql":
+        # SET LOCAL lasts until the transaction ends, so pooled connections are unaffected
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout * 1000)}")
+
+
+def is_statement_timeout(error: exc.DBAPIError) -> bool:
+    """Whether PostgreSQL cancelled the statement (statement_timeout or a cancel request)."""
+    return getattr(error.orig, "sqlstate", None) == QUERY_CANCELED or getattr(error.orig, "pgcode", None) == QUERY_CANCELED
+
+
+@event.listens_for(Session, "after_flush")
+def _flag_writes(session, flush_context):
+    session.info["has_writes"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _pin_writer(session):
+    if session.info.pop("has_writes", False) and "client_key" in session.info:
+        primary_pins.pin(session.info["client_key"])
+
 
 class Base(DeclarativeBase):
     """Base class for all SQLAlchemy models."""
     pass
 
 
-async def get_db() -> AsyncSession:
+async def get_db(request: Request) -> AsyncSession:
     """Dependency to get database session."""
+    session_span = start_span("get_db")
     async with async_session_maker() as session:
+        session.info["client_key"] = client_key(request)
+        session.info["statement_timeout"] = statement_timeout(request)
         try:
             yield session
-            await session.commit()
-        except Exception:
+            with span("commit", parent=session_span):
+                await session.commit()
+        except Exception as e:
+            if session_span is not None:
+                session_span.fail(e)
             await session.rollback()
             raise
         finally:
             await session.close()
+            if session_span is not None:
+                session_span.finish()
+
+
+def read_session_maker(request: Request) -> async_sessionmaker:
+    """Session factory for a request's reads.
+
+    The replica unless the client wrote recently, in which case it is pinned
+    to the primary so it sees its own changes.
+    """
+    if read_engine is not engine and not primary_pins.is_pinned(client_key(request)):
+        return async_read_session_maker
+    return async_session_maker
+
+
+def reads_primary(session: AsyncSession) -> bool:
+    """Whether a session reads from the primary, and so sees every committed write."""
+    return session.bind is engine
+
+
+async def get_read_db(request: Request) -> AsyncSession:
+    """Dependency to get a read-only session without the trailing commit."""
+    session_span = start_span("get_read_db")
+    async with read_session_maker(request)() as session:
+        session.info["statement_timeout"] = statement_timeout(request)
+        try:
+            yield session
+        finally:
+            await session.close()
+            if session_span is not None:
+                session_span.finish()
 
 
 async def init_db():
-    """Initialize database tables."""
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    """Create or migrate the database schema to the latest revision, or only check it when migrations are a deploy step."""
+    from app.core.migrations import check_schema, upgrade_schema
+    
+    async with engine.connect() as conn:
+        await conn.run_sync(upgrade_schema if settings.DB_MIGRATE_ON_STARTUP else check_schema)
+
+
+async def dispose_engines():
+    """Close pooled connections on the primary and replica engines."""
+    await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
+
+
+def get_pool_stats() -> dict[str, Any]:
+    """Report current pool occupancy together with checkout wait statistics."""
+    pool = engine.pool
+    stats: dict[str, Any] = {
+        "pool_class": type(pool).__name__,
+        "size": None,
+        "checked_in": None,
+        "checked_out": None,
+        "overflow": None,
+        "timeouts": pool_stats.timeouts,
+        "wait_time": pool_stats.wait_time.snapshot(),
+    }
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+        )
+    return stats
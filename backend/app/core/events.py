@@ -0,0 +1,280 @@
+"""Invalidation bus broadcasting entity changes to every worker.
+
+Write routes commit through the bus with the tags a change affects
+(``"suppliers"``, ``"supplier:5"``, ...), and in-process caches subscribe to
+drop what went stale. Entity tags, the ones with a colon, get a new version in
+their ``entity_versions`` row in the transaction of the change, so versions
+and data commit together and a failed announcement fails the write instead of
+leaving caches stale. Collection tags (``"suppliers"``, ``"inventory"``) are
+shared by every write to the collection: locking their rows until commit
+would queue all those writes behind one another, so they are stamped in a
+short transaction of their own right after the change commits. A version read
+before the stamp then only ever goes with data at least as new.
+
+The bus then delivers in-process. On PostgreSQL versions come from a global
+sequence, and a NOTIFY queued in the transaction of the change tells the other
+workers about all its tags once it commits. Workers compare recent versions
+after reconnecting and every ``EVENTS_RESYNC_SECONDS``, which catches changes
+announced while they were not listening.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from datetime import timedelta
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import engine
+from app.core.metrics import Counter, registry
+from app.models.entity_version import EntityVersion, entity_version_seq
+
+
+logger = logging.getLogger(__name__)
+
+# Called with the changed tags and whether the change was made by this worker
+Subscriber = Callable[[tuple[str, ...], bool], Awaitable[None]]
+
+EVENTS_TOTAL = registry.register(Counter(
+    "stockmaster_invalidation_events_total",
+    "Invalidation events delivered to subscribers by source (local, notify, resync).",
+    ("source",),
+))
+
+
+def inventory_tags(*location_ids: int) -> tuple[str, ...]:
+    """Tags to publish when stock levels change at the given locations."""
+    return ("inventory", *(f"inventory:location:{location_id}" for location_id in location_ids))
+
+
+class InvalidationBus:
+    """In-process bus for single-worker deployments and tests."""
+
+    def __init__(self):
+        self._subscribers: list[Subscriber] = []
+
+    def subscribe(self, callback: Subscriber) -> None:
+        """Register a coroutine called with every batch of changed tags."""
+        self._subscribers.append(callback)
+
+    async def commit(self, session: AsyncSession, *tags: str) -> dict[str, int]:
+        """Commit the session with new versions of the entity tags, stamp the collection tags, then deliver.
+
+        Returns the versions assigned to the tags.
+        """
+        tags = tuple(dict.fromkeys(tags))
+        if not tags:
+            await session.commit()
+            return {}
+        entities = tuple(tag for tag in tags if ":" in tag)
+        collections = tuple(tag for tag in tags if ":" not in tag)
+        versions = await self._stamp(session, entities) if entities else {}
+        await self._announce(session, versions, collections)
+        await session.commit()
+        if collections:
+            try:
+                stamped = await self._stamp(session, collections)
+                await self._announce(session, stamped, (), delivered=True)
+                await session.commit()
+                versions.update(stamped)
+            except SQLAlchemyError:
+                # The change is committed and announced; only validators lag until the next write
+                await session.rollback()
+                logger.exception("Could not stamp collection versions of %s", collections)
+        await self._deliver(tags, "local")
+        return versions
+
+    async def _announce(
+        self,
+        session: AsyncSession,
+        versions: dict[str, int],
+        collections: tuple[str, ...],
+        delivered: bool = False,
+    ) -> None:
+        """Queue the announcement of a change to other workers, sent when the session commits.
+
+        ``delivered`` announces versions of tags already delivered, for other
+        workers to record without invalidating again.
+        """
+
+    async def _stamp(self, session: AsyncSession, tags: tuple[str, ...]) -> dict[str, int]:
+        """Assign new versions to ``tags`` in the session's transaction; their rows stay locked until it ends."""
+        now = func.localtimestamp()
+        if session.bind.dialect.name == "postgresql":
+            insert, version = pg_insert, entity_version_seq.next_value()
+        else:
+            # Writers are serialized on SQLite, so the next number is free
+            insert = sqlite_insert
+            version = select(func.coalesce(func.max(EntityVersion.version), 0) + 1).scalar_subquery()
+        # Rows are locked until commit; a fixed order keeps concurrent writers from deadlocking
+        stmt = insert(EntityVersion).values([
+            {"tag": tag, "version": version, "updated_at": now} for tag in sorted(tags)
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[EntityVersion.tag],
+            set_={"version": stmt.excluded.version, "updated_at": stmt.excluded.updated_at},
+        ).returning(EntityVersion.tag, EntityVersion.version)
+        return dict((await session.execute(stmt)).all())
+
+    async def start(self) -> None:
+        """Start listening for changes made by other workers."""
+
+    async def stop(self) -> None:
+        """Stop listening."""
+
+    async def _deliver(self, tags: tuple[str, ...], source: str) -> None:
+        EVENTS_TOTAL.inc((source,))
+        for callback in self._subscribers:
+            try:
+                await callback(tags, source == "local")
+            except Exception:
+                logger.exception("Invalidation subscriber failed for %s", tags)
+
+
+class PostgresInvalidationBus(InvalidationBus):
+    """Bus broadcasting through PostgreSQL LISTEN/NOTIFY."""
+
+    def __init__(self, dsn: str, channel: str, resync_interval: float, resync_grace: float):
+        super().__init__()
+        self.dsn = dsn
+        self.channel = channel
+        self.resync_interval = resync_interval
+        self.resync_grace = resync_grace
+        self.worker_id = uuid.uuid4().hex
+        self._seen: dict[str, int] = {}
+        self._since = None  # Database time of the last resync
+        self._started = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+        self._pending: set[asyncio.Task] = set()
+
+    async def commit(self, session: AsyncSession, *tags: str) -> dict[str, int]:
+        # This worker sees its own change on delivery, the others through NOTIFY
+        versions = await super().commit(session, *tags)
+        self._seen.update(versions)
+        return versions
+
+    async def _announce(
+        self,
+        session: AsyncSession,
+        versions: dict[str, int],
+        collections: tuple[str, ...],
+        delivered: bool = False,
+    ) -> None:
+        # Collection tags are not versioned yet and are always delivered
+        payload = json.dumps({"origin": self.worker_id, "versions": versions, "tags": collections, "delivered": delivered})
+        await session.execute(select(func.pg_notify(self.channel, payload)))
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._started = time.monotonic()
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _listen(self) -> None:
+        import asyncpg
+
+        backoff = 1.0
+        while True:
+            try:
+                conn = await asyncpg.connect(self.dsn)
+            except (OSError, asyncpg.PostgresError) as e:
+                logger.warning("Invalidation listener cannot connect, retrying in %.0fs: %s", backoff, e)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+                continue
+
+            backoff = 1.0
+            lost = asyncio.Event()
+            conn.add_termination_listener(lambda _conn: lost.set())
+            try:
+                await conn.add_listener(self.channel, self._on_notify)
+                # Catch up on anything published while this worker was not listening
+                await self._resync()
+                while not lost.is_set():
+                    try:
+                        await asyncio.wait_for(lost.wait(), self.resync_interval)
+                    except asyncio.TimeoutError:
+                        await self._resync()
+                logger.warning("Invalidation listener lost its connection, reconnecting")
+            except Exception as e:
+                logger.warning("Invalidation listener failed, reconnecting: %s", e)
+                await asyncio.sleep(backoff)
+            finally:
+                conn.terminate()
+
+    def _on_notify(self, conn, pid, channel, payload) -> None:
+        try:
+            message = json.loads(payload)
+            versions = {str(tag): int(version) for tag, version in message["versions"].items()}
+            collections = tuple(str(tag) for tag in message.get("tags", ()))
+        except (ValueError, KeyError, AttributeError, TypeError):
+            logger.warning("Ignoring malformed invalidation payload: %r", payload)
+            return
+
+        fresh = tuple(tag for tag, version in versions.items() if self._seen.get(tag, 0) < version)
+        for tag in fresh:
+            self._seen[tag] = versions[tag]
+        if message.get("delivered"):
+            return
+        fresh += collections
+        if fresh and message.get("origin") != self.worker_id:
+            task = asyncio.create_task(self._deliver(fresh, "notify"))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    async def _resync(self) -> None:
+        """Deliver tags whose version changed since the last resync without a notification."""
+        async with engine.connect() as conn:
+            now = (await conn.execute(select(func.localtimestamp()))).scalar_one()
+            if self._since is None:
+                # Before the first resync, cover everything since the bus started
+                since = now - timedelta(seconds=time.monotonic() - self._started)
+            else:
+                since = self._since
+            # The window overlaps the previous one so slow commits are not skipped
+            rows = (await conn.execute(
+                select(EntityVersion.tag, EntityVersion.version).where(
+                    EntityVersion.updated_at > since - timedelta(seconds=self.resync_grace)
+                )
+            )).all()
+
+        stale = tuple(tag for tag, version in rows if self._seen.get(tag, 0) < version)
+        self._seen = {tag: max(version, self._seen.get(tag, 0)) for tag, version in rows}
+        self._since = now
+        if stale:
+            logger.info("Invalidation resync found %d missed change(s)", len(stale))
+            await self._deliver(stale, "resync")
+
+
+def _create_bus() -> InvalidationBus:
+    url = make_url(settings.DATABASE_URL)
+    backend = settings.EVENTS_BACKEND
+    if backend == "auto":
+        backend = "postgres" if url.get_driver_name() == "asyncpg" else "local"
+    if backend == "postgres":
+        return PostgresInvalidationBus(
+            url.set(drivername="postgresql").render_as_string(hide_password=False),
+            channel=settings.EVENTS_CHANNEL,
+            resync_interval=settings.EVENTS_RESYNC_SECONDS,
+            resync_grace=settings.EVENTS_RESYNC_GRACE_SECONDS,
+        )
+    return InvalidationBus()
+
+
+invalidation_bus = _create_bus()
@@ -0,0 +1,182 @@
+"""Request and database instrumentation exported through the metrics registry."""
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.database import engine, read_engine, get_pool_stats, pool_stats
+from app.core.metrics import (
+    COUNT_BUCKETS,
+    CallbackMetric,
+    Counter,
+    HistogramView,
+    LabeledHistogram,
+    registry,
+)
+
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class RequestStats:
+    """Per-request database counters, shared through a context variable."""
+
+    __slots__ = ("queries", "db_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    """Return the stats object of the request being handled, if any."""
+    return _request_stats.get()
+
+
+# HTTP metrics
+REQUEST_DURATION = registry.register(LabeledHistogram(
+    "stockmaster_http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ("method", "route"),
+))
+REQUESTS_TOTAL = registry.register(Counter(
+    "stockmaster_http_requests_total",
+    "HTTP requests by route template and status code.",
+    ("method", "route", "status"),
+))
+REQUEST_ERRORS_TOTAL = registry.register(Counter(
+    "stockmaster_http_request_errors_total",
+    "HTTP requests that failed with a 5xx status or an unhandled exception.",
+    ("method", "route"),
+))
+
+# Database metrics
+DB_QUERIES_PER_REQUEST = registry.register(LabeledHistogram(
+    "stockmaster_db_queries_per_request",
+    "SQL statements executed per request.",
+    ("method", "route"),
+    buckets=COUNT_BUCKETS,
+))
+DB_TIME_PER_REQUEST = registry.register(LabeledHistogram(
+    "stockmaster_db_time_per_request_seconds",
+    "Time spent executing SQL statements per request.",
+    ("method", "route"),
+))
+DB_QUERIES_TOTAL = registry.register(Counter(
+    "stockmaster_db_queries_total",
+    "SQL statements executed, including those outside requests.",
+))
+
+# Connection pool metrics
+registry.register(CallbackMetric(
+    "stockmaster_db_pool_checked_out",
+    "Connections currently checked out of the primary pool.",
+    lambda: get_pool_stats()["checked_out"],
+))
+registry.register(CallbackMetric(
+    "stockmaster_db_pool_overflow",
+    "Overflow connections currently open on the primary pool.",
+    lambda: get_pool_stats()["overflow"],
+))
+registry.register(CallbackMetric(
+    "stockmaster_db_pool_timeouts_total",
+    "Connection checkouts that timed out.",
+    lambda: pool_stats.timeouts,
+    type_name="counter",
+))
+registry.register(HistogramView(
+    "stockmaster_db_pool_wait_seconds",
+    "Time spent waiting for a pooled connection.",
+    pool_stats.wait_time,
+))
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    DB_QUERIES_TOTAL.inc()
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
+
+
+def instrument_engine(async_engine: AsyncEngine) -> None:
+    """Attach query counting and timing listeners to an engine."""
+    sync_engine = async_engine.sync_engine
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+def instrument_engines() -> None:
+    """Instrument the primary and, when configured, the replica engine."""
+    instrument_engine(engine)
+    if read_engine is not engine:
+        instrument_engine(read_engine)
+
+
+def route_template(scope) -> str:
+    """Return the mounted route's full path template, or a fixed label when unmatched."""
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if not template:
+        return UNMATCHED_ROUTE
+    # FastAPI versions that keep included routers unflattened leave the
+    # router-local route in the scope, with the include it matched through
+    include_context = getattr(scope.get("fastapi", {}).get("included_router"), "include_context", None)
+    if include_context is not None:
+        return include_context.path_for(route)
+    return template
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and DB usage per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_stats.reset(token)
+            labels = (scope["method"], route_template(scope))
+            REQUEST_DURATION.observe(labels, elapsed)
+            REQUESTS_TOTAL.inc((*labels, str(status_code)))
+            if status_code >= 500:
+                REQUEST_ERRORS_TOTAL.inc(labels)
+            DB_QUERIES_PER_REQUEST.observe(labels, stats.queries)
+            DB_TIME_PER_REQUEST.observe(labels, stats.db_time)
@@ -0,0 +1,407 @@
+"""Background jobs for long-running exports and reports.
+
+A client submits a job and gets its id straight away; the work then runs in
+a worker process, outside any request, and writes its result to a file under
+``JOB_RESULTS_DIR`` that the client downloads once the job has succeeded.
+
+Job records live in the ``jobs`` table, so they survive restarts. Every worker
+runs a dispatcher that, every ``JOB_POLL_SECONDS`` or as soon as a job is
+submitted or finishes:
+
+* claims queued jobs, at most ``JOB_CONCURRENCY[type]`` of a type at once in
+  the process (``JOB_DEFAULT_CONCURRENCY`` for types not listed);
+* records progress and a heartbeat for the jobs it runs, and stops those
+  that were cancelled, from any worker;
+* queues again running jobs whose heartbeat is older than
+  ``JOB_STALE_SECONDS``, left behind by a worker that died, and fails those
+  already started ``JOB_MAX_ATTEMPTS`` times, which likely kill the worker;
+* removes result files past ``JOB_RESULT_TTL_SECONDS`` and marks their jobs
+  expired.
+
+Any worker may serve a download or expire a result, so with workers on more
+than one host ``JOB_RESULTS_DIR`` must be a volume they all share. Each result
+records the host that wrote it: a worker that cannot find another host's
+results reports the directory as not shared at startup, and answers their
+downloads with 503 rather than calling them expired.
+
+A worker shutting down queues its running jobs again, so they start over
+after the restart. Job types register a handler with ``job_engine.job``.
+"""
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, NamedTuple, Optional
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.core.metrics import CallbackMetric, Counter, registry
+from app.models.job import Job, JobStatus
+
+
+logger = logging.getLogger(__name__)
+
+JOBS_FINISHED = registry.register(Counter(
+    "stockmaster_jobs_total",
+    "Background jobs finished or cancelled in this process, by type and final status.",
+    ("type", "status"),
+))
+
+ACTIVE_STATUSES = (JobStatus.QUEUED, JobStatus.RUNNING)
+
+
+class JobContext:
+    """What a running handler gets: its params, a result file and progress counters."""
+
+    def __init__(self, job_id: int, params: BaseModel, path: Path):
+        self.id = job_id
+        self.params = params
+        self.path = path
+        self.processed = 0
+        self.total: Optional[int] = None
+        self.media_type = "application/octet-stream"
+        self.filename = f"job-{job_id}"
+
+    def advance(self, count: int) -> None:
+        """Count processed items; the dispatcher records them with the next heartbeat."""
+        self.processed += count
+
+    async def write(self, chunks: AsyncIterator[bytes]) -> int:
+        """Write the result file from a stream of chunks and return its size."""
+        size = 0
+        with open(self.path, "wb") as f:
+            async for chunk in chunks:
+                await asyncio.to_thread(f.write, chunk)
+                size += len(chunk)
+        return size
+
+
+Handler = Callable[[JobContext], Awaitable[None]]
+
+
+class JobType(NamedTuple):
+    name: str
+    params: type[BaseModel]
+    handler: Handler
+    concurrency: int
+
+
+class JobEngine:
+    """Runs registered job types from the ``jobs`` table."""
+
+    def __init__(
+        self,
+        directory: str,
+        result_ttl: float,
+        poll_seconds: float,
+        stale_seconds: float,
+        max_attempts: int,
+        concurrency: dict[str, int],
+        default_concurrency: int,
+    ):
+        self.directory = Path(directory)
+        self.node = socket.gethostname()
+        self.result_ttl = timedelta(seconds=result_ttl)
+        self.poll_seconds = poll_seconds
+        self.stale_seconds = timedelta(seconds=stale_seconds)
+        self.max_attempts = max_attempts
+        self.concurrency = concurrency
+        self.default_concurrency = default_concurrency
+        self.types: dict[str, JobType] = {}
+        self._running: dict[int, tuple[str, JobContext, asyncio.Task]] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def job(self, name: str, params: type[BaseModel]) -> Callable[[Handler], Handler]:
+        """Register a handler for a job type, with the model its params are checked against."""
+        def register(handler: Handler) -> Handler:
+            concurrency = self.concurrency.get(name, self.default_concurrency)
+            self.types[name] = JobType(name, params, handler, concurrency)
+            return handler
+        return register
+
+    def running(self) -> int:
+        return len(self._running)
+
+    def result_path(self, job: Job) -> Optional[Path]:
+        """Path of a job's result file; fails if another host wrote it where this one cannot see."""
+        if not job.result_file:
+            return None
+        path = self.directory / job.result_file
+        if job.result_node not in (None, self.node) and not path.exists():
+            logger.error(
+                "Result of job %d was written on %s and is not in %s; JOB_RESULTS_DIR must be shared by every worker",
+                job.id, job.result_node, self.directory,
+            )
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Job result is stored on another worker"
+            )
+        return path
+
+    async def submit(self, db: AsyncSession, job_type: str, params: dict[str, Any], user_id: Optional[int]) -> Job:
+        """Queue a job and wake the dispatcher."""
+        if job_type not in self.types:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown job type, expected one of: {', '.join(sorted(self.types))}"
+            )
+        try:
+            checked = self.types[job_type].params.model_validate(params)
+        except ValidationError as e:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+                detail=e.errors(include_url=False, include_context=False)
+            )
+
+        job = Job(type=job_type, params=checked.model_dump(mode="json"), user_id=user_id)
+        db.add(job)
+        await db.commit()
+        self._notify()
+        return job
+
+    async def cancel(self, db: AsyncSession, job: Job) -> Job:
+        """Cancel a queued or running job; the worker running it stops it at its next heartbeat."""
+        result = await db.execute(
+            update(Job)
+            .where(Job.id == job.id, Job.status.in_(ACTIVE_STATUSES))
+            .values(status=JobStatus.CANCELLED, finished_at=datetime.utcnow())
+        )
+        await db.commit()
+        if result.rowcount == 0:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Job has already finished"
+            )
+        JOBS_FINISHED.inc((job.type, JobStatus.CANCELLED.value))
+        if job.id in self._running:
+            self._running[job.id][2].cancel()
+        await db.refresh(job)
+        return job
+
+    def _notify(self) -> None:
+        """Run the dispatcher now rather than at the next poll."""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def start(self) -> None:
+        if self._task is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            await self._check_shared_directory()
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._dispatch_forever())
+
+    async def stop(self) -> None:
+        """Stop dispatching and queue the jobs running here again."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        running = list(self._running)
+        tasks = [task for _, _, task in self._running.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if running:
+            # Not the job's fault, so the attempt is given back
+            async with async_session_maker() as db:
+                await db.execute(
+                    update(Job)
+                    .where(Job.id.in_(running), Job.status == JobStatus.RUNNING)
+                    .values(
+                        status=JobStatus.QUEUED,
+                        attempts=Job.attempts - 1,
+                        started_at=None,
+                        heartbeat_at=None,
+                        processed=0,
+                        total=None,
+                    )
+                )
+                await db.commit()
+
+    async def _check_shared_directory(self) -> None:
+        """Report hosts whose recent results are missing here: the directory is not shared with them."""
+        async with async_session_maker() as db:
+            results = (await db.execute(
+                select(Job.result_node, Job.result_file)
+                .where(Job.status == JobStatus.SUCCEEDED, Job.result_node != self.node)
+                .order_by(Job.id.desc())
+                .limit(20)
+            )).all()
+        missing = sorted({node for node, result_file in results if not (self.directory / result_file).exists()})
+        if missing:
+            logger.error(
+                "Job results written on %s are not in %s; JOB_RESULTS_DIR must be shared by every worker",
+                ", ".join(missing), self.directory,
+            )
+
+    async def _dispatch_forever(self) -> None:
+        while True:
+            self._wake.clear()
+            try:
+                await self._dispatch()
+            except Exception:
+                logger.exception("Job dispatcher failed, retrying in %.0fs", self.poll_seconds)
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _dispatch(self) -> None:
+        now = datetime.utcnow()
+        async with async_session_maker() as db:
+            # Heartbeats and progress; a job that is no longer running was cancelled
+            for job_id, (_, context, task) in list(self._running.items()):
+                result = await db.execute(
+                    update(Job)
+                    .where(Job.id == job_id, Job.status == JobStatus.RUNNING)
+                    .values(heartbeat_at=now, processed=context.processed, total=context.total)
+                )
+                if result.rowcount == 0:
+                    task.cancel()
+
+            # Jobs of workers that stopped without queueing them again: given
+            # up after their last attempt, so a job that kills its worker
+            # cannot take the others down one after the other
+            stale = (Job.status == JobStatus.RUNNING, Job.heartbeat_at < now - self.stale_seconds)
+            failed = (await db.execute(
+                update(Job)
+                .where(*stale, Job.attempts >= self.max_attempts)
+                .values(
+                    status=JobStatus.FAILED,
+                    error=f"Worker stopped responding, {self.max_attempts} attempt(s) made",
+                    finished_at=now,
+                )
+                .returning(Job.id, Job.type)
+            )).all()
+            for job_id, job_type in failed:
+                logger.error("Job %d (%s) failed: worker stopped responding on its last attempt", job_id, job_type)
+                JOBS_FINISHED.inc((job_type, JobStatus.FAILED.value))
+            requeued = await db.execute(
+                update(Job)
+                .where(*stale)
+                .values(status=JobStatus.QUEUED, started_at=None, heartbeat_at=None, processed=0, total=None)
+            )
+            if requeued.rowcount:
+                logger.warning("Queued %d stale job(s) again", requeued.rowcount)
+
+            expired = (await db.execute(
+                select(Job.id, Job.result_file)
+                .where(Job.status == JobStatus.SUCCEEDED, Job.expires_at < now)
+            )).all()
+            for job_id, result_file in expired:
+                if result_file:
+                    (self.directory / result_file).unlink(missing_ok=True)
+            if expired:
+                await db.execute(
+                    update(Job)
+                    .where(Job.id.in_([job_id for job_id, _ in expired]), Job.status == JobStatus.SUCCEEDED)
+                    .values(status=JobStatus.EXPIRED, result_file=None)
+                )
+            await db.commit()
+
+            for job_type in self.types.values():
+                free = job_type.concurrency - sum(
+                    1 for name, _, _ in self._running.values() if name == job_type.name
+                )
+                if free <= 0:
+                    continue
+                queued = (await db.execute(
+                    select(Job.id, Job.params)
+                    .where(Job.type == job_type.name, Job.status == JobStatus.QUEUED)
+                    .order_by(Job.id)
+                    .limit(free)
+                )).all()
+                for job_id, params in queued:
+                    # Another worker may claim the same job; only one update matches.
+                    # The time is taken now: the passes above may have been slow
+                    claimed_at = datetime.utcnow()
+                    claimed = await db.execute(
+                        update(Job)
+                        .where(Job.id == job_id, Job.status == JobStatus.QUEUED)
+                        .values(
+                            status=JobStatus.RUNNING,
+                            attempts=Job.attempts + 1,
+                            started_at=claimed_at,
+                            heartbeat_at=claimed_at,
+                        )
+                    )
+                    await db.commit()
+                    if claimed.rowcount:
+                        self._start(job_type, job_id, params)
+
+    def _start(self, job_type: JobType, job_id: int, params: dict[str, Any]) -> None:
+        context = JobContext(job_id, job_type.params.model_validate(params), self.directory / f"job-{job_id}.part")
+        task = asyncio.create_task(self._run(job_type, context))
+        self._running[job_id] = (job_type.name, context, task)
+
+    async def _run(self, job_type: JobType, context: JobContext) -> None:
+        values: dict[str, Any]
+        try:
+            await job_type.handler(context)
+        except asyncio.CancelledError:
+            # Cancelled by a client, or by stop(), which queues the job again
+            context.path.unlink(missing_ok=True)
+            return
+        except Exception as e:
+            logger.exception("Job %d (%s) failed", context.id, job_type.name)
+            context.path.unlink(missing_ok=True)
+            values = {"status": JobStatus.FAILED, "error": str(e) or type(e).__name__}
+        else:
+            result_file = f"job-{context.id}-{context.filename}"
+            os.replace(context.path, self.directory / result_file)
+            values = {
+                "status": JobStatus.SUCCEEDED,
+                "result_file": result_file,
+                "result_node": self.node,
+                "result_size": (self.directory / result_file).stat().st_size,
+                "media_type": context.media_type,
+                "filename": context.filename,
+            }
+        finally:
+            self._running.pop(context.id, None)
+            self._notify()
+
+        now = datetime.utcnow()
+        if values["status"] == JobStatus.SUCCEEDED:
+            values["expires_at"] = now + self.result_ttl
+        async with async_session_maker() as db:
+            result = await db.execute(
+                update(Job)
+                .where(Job.id == context.id, Job.status == JobStatus.RUNNING)
+                .values(finished_at=now, processed=context.processed, total=context.total, **values)
+            )
+            await db.commit()
+        if result.rowcount == 0 and values.get("result_file"):
+            # Cancelled while finishing
+            (self.directory / values["result_file"]).unlink(missing_ok=True)
+        JOBS_FINISHED.inc((job_type.name, values["status"].value))
+
+
+job_engine = JobEngine(
+    settings.JOB_RESULTS_DIR,
+    settings.JOB_RESULT_TTL_SECONDS,
+    settings.JOB_POLL_SECONDS,
+    settings.JOB_STALE_SECONDS,
+    settings.JOB_MAX_ATTEMPTS,
+    settings.JOB_CONCURRENCY,
+    settings.JOB_DEFAULT_CONCURRENCY,
+)
+
+registry.register(CallbackMetric(
+    "stockmaster_jobs_running",
+    "Background jobs running in this process.",
+    job_engine.running,
+))
@@ -0,0 +1,218 @@
+"""Lightweight in-process metric primitives with Prometheus text export."""
+from bisect import bisect_left
+from typing import Callable, Optional, Sequence
+
+
+# Default latency buckets in seconds
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# Buckets for small per-request counts (queries, rows)
+COUNT_BUCKETS: tuple[float, ...] = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 1000)
+
+
+class Histogram:
+    """Cumulative-bucket histogram compatible with the Prometheus model."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Record a single observation."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self) -> dict:
+        """Return cumulative bucket counts keyed by upper bound, count and sum."""
+        cumulative = []
+        running = 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            cumulative.append({"le": f"{bound:g}", "count": running})
+        cumulative.append({"le": "+Inf", "count": self.count})
+        return {"buckets": cumulative, "count": self.count, "sum": self.sum}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """Base class for named metric families."""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def header(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+
+    def render(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """Monotonic counter family keyed by label values."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1.0) -> None:
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        for labels, value in list(self.values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value!r}")
+        return lines
+
+
+class LabeledHistogram(Metric):
+    """Histogram family keyed by label values."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self.children: dict[tuple, Histogram] = {}
+
+    def labels(self, labels: tuple = ()) -> Histogram:
+        child = self.children.get(labels)
+        if child is None:
+            child = self.children[labels] = Histogram(self.buckets)
+        return child
+
+    def observe(self, labels: tuple, value: float) -> None:
+        self.labels(labels).observe(value)
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        for labels, child in list(self.children.items()):
+            lines.extend(render_histogram(self.name, self.labelnames, labels, child))
+        return lines
+
+
+class CallbackMetric(Metric):
+    """Gauge or counter whose samples are read from a callback at scrape time."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Optional[float]],
+        type_name: str = "gauge",
+    ):
+        super().__init__(name, documentation)
+        self.callback = callback
+        self.type_name = type_name
+
+    def render(self) -> list[str]:
+        value = self.callback()
+        if value is None:
+            return []
+        return self.header() + [f"{self.name} {value!r}"]
+
+
+class LabeledCallbackMetric(Metric):
+    """Gauge family whose samples, keyed by label values, are read from a callback at scrape time."""
+
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        callback: Callable[[], dict[tuple, float]],
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        for labels, value in self.callback().items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value!r}")
+        return lines
+
+
+class HistogramView(Metric):
+    """Exposes an existing unlabeled ``Histogram`` under a metric name."""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, histogram: Histogram):
+        super().__init__(name, documentation)
+        self.histogram = histogram
+
+    def render(self) -> list[str]:
+        return self.header() + render_histogram(self.name, (), (), self.histogram)
+
+
+def render_histogram(
+    name: str, labelnames: Sequence[str], labels: tuple, histogram: Histogram
+) -> list[str]:
+    """Render one histogram child in Prometheus text format."""
+    lines = []
+    for bucket in histogram.snapshot()["buckets"]:
+        label_str = _format_labels(labelnames, labels, f'le="{bucket["le"]}"')
+        lines.append(f"{name}_bucket{label_str} {bucket['count']}")
+    label_str = _format_labels(labelnames, labels)
+    lines.append(f"{name}_sum{label_str} {histogram.sum!r}")
+    lines.append(f"{name}_count{label_str} {histogram.count}")
+    return lines
+
+
+class MetricsRegistry:
+    """Collection of metric families rendered together."""
+
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+registry = MetricsRegistry()
@@ -0,0 +1,113 @@
+"""Schema migrations with Alembic, as a deploy step or when the application starts.
+
+Revisions live in ``alembic/versions``. ``python -m app.core.migrations``
+upgrades the database at ``DATABASE_URL``; run it once per deploy, before
+the workers start, with ``DB_MIGRATE_ON_STARTUP`` off so the workers only
+check that the schema is current. With it on, each worker upgrades the
+schema as it starts. Databases created by ``create_all`` before migrations
+were adopted have no ``alembic_version`` table: tables they are missing are
+created, they are stamped at the initial revision and upgraded from there.
+
+On PostgreSQL workers starting together take an advisory lock, so one of
+them migrates while the others wait and then find nothing left to do.
+Revisions build indexes with ``create_index_concurrently``, which rebuilds
+an index left invalid by a concurrent build that failed.
+"""
+import asyncio
+import logging
+from pathlib import Path
+from typing import Any, Sequence
+
+from alembic import command, op
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import Connection, inspect, text
+
+from app.core.database import Base, dispose_engines, engine
+import app.models  # noqa: F401  Registers every table on Base.metadata
+
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+# Revision matching the schema create_all built before migrations
+INITIAL_REVISION = "0001"
+
+# pg_advisory_lock key held while migrating
+MIGRATION_LOCK_KEY = 0x53544D47
+
+
+def alembic_config(connection: Connection) -> Config:
+    """Alembic configuration that runs on the given connection."""
+    config = Config(str(ALEMBIC_INI))
+    config.attributes["connection"] = connection
+    return config
+
+
+def upgrade_schema(connection: Connection) -> None:
+    """Bring the schema up to the latest revision; run with ``AsyncConnection.run_sync``.
+
+    The connection must not be in a transaction: migrations commit as they go.
+    """
+    postgresql = connection.dialect.name == "postgresql"
+    if postgresql:
+        connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        connection.commit()
+    try:
+        config = alembic_config(connection)
+        tables = set(inspect(connection).get_table_names())
+        if "alembic_version" not in tables and tables & set(Base.metadata.tables):
+            Base.metadata.create_all(connection, tables=[
+                table for name, table in Base.metadata.tables.items() if name not in tables
+            ])
+            command.stamp(config, INITIAL_REVISION)
+        connection.commit()
+        command.upgrade(config, "head")
+    finally:
+        if postgresql:
+            connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            connection.commit()
+
+
+def check_schema(connection: Connection) -> None:
+    """Raise unless the schema is at the latest revision; run with ``AsyncConnection.run_sync``."""
+    current = MigrationContext.configure(connection).get_current_revision()
+    head = ScriptDirectory.from_config(alembic_config(connection)).get_current_head()
+    if current != head:
+        raise RuntimeError(
+            f"Database schema is at revision {current or 'none'}, expected {head}: "
+            "run python -m app.core.migrations first"
+        )
+
+
+def create_index_concurrently(name: str, table: str, columns: Sequence[str], **kw: Any) -> None:
+    """Create an index in a revision, ``CONCURRENTLY`` on PostgreSQL, unless it already exists.
+
+    Call it inside ``autocommit_block()`` on PostgreSQL. A concurrent build
+    that fails leaves an invalid index behind, which queries never use and
+    ``IF NOT EXISTS`` would keep forever, so one is dropped and built again.
+    """
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql" and not op.get_context().as_sql:
+        invalid = bind.execute(text(
+            "SELECT 1 FROM pg_index WHERE indexrelid = to_regclass(:name) AND NOT indisvalid"
+        ), {"name": name}).first()
+        if invalid is not None:
+            logger.warning("Index %s is invalid, building it again", name)
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+    op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True, **kw)
+
+
+async def migrate() -> None:
+    """Upgrade the database at ``DATABASE_URL`` to the latest revision."""
+    async with engine.connect() as connection:
+        await connection.run_sync(upgrade_schema)
+    await dispose_engines()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(levelname)-5.5s [%(name)s] %(message)s")
+    logging.getLogger("alembic").setLevel(logging.INFO)
+    asyncio.run(migrate())
@@ -0,0 +1,187 @@
+"""SQL statement tracking for N+1 detection and query budgets.
+
+In development, ``QUERY_TRACKING`` wraps every request in a capture and logs
+statement shapes that repeat more than ``QUERY_REPEAT_THRESHOLD`` times. In
+tests, ``query_budget`` fails when a block runs more statements than allowed::
+
+    @query_budget(3)
+    async def test_products_list(client):
+        await client.get("/api/v1/products")
+"""
+import functools
+import inspect
+import logging
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+from app.core.database import engine, read_engine
+from app.core.instrumentation import route_template
+
+
+logger = logging.getLogger(__name__)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"\$\d+|%\(\w+\)s|\?|%s")
+_PLACEHOLDER_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize a SQL statement so executions differing only in values compare equal."""
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _PLACEHOLDER.sub("?", shape)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _PLACEHOLDER_LIST.sub("?...", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class QueryLog:
+    """Statements executed while a capture was active."""
+
+    def __init__(self):
+        self.statements: list[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def shapes(self) -> Counter:
+        """Count executions per normalized statement shape."""
+        return Counter(statement_shape(statement) for statement in self.statements)
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Return statement shapes executed more than ``threshold`` times."""
+        return [(shape, n) for shape, n in self.shapes().most_common() if n > threshold]
+
+
+_active_logs: ContextVar[tuple[QueryLog, ...]] = ContextVar("active_query_logs", default=())
+
+
+@contextmanager
+def capture_queries() -> Iterator[QueryLog]:
+    """Record every statement executed in the current context."""
+    log = QueryLog()
+    token = _active_logs.set(_active_logs.get() + (log,))
+    try:
+        yield log
+    finally:
+        _active_logs.reset(token)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a block executes more statements than its budget allows."""
+
+
+class query_budget:
+    """Context manager and decorator asserting a maximum number of statements.
+
+    ``repeat_threshold`` additionally fails when any statement shape repeats
+    more often than allowed, which is how N+1 loops usually show up.
+    """
+
+    def __init__(self, max_queries: int, repeat_threshold: Optional[int] = None):
+        self.max_queries = max_queries
+        self.repeat_threshold = repeat_threshold
+        self._capture = None
+        self.log: Optional[QueryLog] = None
+
+    def __enter__(self) -> QueryLog:
+        self._capture = capture_queries()
+        self.log = self._capture.__enter__()
+        return self.log
+
+    def __exit__(self, exc_type, exc, tb):
+        self._capture.__exit__(exc_type, exc, tb)
+        if exc_type is None:
+            self.check(self.log)
+        return False
+
+    def check(self, log: QueryLog) -> None:
+        """Raise ``QueryBudgetExceeded`` if the captured statements break the budget."""
+        if log.count > self.max_queries:
+            listing = "\n".join(f"  {statement_shape(s)}" for s in log.statements)
+            raise QueryBudgetExceeded(
+                f"Executed {log.count} queries, budget is {self.max_queries}:\n{listing}"
+            )
+        if self.repeat_threshold is not None:
+            repeated = log.repeated(self.repeat_threshold)
+            if repeated:
+                shape, n = repeated[0]
+                raise QueryBudgetExceeded(
+                    f"Statement repeated {n} times (threshold {self.repeat_threshold}): {shape}"
+                )
+
+    def __call__(self, func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with query_budget(self.max_queries, self.repeat_threshold):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with query_budget(self.max_queries, self.repeat_threshold):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    for log in _active_logs.get():
+        log.statements.append(statement)
+
+
+def track_engine(async_engine: AsyncEngine) -> None:
+    """Feed statements executed on an engine into active captures."""
+    sync_engine = async_engine.sync_engine
+    if not event.contains(sync_engine, "after_cursor_execute", _record_statement):
+        event.listen(sync_engine, "after_cursor_execute", _record_statement)
+
+
+def track_engines() -> None:
+    """Track the primary and, when configured, the replica engine."""
+    track_engine(engine)
+    if read_engine is not engine:
+        track_engine(read_engine)
+
+
+class QueryTrackingMiddleware:
+    """Development middleware that flags repeated statement shapes per request.
+
+    Adds an ``X-Query-Count`` header and logs a warning for every shape that
+    repeats more than ``QUERY_REPEAT_THRESHOLD`` times within one request.
+    """
+
+    def __init__(self, app, threshold: Optional[int] = None):
+        self.app = app
+        self.threshold = threshold if threshold is not None else settings.QUERY_REPEAT_THRESHOLD
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with capture_queries() as log:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-query-count", str(log.count).encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                for shape, n in log.repeated(self.threshold):
+                    logger.warning(
+                        "Possible N+1 in %s %s: statement executed %d times: %s",
+                        scope["method"], route_template(scope), n, shape,
+                    )
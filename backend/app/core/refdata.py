@@ -0,0 +1,127 @@
+"""In-memory cache of the small reference tables.
+
+Locations, categories and suppliers are read far more often than they change:
+to find the default location, to check that an id exists and to put a name
+next to an id. Each table is kept as a snapshot of ``id -> name`` per process,
+loaded from the primary on first use with the loads of concurrent callers
+shared.
+
+Snapshots are versioned. A write publishing the table's tag (``"locations"``,
+``"categories"``, ``"suppliers"``) on the invalidation bus bumps the version,
+here and, through NOTIFY, in the other workers, and the next lookup reloads
+the table. An id missing from a snapshot reloads it once it is a second old,
+which covers a row created by another worker whose notification has not
+arrived yet without letting unknown ids reload the table on every request.
+"""
+import time
+from typing import NamedTuple, Optional
+
+from sqlalchemy import select
+
+from app.core.coalesce import SingleFlight
+from app.core.database import async_session_maker
+from app.core.events import invalidation_bus
+from app.core.metrics import Counter, registry
+from app.models.category import Category
+from app.models.location import Location
+from app.models.supplier import Supplier
+
+
+REFERENCE_LOADS = registry.register(Counter(
+    "stockmaster_reference_loads_total",
+    "Reference table snapshots loaded from the database, by table.",
+    ("table",),
+))
+
+# Age after which an unknown id reloads the snapshot
+MISS_RELOAD_SECONDS = 1.0
+
+
+class Ref(NamedTuple):
+    """A reference row: its id and display name."""
+
+    id: int
+    name: str
+
+
+class ReferenceTable:
+    """Read-through snapshot of one reference table, invalidated by its tag."""
+
+    def __init__(self, model, tag: str):
+        self.model = model
+        self.tag = tag
+        self.version = 0
+        self._rows: Optional[dict[int, str]] = None
+        self._rows_version = -1
+        self._loaded_at = 0.0
+        self._flight = SingleFlight()
+
+    def invalidate(self) -> None:
+        self.version += 1
+
+    async def rows(self, reload: bool = False) -> dict[int, str]:
+        """Names by id in id order, loaded when stale."""
+        if not reload and self._rows is not None and self._rows_version == self.version:
+            return self._rows
+        # The version is read before loading, so an invalidation racing with
+        # the load leaves the snapshot stale instead of hiding the change
+        version = self.version
+
+        async def load() -> dict[int, str]:
+            async with async_session_maker() as session:
+                result = await session.execute(select(self.model.id, self.model.name).order_by(self.model.id))
+                rows = dict(result.all())
+            REFERENCE_LOADS.inc((self.tag,))
+            return rows
+
+        rows, shared = await self._flight.run(version, load)
+        if not shared and version == self.version:
+            self._rows, self._rows_version, self._loaded_at = rows, version, time.monotonic()
+        return rows
+
+    async def get(self, id: Optional[int]) -> Optional[Ref]:
+        """The row with this id, None when it does not exist."""
+        if id is None:
+            return None
+        rows = await self.rows()
+        if id not in rows and time.monotonic() - self._loaded_at >= MISS_RELOAD_SECONDS:
+            rows = await self.rows(reload=True)
+        name = rows.get(id)
+        return Ref(id, name) if name is not None else None
+
+    async def name(self, id: Optional[int]) -> Optional[str]:
+        ref = await self.get(id)
+        return ref.name if ref else None
+
+    async def first(self) -> Optional[Ref]:
+        """The row with the lowest id, None when the table is empty."""
+        rows = await self.rows()
+        if not rows:
+            return None
+        id = next(iter(rows))
+        return Ref(id, rows[id])
+
+
+class ReferenceData:
+    """The cached reference tables."""
+
+    def __init__(self):
+        self.locations = ReferenceTable(Location, "locations")
+        self.categories = ReferenceTable(Category, "categories")
+        self.suppliers = ReferenceTable(Supplier, "suppliers")
+        self._by_tag = {table.tag: table for table in (self.locations, self.categories, self.suppliers)}
+
+    async def default_location(self) -> Optional[Ref]:
+        """Location stock is booked to when none is given: the oldest one."""
+        return await self.locations.first()
+
+    async def on_change(self, tags: tuple[str, ...], local: bool) -> None:
+        """Invalidation bus subscriber; every worker keeps its own snapshots."""
+        for tag in tags:
+            table = self._by_tag.get(tag)
+            if table is not None:
+                table.invalidate()
+
+
+reference_data = ReferenceData()
+invalidation_bus.subscribe(reference_data.on_change)
@@ -1,3 +1,6 @@
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional, Any
 from jose import JWTError, jwt
@@ -40,10 +43,62 @@ def create_refresh_token(data: dict) -> str:
     return encoded_jwt
 
 
+class TokenCache:
+    """Thread-safe LRU cache of verified token claims.
+
+    Entries are keyed by the raw token and dropped once the token's ``exp``
+    claim has passed, so a cached token never outlives its signature check.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[dict[str, Any]]:
+        """Return cached claims for a token, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return dict(payload)
+
+    def set(self, token: str, payload: dict[str, Any]) -> None:
+        """Store verified claims until the token expires."""
+        exp = payload.get("exp")
+        if self.maxsize <= 0 or not isinstance(exp, (int, float)):
+            return
+        with self._lock:
+            self._entries[token] = (float(exp), dict(payload))
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all cached entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+token_cache = TokenCache(settings.TOKEN_CACHE_SIZE)
+
+
 def decode_token(token: str) -> Optional[dict[str, Any]]:
-    """Decode and verify a JWT token."""
+    """Decode and verify a JWT token, reusing previously verified claims."""
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
     except JWTError:
         return None
+    token_cache.set(token, payload)
+    return payload
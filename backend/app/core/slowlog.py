@@ -0,0 +1,264 @@
+"""Slow query log with captured plans.
+
+Statements taking ``SLOW_QUERY_SECONDS`` or longer are recorded with the
+route that ran them and their bound parameters, with strings and bytes
+redacted to their type and length. Each one is written as a JSON line to
+``SLOW_QUERY_LOG_FILE``, rotated at ``SLOW_QUERY_LOG_MAX_BYTES``, and added up
+per statement shape for ``GET /system/slow-queries``, which lists the top
+offenders by total time.
+
+The first time a shape is slow, and again once its plan is an hour old, the
+statement is explained with its parameters on a separate connection in the
+background: ``EXPLAIN (ANALYZE off)`` on PostgreSQL, which plans the statement
+without running it, and ``EXPLAIN QUERY PLAN`` on SQLite. Plans go to the log
+file too.
+
+Totals are kept per process, for at most ``SLOW_QUERY_MAX_STATEMENTS`` shapes;
+the shape with the least total time makes room for a new one.
+"""
+import asyncio
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from datetime import date, datetime
+from decimal import Decimal
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+from app.core.database import engine, read_engine
+from app.core.instrumentation import route_template
+from app.core.metrics import Counter as CounterMetric, registry
+from app.core.querytrack import statement_shape
+from app.core.responses import dumps
+
+
+logger = logging.getLogger(__name__)
+
+# JSON lines for the slow query file; kept out of the application log
+file_logger = logging.getLogger("stockmaster.slow_queries")
+file_logger.propagate = False
+
+SLOW_QUERIES = registry.register(CounterMetric(
+    "stockmaster_db_slow_queries_total",
+    "Statements that took at least SLOW_QUERY_SECONDS, by route template.",
+    ("route",),
+))
+
+# Route label of statements run outside a request (jobs, startup)
+BACKGROUND = "<background>"
+
+PLAN_MAX_AGE = 3600.0
+EXPLAIN_TIMEOUT = 10.0
+
+_EXPLAINABLE = re.compile(r"\s*(select|with|insert|update|delete)\b", re.IGNORECASE)
+
+_request_scope: ContextVar[Optional[dict]] = ContextVar("slow_query_scope", default=None)
+
+
+def redact(value: Any) -> Any:
+    """Bound parameters with strings and bytes replaced by their type and length."""
+    if isinstance(value, dict):
+        return {key: redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    if value is None or isinstance(value, (bool, int, float, Decimal, datetime, date)):
+        return value
+    if isinstance(value, (str, bytes, bytearray, memoryview)):
+        return f"<{type(value).__name__} len={len(value)}>"
+    return f"<{type(value).__name__}>"
+
+
+class SlowQuery:
+    """Slow executions of one statement shape."""
+
+    def __init__(self, shape: str):
+        self.shape = shape
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last_seen: Optional[datetime] = None
+        self.routes: Counter = Counter()
+        self.params: Any = None
+        self.plan: Optional[list[str]] = None
+        self.plan_error: Optional[str] = None
+        self.plan_at: Optional[float] = None
+
+    def add(self, elapsed: float, route: str, params: Any) -> None:
+        self.count += 1
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+        self.last_seen = datetime.utcnow()
+        self.routes[route] += 1
+        self.params = params
+
+    def needs_plan(self) -> bool:
+        return self.plan_at is None or time.monotonic() - self.plan_at > PLAN_MAX_AGE
+
+
+class SlowQueryLog:
+    """Totals per statement shape, and plans captured in the background."""
+
+    def __init__(self, threshold: float, max_statements: int, explain: bool):
+        self.threshold = threshold
+        self.max_statements = max_statements
+        self.explain = explain
+        self.entries: dict[str, SlowQuery] = {}
+        self._engines: dict[Any, AsyncEngine] = {}
+        self._explaining: set[str] = set()
+
+    def top(self, limit: int) -> list[SlowQuery]:
+        """Shapes with the most total time first."""
+        return sorted(self.entries.values(), key=lambda entry: entry.total, reverse=True)[:limit]
+
+    def reset(self) -> None:
+        self.entries.clear()
+
+    def record(self, conn, statement: str, parameters: Any, executemany: bool, elapsed: float) -> None:
+        if statement.lstrip()[:7].upper() == "EXPLAIN":
+            return
+        shape = statement_shape(statement)
+        scope = _request_scope.get()
+        route = route_template(scope) if scope is not None else BACKGROUND
+        params = redact(parameters)
+
+        entry = self.entries.get(shape)
+        if entry is None:
+            if len(self.entries) >= self.max_statements:
+                del self.entries[min(self.entries, key=lambda key: self.entries[key].total)]
+            entry = self.entries[shape] = SlowQuery(shape)
+        entry.add(elapsed, route, params)
+        SLOW_QUERIES.inc((route,))
+        file_logger.info(dumps({
+            "event": "slow_query",
+            "at": entry.last_seen,
+            "duration_ms": round(elapsed * 1000, 1),
+            "route": route,
+            "statement": statement,
+            "params": params,
+        }).decode())
+
+        async_engine = self._engines.get(conn.engine)
+        if not self.explain or async_engine is None or not _EXPLAINABLE.match(statement):
+            return
+        if shape in self._explaining or not entry.needs_plan():
+            return
+        if executemany:
+            parameters = parameters[0] if parameters else ()
+        try:
+            asyncio.get_running_loop().create_task(self._explain(entry, async_engine, statement, parameters))
+        except RuntimeError:
+            return  # Not on the event loop
+        self._explaining.add(shape)
+
+    async def _explain(self, entry: SlowQuery, async_engine: AsyncEngine, statement: str, parameters: Any) -> None:
+        if async_engine.dialect.name == "sqlite":
+            prefix = "EXPLAIN QUERY PLAN "
+        else:
+            prefix = "EXPLAIN (ANALYZE off) "
+        if isinstance(parameters, list):
+            parameters = tuple(parameters)
+        try:
+            async with async_engine.connect() as conn:
+                result = await asyncio.wait_for(conn.exec_driver_sql(prefix + statement, parameters), EXPLAIN_TIMEOUT)
+                # QUERY PLAN rows end with the step's detail, PostgreSQL returns one line per row
+                entry.plan = [str(row[-1]) for row in result]
+                entry.plan_error = None
+        except Exception as e:
+            entry.plan = None
+            entry.plan_error = f"{type(e).__name__}: {e}"
+            logger.warning("Could not explain slow statement: %s", entry.plan_error)
+        finally:
+            entry.plan_at = time.monotonic()
+            self._explaining.discard(entry.shape)
+        file_logger.info(dumps({
+            "event": "plan",
+            "at": datetime.utcnow(),
+            "statement": statement,
+            "plan": entry.plan,
+            "error": entry.plan_error,
+        }).decode())
+
+    def watch(self, async_engine: AsyncEngine) -> None:
+        """Time statements executed on an engine."""
+        sync_engine = async_engine.sync_engine
+        self._engines[sync_engine] = async_engine
+        if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+            return
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(sync_engine, "handle_error", _handle_error)
+
+
+slow_query_log = SlowQueryLog(
+    settings.SLOW_QUERY_SECONDS,
+    settings.SLOW_QUERY_MAX_STATEMENTS,
+    settings.SLOW_QUERY_EXPLAIN,
+)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("slow_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["slow_query_start"].pop()
+    if elapsed >= slow_query_log.threshold:
+        slow_query_log.record(conn, statement, parameters, executemany, elapsed)
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("slow_query_start"):
+        conn.info["slow_query_start"].pop()
+
+
+def open_log_file(path: str, max_bytes: int, backups: int) -> None:
+    """Write slow query records to a rotating file."""
+    if file_logger.handlers:
+        return
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    file_logger.addHandler(handler)
+    file_logger.setLevel(logging.INFO)
+
+
+def close_log_file() -> None:
+    for handler in list(file_logger.handlers):
+        file_logger.removeHandler(handler)
+        handler.close()
+
+
+def watch_engines() -> None:
+    """Watch the primary and, when configured, the replica engine.
+
+    The log file is opened by the application's lifespan, not here: importing
+    the application should not create directories.
+    """
+    slow_query_log.watch(engine)
+    if read_engine is not engine:
+        slow_query_log.watch(read_engine)
+
+
+class SlowQueryMiddleware:
+    """ASGI middleware making the request's route known to the slow query log."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+        token = _request_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_scope.reset(token)
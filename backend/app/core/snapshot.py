@@ -0,0 +1,497 @@
+"""Offline catalog snapshots for POS terminals.
+
+A snapshot is one little-endian binary file holding products, barcodes,
+prices and per-location stock, laid out so a client can ``mmap`` it and read
+records in place:
+
+    header      64 bytes, see ``HEADER``
+    offsets     u32 per product: where its record starts in the records section
+    records     per product, sorted by id: ``PRODUCT``, then ``stock_count``
+                ``STOCK`` entries, then the UTF-8 sku, name, barcode and unit
+    locations   per location: ``LOCATION``, then the UTF-8 name
+    index       barcode hash table, ``index_slots`` u32 entries
+
+The index is open addressing with linear probing over a power-of-two number
+of slots: start at ``fnv1a_64(barcode) & (slots - 1)``; a slot holds the
+product's position plus one, 0 ends the probe. Prices are integers in minor
+units (cents). The snapshot ``version`` is the change-log version it was
+built at, so a client can catch up with ``/sync?since=version``.
+
+Records keep everything about a product together, so a price or stock change
+rewrites bytes in place and a renamed product only moves the offsets after
+it; diffs between versions (``make_diff``/``apply_diff``) stay small.
+"""
+import asyncio
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+import zlib
+from decimal import Decimal
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.changes import latest_version
+from app.core.coalesce import SingleFlight
+from app.core.config import settings
+from app.models.inventory import Inventory
+from app.models.location import Location
+from app.models.product import Product
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"SMCS"
+DIFF_MAGIC = b"SMCD"
+FORMAT_VERSION = 1
+
+# magic, format version, header size, catalog version, built at (unix seconds),
+# product count, location count, index slots, then the offsets of the offsets,
+# records, locations and index sections
+HEADER = struct.Struct("<4sHHQqIIIIIII")
+HEADER_SIZE = 64
+# id, unit price, cost price, is active, stock entry count, then the byte
+# lengths of sku, name, barcode and unit
+PRODUCT = struct.Struct("<IqqBHHHHH")
+# location id, quantity
+STOCK = struct.Struct("<Ii")
+# location id, byte length of the name
+LOCATION = struct.Struct("<IH")
+SLOT = struct.Struct("<I")
+
+# magic, format version, from version, to version, target size, target sha256;
+# then instructions: copy (op, source offset, length) or data (op, length, bytes)
+DIFF_HEADER = struct.Struct("<4sHQQQ32s")
+DIFF_COPY = struct.Struct("<BQI")
+DIFF_DATA = struct.Struct("<BI")
+_OP_END, _OP_COPY, _OP_DATA = 0, 1, 2
+DIFF_BLOCK_SIZE = 512
+# Changed blocks a diff looks past for data that did not move
+DIFF_IN_PLACE_BLOCKS = 8
+_ADLER_MOD = 65521
+
+
+def fnv1a_64(data: bytes) -> int:
+    """64-bit FNV-1a hash, used for the barcode index."""
+    value = 0xCBF29CE484222325
+    for byte in data:
+        value = ((value ^ byte) * 0x100000001B3) & 0xFFFFFFFFFFFFFFFF
+    return value
+
+
+def _minor_units(amount: Decimal) -> int:
+    return int(Decimal(amount).scaleb(2))
+
+
+def encode_snapshot(
+    version: int,
+    products: list,
+    stock: list,
+    locations: list,
+    built_at: Optional[int] = None,
+) -> bytes:
+    """Encode rows into a snapshot file.
+
+    ``products`` are ``(id, sku, name, barcode, unit, unit_price, cost_price,
+    is_active)`` rows, ``stock`` ``(product_id, location_id, quantity)`` rows
+    and ``locations`` ``(id, name)`` rows.
+    """
+    stock_by_product: dict[int, list[tuple[int, int]]] = {}
+    for product_id, location_id, quantity in sorted(stock):
+        stock_by_product.setdefault(product_id, []).append((location_id, quantity))
+
+    offsets = bytearray()
+    records = bytearray()
+    barcodes: list[tuple[bytes, int]] = []
+    products = sorted(products, key=lambda row: row[0])
+    for position, (product_id, sku, name, barcode, unit, unit_price, cost_price, is_active) in enumerate(products):
+        entries = stock_by_product.get(product_id, [])
+        texts = [(value or "").encode() for value in (sku, name, barcode, unit)]
+        offsets += SLOT.pack(len(records))
+        records += PRODUCT.pack(
+            product_id, _minor_units(unit_price), _minor_units(cost_price),
+            1 if is_active else 0, len(entries), *(len(text) for text in texts),
+        )
+        for entry in entries:
+            records += STOCK.pack(*entry)
+        records += b"".join(texts)
+        if barcode:
+            barcodes.append((texts[2], position))
+
+    location_records = bytearray()
+    for location_id, name in sorted(locations):
+        encoded = name.encode()
+        location_records += LOCATION.pack(location_id, len(encoded)) + encoded
+
+    slots = 1
+    while slots < len(barcodes) * 2:
+        slots *= 2
+    table = [0] * slots
+    for encoded, position in barcodes:
+        slot = fnv1a_64(encoded) & (slots - 1)
+        while table[slot]:
+            slot = (slot + 1) & (slots - 1)
+        table[slot] = position + 1
+    index = struct.pack(f"<{slots}I", *table)
+
+    offsets_offset = HEADER_SIZE
+    records_offset = offsets_offset + len(offsets)
+    locations_offset = records_offset + len(records)
+    index_offset = locations_offset + len(location_records)
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, HEADER_SIZE, version, int(time.time()) if built_at is None else built_at,
+        len(products), len(locations), slots,
+        offsets_offset, records_offset, locations_offset, index_offset,
+    )
+    return b"".join((header.ljust(HEADER_SIZE, b"\0"), offsets, records, location_records, index))
+
+
+class SnapshotProduct(NamedTuple):
+    id: int
+    sku: str
+    name: str
+    barcode: Optional[str]
+    unit: str
+    unit_price: Decimal
+    cost_price: Decimal
+    is_active: bool
+    stock: dict[int, int]
+
+
+class CatalogSnapshot:
+    """Read-only view over a snapshot file, reading records in place."""
+
+    def __init__(self, buffer):
+        self._buffer = memoryview(buffer)
+        (
+            magic, format_version, _, self.version, self.built_at,
+            self.product_count, self.location_count, self.index_slots,
+            self._offsets, self._records, self._locations, self._index,
+        ) = HEADER.unpack_from(self._buffer)
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            raise ValueError("Not a catalog snapshot in a supported format")
+        self._mmap = None
+
+    @classmethod
+    def open(cls, path) -> "CatalogSnapshot":
+        """Memory-map a snapshot file."""
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        snapshot = cls(mapped)
+        snapshot._mmap = mapped
+        return snapshot
+
+    def close(self) -> None:
+        self._buffer.release()
+        if self._mmap is not None:
+            self._mmap.close()
+
+    def __len__(self) -> int:
+        return self.product_count
+
+    def _record(self, position: int) -> tuple[int, tuple]:
+        (offset,) = SLOT.unpack_from(self._buffer, self._offsets + position * SLOT.size)
+        start = self._records + offset
+        return start, PRODUCT.unpack_from(self._buffer, start)
+
+    def product(self, position: int) -> SnapshotProduct:
+        """Decode the product at ``position`` (products are sorted by id)."""
+        if not 0 <= position < self.product_count:
+            raise IndexError(position)
+        start, (product_id, unit_price, cost_price, is_active, stock_count, *lengths) = self._record(position)
+        cursor = start + PRODUCT.size
+        stock = dict(STOCK.unpack_from(self._buffer, cursor + i * STOCK.size) for i in range(stock_count))
+        cursor += stock_count * STOCK.size
+        texts = []
+        for length in lengths:
+            texts.append(str(self._buffer[cursor:cursor + length], "utf-8"))
+            cursor += length
+        sku, name, barcode, unit = texts
+        return SnapshotProduct(
+            id=product_id,
+            sku=sku,
+            name=name,
+            barcode=barcode or None,
+            unit=unit,
+            unit_price=Decimal(unit_price).scaleb(-2),
+            cost_price=Decimal(cost_price).scaleb(-2),
+            is_active=bool(is_active),
+            stock=stock,
+        )
+
+    def lookup(self, barcode: str) -> Optional[SnapshotProduct]:
+        """Find a product by barcode through the hash index."""
+        encoded = barcode.encode()
+        mask = self.index_slots - 1
+        slot = fnv1a_64(encoded) & mask
+        while True:
+            (entry,) = SLOT.unpack_from(self._buffer, self._index + slot * SLOT.size)
+            if not entry:
+                return None
+            start, (_, _, _, _, stock_count, sku_length, name_length, barcode_length, _) = self._record(entry - 1)
+            if barcode_length == len(encoded):
+                cursor = start + PRODUCT.size + stock_count * STOCK.size + sku_length + name_length
+                if self._buffer[cursor:cursor + barcode_length] == encoded:
+                    return self.product(entry - 1)
+            slot = (slot + 1) & mask
+
+    def locations(self) -> dict[int, str]:
+        """Location names by id."""
+        names = {}
+        cursor = self._locations
+        for _ in range(self.location_count):
+            location_id, length = LOCATION.unpack_from(self._buffer, cursor)
+            cursor += LOCATION.size
+            names[location_id] = str(self._buffer[cursor:cursor + length], "utf-8")
+            cursor += length
+        return names
+
+
+def _block_index(source: memoryview, block_size: int) -> dict[int, list[int]]:
+    """Offsets of the source's whole aligned blocks by Adler-32 checksum."""
+    index: dict[int, list[int]] = {}
+    for offset in range(0, len(source) - block_size + 1, block_size):
+        index.setdefault(zlib.adler32(source[offset:offset + block_size]), []).append(offset)
+    return index
+
+
+def _changed_in_place(source: memoryview, target: memoryview, expected: int, position: int, block_size: int) -> int:
+    """Length of a run of changed blocks followed by one matching where expected, 0 if none is near."""
+    for ahead in range(1, DIFF_IN_PLACE_BLOCKS + 1):
+        start = position + ahead * block_size
+        following = target[start:start + block_size]
+        if len(following) < block_size:
+            return 0
+        if source[expected + ahead * block_size:expected + (ahead + 1) * block_size] == following:
+            return ahead * block_size
+    return 0
+
+
+def _find_block(source: memoryview, index: dict[int, list[int]], checksum: int, window: memoryview) -> int:
+    """Offset of the source block equal to ``window``, -1 if none."""
+    for offset in index.get(checksum, ()):
+        if source[offset:offset + len(window)] == window:
+            return offset
+    return -1
+
+
+def _slide(target: bytes, index: dict[int, list[int]], position: int, last: int, checksum: int, block_size: int) -> tuple[int, int]:
+    """Roll the window forward to the next position whose checksum is indexed, or to ``last``."""
+    a, b = checksum & 0xFFFF, checksum >> 16
+    while position < last:
+        removed, added = target[position], target[position + block_size]
+        a = (a - removed + added) % _ADLER_MOD
+        b = (b - block_size * removed + a - 1) % _ADLER_MOD
+        position += 1
+        if ((b << 16) | a) in index:
+            break
+    return position, (b << 16) | a
+
+
+def make_diff(source: bytes, target: bytes, from_version: int, to_version: int) -> bytes:
+    """Describe ``target`` as copies from ``source`` plus literal data.
+
+    Works like rsync: the source's aligned blocks are indexed by a weak
+    checksum, and a target window whose checksum is in the index is compared
+    byte for byte with the blocks it names. A target block is first tried at
+    the source position following the previous match, and blocks changed in
+    place (a later one matching where expected) are sent as literal data
+    right away. Otherwise the window slides one byte at a time with a rolling
+    Adler-32, so runs of records shifted by an insertion are found again
+    within a block. Each target byte costs constant time, whatever the share
+    of changed records.
+    """
+    out = bytearray(DIFF_HEADER.pack(
+        DIFF_MAGIC, FORMAT_VERSION, from_version, to_version, len(target), hashlib.sha256(target).digest()
+    ))
+    block = DIFF_BLOCK_SIZE
+    src, tgt = memoryview(source), memoryview(target)
+    index = _block_index(src, block)
+    copy_start = copy_length = 0
+    literal = bytearray()
+    expected = 0
+
+    def flush_copy():
+        nonlocal copy_length
+        if copy_length:
+            out.extend(DIFF_COPY.pack(_OP_COPY, copy_start, copy_length))
+            copy_length = 0
+
+    def flush_literal():
+        if literal:
+            out.extend(DIFF_DATA.pack(_OP_DATA, len(literal)))
+            out.extend(literal)
+            literal.clear()
+
+    def add_literal(data: memoryview):
+        if data:
+            flush_copy()
+            literal.extend(data)
+
+    def add_copy(offset: int, length: int):
+        nonlocal copy_start, copy_length
+        flush_literal()
+        if copy_length and offset == copy_start + copy_length:
+            copy_length += length
+        else:
+            flush_copy()
+            copy_start, copy_length = offset, length
+
+    position = 0
+    last = len(target) - block  # Start of the last whole window
+    while position <= last:
+        window = tgt[position:position + block]
+        if src[expected:expected + block] == window:
+            found = expected
+        else:
+            changed = _changed_in_place(src, tgt, expected, position, block)
+            if changed:
+                add_literal(tgt[position:position + changed])
+                position += changed
+                expected += changed
+                continue
+            start = position
+            checksum = zlib.adler32(window)
+            while True:
+                found = _find_block(src, index, checksum, tgt[position:position + block])
+                if found >= 0 or position == last:
+                    break
+                position, checksum = _slide(target, index, position, last, checksum, block)
+            if found < 0:
+                position = start
+                break
+            add_literal(tgt[start:position])
+        add_copy(found, block)
+        position += block
+        expected = found + block
+
+    tail = tgt[position:]
+    if tail and len(tail) < block and src[expected:expected + len(tail)] == tail:
+        add_copy(expected, len(tail))
+    else:
+        add_literal(tail)
+    flush_copy()
+    flush_literal()
+    out.append(_OP_END)
+    return bytes(out)
+
+
+def apply_diff(source: bytes, diff: bytes) -> bytes:
+    """Rebuild the target snapshot from ``source`` and a diff made by ``make_diff``."""
+    magic, format_version, _, _, size, digest = DIFF_HEADER.unpack_from(diff)
+    if magic != DIFF_MAGIC or format_version != FORMAT_VERSION:
+        raise ValueError("Not a catalog snapshot diff in a supported format")
+    target = bytearray()
+    position = DIFF_HEADER.size
+    while diff[position] != _OP_END:
+        if diff[position] == _OP_COPY:
+            _, offset, length = DIFF_COPY.unpack_from(diff, position)
+            target += source[offset:offset + length]
+            position += DIFF_COPY.size
+        else:
+            _, length = DIFF_DATA.unpack_from(diff, position)
+            position += DIFF_DATA.size
+            target += diff[position:position + length]
+            position += length
+    if len(target) != size or hashlib.sha256(target).digest() != digest:
+        raise ValueError("Diff does not apply to this snapshot")
+    return bytes(target)
+
+
+class SnapshotStore:
+    """Snapshot files and diffs kept in a directory, newest ``retain`` versions."""
+
+    def __init__(self, directory: str, retain: int, rebuild_seconds: float):
+        self.directory = Path(directory)
+        self.retain = retain
+        self.rebuild_seconds = rebuild_seconds
+        self._lock = asyncio.Lock()
+        self._checked_at = float("-inf")
+        self._diffs = SingleFlight()
+
+    def path(self, version: int) -> Path:
+        return self.directory / f"catalog-{version:012d}.smcs"
+
+    def diff_path(self, from_version: int, to_version: int) -> Path:
+        return self.directory / "diffs" / f"{from_version:012d}-{to_version:012d}.smcd"
+
+    def versions(self) -> list[int]:
+        """Versions on disk, oldest first."""
+        if not self.directory.is_dir():
+            return []
+        return sorted(int(path.stem.split("-")[1]) for path in self.directory.glob("catalog-*.smcs"))
+
+    def _write(self, path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp, path)
+
+    def _prune(self) -> None:
+        versions = self.versions()
+        for version in versions[:-self.retain]:
+            self.path(version).unlink(missing_ok=True)
+            for diff in (self.directory / "diffs").glob(f"{version:012d}-*.smcd"):
+                diff.unlink(missing_ok=True)
+
+    async def build(self, db: AsyncSession) -> int:
+        """Write a snapshot of the current catalog and return its version."""
+        # Read the version first: rows changed meanwhile are newer, never older
+        version = await latest_version(db)
+        products = (await db.execute(
+            select(
+                Product.id, Product.sku, Product.name, Product.barcode, Product.unit,
+                Product.unit_price, Product.cost_price, Product.is_active,
+            )
+        )).all()
+        stock = (await db.execute(
+            select(Inventory.product_id, Inventory.location_id, Inventory.quantity)
+        )).all()
+        locations = (await db.execute(select(Location.id, Location.name))).all()
+
+        def write():
+            data = encode_snapshot(version, products, stock, locations)
+            self._write(self.path(version), data)
+            self._prune()
+            return len(data)
+
+        size = await asyncio.to_thread(write)
+        logger.info("Built catalog snapshot %d (%d products, %d bytes)", version, len(products), size)
+        return version
+
+    async def latest(self, db: AsyncSession) -> int:
+        """Version of the newest snapshot, rebuilt when stale at most every ``rebuild_seconds``."""
+        async with self._lock:
+            versions = self.versions()
+            if versions and time.monotonic() - self._checked_at < self.rebuild_seconds:
+                return versions[-1]
+            self._checked_at = time.monotonic()
+            if versions and versions[-1] >= await latest_version(db):
+                return versions[-1]
+            return await self.build(db)
+
+    async def diff(self, from_version: int, to_version: int) -> Optional[Path]:
+        """Path of the diff between two stored versions, None if ``from_version`` is gone."""
+        path = self.diff_path(from_version, to_version)
+        if path.exists():
+            return path
+        source_path, target_path = self.path(from_version), self.path(to_version)
+        if not source_path.exists() or not target_path.exists():
+            return None
+
+        def write():
+            data = make_diff(source_path.read_bytes(), target_path.read_bytes(), from_version, to_version)
+            self._write(path, data)
+
+        # Clients that were all at the same version ask for the same diff, it is built once
+        await self._diffs.run((from_version, to_version), lambda: asyncio.to_thread(write))
+        return path
+
+
+snapshot_store = SnapshotStore(settings.SNAPSHOT_DIR, settings.SNAPSHOT_RETAIN, settings.SNAPSHOT_REBUILD_SECONDS)
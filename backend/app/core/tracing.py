@@ -0,0 +1,326 @@
+"""Sampled request tracing, written as OpenTelemetry (OTLP/JSON) lines.
+
+A sampled request gets a trace: a server span for the whole request with
+child spans for the ``get_current_user``, ``get_db`` and ``get_read_db``
+dependencies, every SQL statement, stock postings and the serialization of
+list responses. A share of ``TRACE_SAMPLE_RATE`` requests is sampled; a
+request carrying a W3C ``traceparent`` header follows its sampled flag and
+joins that trace instead, so a client can ask for a trace of its request.
+Requests that are not sampled only pay for the sampling decision.
+
+Each finished trace is written as one line to ``TRACE_FILE``, rotated at
+``TRACE_FILE_MAX_BYTES``: an OTLP ``ExportTraceServiceRequest`` in its JSON
+encoding, which the OpenTelemetry Collector's ``otlpjsonfile`` receiver and
+trace viewers load without a collector running alongside the app. A trace
+keeps at most ``TRACE_MAX_SPANS`` spans; the root span counts those dropped.
+"""
+import functools
+import json
+import logging
+import os
+import random
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+
+
+# OTLP span kinds and status codes
+INTERNAL = 1
+SERVER = 2
+CLIENT = 3
+STATUS_ERROR = 2
+
+# Longest SQL text kept on a statement span
+MAX_STATEMENT_LENGTH = 2000
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+# Finished traces, one JSON line each; kept out of the application log
+trace_logger = logging.getLogger("stockmaster.traces")
+trace_logger.propagate = False
+
+
+def _attribute(key: str, value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        encoded = {"boolValue": value}
+    elif isinstance(value, int):
+        encoded = {"intValue": str(value)}
+    elif isinstance(value, float):
+        encoded = {"doubleValue": value}
+    else:
+        encoded = {"stringValue": str(value)}
+    return {"key": key, "value": encoded}
+
+
+class Span:
+    """A timed operation within a trace."""
+
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "start", "end", "attributes", "error")
+
+    def __init__(self, trace: "Trace", name: str, kind: int, parent_id: Optional[str], attributes: dict[str, Any]):
+        self.trace = trace
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start = time.time_ns()
+        self.end: Optional[int] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def fail(self, error: BaseException) -> None:
+        """Mark the span failed, unless the error is a client error answered with 4xx."""
+        if isinstance(error, HTTPException) and error.status_code < 500:
+            return
+        self.attributes["error.type"] = type(error).__qualname__
+        self.error = str(error) or type(error).__qualname__
+
+    def finish(self) -> None:
+        if self.end is None:
+            self.end = time.time_ns()
+
+    def otlp(self) -> dict[str, Any]:
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start),
+            "endTimeUnixNano": str(self.end or time.time_ns()),
+            "attributes": [_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": STATUS_ERROR, "message": self.error} if self.error else {},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class Trace:
+    """The spans recorded for one sampled request."""
+
+    def __init__(self, trace_id: str, max_spans: int):
+        self.trace_id = trace_id
+        self.max_spans = max_spans
+        self.spans: list[Span] = []
+        self.dropped = 0
+
+    def start(self, name: str, kind: int, parent_id: Optional[str], attributes: dict[str, Any]) -> Optional[Span]:
+        """Start a span, or count it as dropped when the trace is full."""
+        if len(self.spans) >= self.max_spans:
+            self.dropped += 1
+            return None
+        span = Span(self, name, kind, parent_id, attributes)
+        self.spans.append(span)
+        return span
+
+    def otlp(self) -> dict[str, Any]:
+        """The trace as an OTLP/JSON ``ExportTraceServiceRequest``."""
+        return {"resourceSpans": [{
+            "resource": {"attributes": [
+                _attribute("service.name", settings.APP_NAME),
+                _attribute("service.version", settings.APP_VERSION),
+                _attribute("process.pid", os.getpid()),
+            ]},
+            "scopeSpans": [{
+                "scope": {"name": "stockmaster", "version": settings.APP_VERSION},
+                "spans": [span.otlp() for span in self.spans],
+            }],
+        }]}
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    """The innermost open span of the current request, None when it is not traced."""
+    return _current_span.get()
+
+
+def start_span(
+    name: str,
+    kind: int = INTERNAL,
+    attributes: Optional[dict[str, Any]] = None,
+    parent: Optional[Span] = None,
+) -> Optional[Span]:
+    """Start a child of ``parent`` (the current span by default) without making it current.
+
+    Returns None when the request is not traced; the caller finishes the span.
+    """
+    parent = parent or _current_span.get()
+    if parent is None:
+        return None
+    return parent.trace.start(name, kind, parent.span_id, attributes or {})
+
+
+@contextmanager
+def span(name: str, kind: int = INTERNAL, parent: Optional[Span] = None, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Trace the block as a child span, current while the block runs."""
+    child = start_span(name, kind, attributes, parent)
+    if child is None:
+        yield None
+        return
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.fail(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        child.finish()
+
+
+def traced(name: Optional[str] = None):
+    """Decorator tracing each call of an async function as a span."""
+    def decorate(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return await func(*args, **kwargs)
+            with span(span_name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_span.get() is None:
+        return
+    attributes = {"db.system.name": conn.dialect.name, "db.query.text": statement[:MAX_STATEMENT_LENGTH]}
+    if executemany:
+        attributes["db.operation.batch.size"] = len(parameters)
+    # Named by the statement's first keyword: SELECT, INSERT, UPDATE, ...
+    context._trace_span = start_span(statement.split(None, 1)[0].upper() if statement.strip() else "SQL", CLIENT, attributes)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    sql_span = getattr(context, "_trace_span", None)
+    if sql_span is not None:
+        sql_span.finish()
+
+
+def _handle_error(exception_context):
+    sql_span = getattr(exception_context.execution_context, "_trace_span", None)
+    if sql_span is not None:
+        sql_span.fail(exception_context.original_exception)
+        sql_span.finish()
+
+
+def trace_engine(async_engine: AsyncEngine) -> None:
+    """Record a span for every statement a traced request runs on an engine."""
+    sync_engine = async_engine.sync_engine
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+def open_trace_file(path: str, max_bytes: int, backups: int) -> None:
+    """Write finished traces to a rotating file."""
+    if trace_logger.handlers:
+        return
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    trace_logger.addHandler(handler)
+    trace_logger.setLevel(logging.INFO)
+
+
+def close_trace_file() -> None:
+    for handler in list(trace_logger.handlers):
+        trace_logger.removeHandler(handler)
+        handler.close()
+
+
+def trace_engines() -> None:
+    """Trace statements on the primary and, when configured, the replica engine.
+
+    The trace file is opened by the application's lifespan, not here.
+    """
+    # Imported here: app.core.database imports this module for its dependency spans
+    from app.core.database import engine, read_engine
+
+    trace_engine(engine)
+    if read_engine is not engine:
+        trace_engine(read_engine)
+
+
+def _headers(scope) -> dict[bytes, bytes]:
+    return dict(scope.get("headers") or ())
+
+
+class TracingMiddleware:
+    """ASGI middleware sampling requests and writing the traces of sampled ones."""
+
+    def __init__(self, app, sample_rate: Optional[float] = None, max_spans: Optional[int] = None):
+        # Imported here: app.core.instrumentation imports app.core.database, which imports this module
+        from app.core.instrumentation import route_template
+
+        self.app = app
+        self.sample_rate = settings.TRACE_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.max_spans = settings.TRACE_MAX_SPANS if max_spans is None else max_spans
+        self.route_template = route_template
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        parent = _TRACEPARENT.match(_headers(scope).get(b"traceparent", b"").decode("latin-1").strip().lower())
+        if parent is not None and parent.group(1) != "0" * 32:
+            trace_id, parent_id = parent.group(1), parent.group(2)
+            sampled = bool(int(parent.group(3), 16) & 1)
+        else:
+            trace_id, parent_id = f"{random.getrandbits(128):032x}", None
+            sampled = random.random() < self.sample_rate
+        if not sampled:
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(trace_id, self.max_spans)
+        root = trace.start(scope["method"], SERVER, parent_id, {
+            "http.request.method": scope["method"],
+            "url.path": scope["path"],
+        })
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        token = _current_span.set(root)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            root.fail(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            route = self.route_template(scope)
+            root.name = f"{scope['method']} {route}"
+            root.set_attribute("http.route", route)
+            root.set_attribute("http.response.status_code", status_code)
+            if status_code >= 500 and root.error is None:
+                root.error = f"HTTP {status_code}"
+            if trace.dropped:
+                root.set_attribute("stockmaster.dropped_spans", trace.dropped)
+            root.finish()
+            trace_logger.info(json.dumps(trace.otlp(), separators=(",", ":")))
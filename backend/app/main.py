@@ -1,9 +1,21 @@
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy.exc import DBAPIError
 
+from app.core.admission import AdmissionMiddleware
+from app.core.cancellation import CancelOnDisconnectMiddleware
+from app.core.changes import backfill_change_log, change_sequencer
 from app.core.config import settings
-from app.core.database import init_db
+from app.core.database import dispose_engines, init_db, is_statement_timeout
+from app.core.events import invalidation_bus
+from app.core.instrumentation import MetricsMiddleware, instrument_engines
+from app.core.jobs import job_engine
+from app.core.metrics import PROMETHEUS_CONTENT_TYPE, registry
+from app.core.querytrack import QueryTrackingMiddleware, track_engines
+from app.core.slowlog import SlowQueryMiddleware, close_log_file, open_log_file, watch_engines
+from app.core.tracing import TracingMiddleware, close_trace_file, open_trace_file, trace_engines
 from app.api.routes import (
     auth_router,
     categories_router,
@@ -12,16 +24,35 @@ from app.api.routes import (
     locations_router,
     inventory_router,
     transactions_router,
+    system_router,
+    sync_router,
+    catalog_router,
+    scanner_router,
+    jobs_router,
 )
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events."""
-    # Startup: Initialize database
+    # Startup: open the slow query log and trace files, initialize database
+    if settings.SLOW_QUERY_ENABLED and settings.SLOW_QUERY_LOG_FILE:
+        open_log_file(settings.SLOW_QUERY_LOG_FILE, settings.SLOW_QUERY_LOG_MAX_BYTES, settings.SLOW_QUERY_LOG_BACKUPS)
+    if settings.TRACING_ENABLED:
+        open_trace_file(settings.TRACE_FILE, settings.TRACE_FILE_MAX_BYTES, settings.TRACE_FILE_BACKUPS)
     await init_db()
+    await backfill_change_log()
+    await change_sequencer.start()
+    await invalidation_bus.start()
+    await job_engine.start()
     yield
-    # Shutdown: cleanup if needed
+    # Shutdown: requeue running jobs, stop background tasks and close pooled connections
+    await job_engine.stop()
+    await invalidation_bus.stop()
+    await change_sequencer.stop()
+    await dispose_engines()
+    close_log_file()
+    close_trace_file()
 
 
 app = FastAPI(
@@ -31,6 +62,14 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Admission control, inside CORS so 429 responses stay readable by browsers
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware)
+
+# Cancel abandoned requests, including those still queued for admission
+if settings.CANCEL_ON_DISCONNECT:
+    app.add_middleware(CancelOnDisconnectMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -40,6 +79,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Slow statements with their route and plan, listed at /system/slow-queries
+if settings.SLOW_QUERY_ENABLED:
+    watch_engines()
+    app.add_middleware(SlowQueryMiddleware)
+
+# Statement capture for query budgets, plus N+1 warnings in development
+track_engines()
+if settings.QUERY_TRACKING:
+    app.add_middleware(QueryTrackingMiddleware)
+
+# Sampled request traces with dependency and SQL spans, written to TRACE_FILE
+if settings.TRACING_ENABLED:
+    trace_engines()
+    app.add_middleware(TracingMiddleware)
+
+# Metrics middleware (outermost, so it times the whole request)
+if settings.METRICS_ENABLED:
+    instrument_engines()
+    app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth_router, prefix=settings.API_PREFIX)
 app.include_router(categories_router, prefix=settings.API_PREFIX)
@@ -48,6 +107,22 @@ app.include_router(products_router, prefix=settings.API_PREFIX)
 app.include_router(locations_router, prefix=settings.API_PREFIX)
 app.include_router(inventory_router, prefix=settings.API_PREFIX)
 app.include_router(transactions_router, prefix=settings.API_PREFIX)
+app.include_router(system_router, prefix=settings.API_PREFIX)
+app.include_router(sync_router, prefix=settings.API_PREFIX)
+app.include_router(catalog_router, prefix=settings.API_PREFIX)
+app.include_router(scanner_router, prefix=settings.API_PREFIX)
+app.include_router(jobs_router, prefix=settings.API_PREFIX)
+
+
+@app.exception_handler(DBAPIError)
+async def database_error_handler(request: Request, exc: DBAPIError):
+    """Answer statements cancelled by their timeout with 503, other database errors stay 500."""
+    if not is_statement_timeout(exc):
+        raise exc
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "The request took too long, narrow it down or use a background job"},
+    )
 
 
 @app.get("/")
@@ -64,3 +139,10 @@ async def root():
 async def health_check():
     """Health check endpoint."""
     return {"status": "healthy"}
+
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Prometheus metrics endpoint."""
+        return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -6,6 +6,9 @@ from app.models.product import Product
 from app.models.location import Location, LocationType
 from app.models.inventory import Inventory
 from app.models.transaction import Transaction, TransactionType
+from app.models.entity_version import EntityVersion
+from app.models.change_log import ChangeLog
+from app.models.job import Job, JobStatus
 
 __all__ = [
     "User",
@@ -18,4 +21,8 @@ __all__ = [
     "Inventory",
     "Transaction",
     "TransactionType",
+    "EntityVersion",
+    "ChangeLog",
+    "Job",
+    "JobStatus",
 ]
@@ -0,0 +1,50 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import BigInteger, DateTime, Index, Integer, String, func, text
+from sqlalchemy.orm import Mapped, mapped_column
+from app.core.database import Base
+
+
+class ChangeLog(Base):
+    """One row per change to a synced entity.
+    
+    Written on flush for products, inventory and locations. ``seq`` numbers
+    rows in insert order; ``version``, the number store clients sync from, is
+    assigned once the row is committed, so versions follow commit order.
+    Deletes are found by the entity row no longer existing when the change is
+    read. Edits to a category, supplier or location are logged as one marker
+    row (``entity`` "category", "supplier" or "location") that the sequencer
+    expands into the rows referencing it.
+    """
+    
+    __tablename__ = "change_log"
+    
+    seq: Mapped[int] = mapped_column(
+        BigInteger().with_variant(Integer, "sqlite"),  # SQLite only autoincrements INTEGER keys
+        primary_key=True,
+        autoincrement=True
+    )
+    version: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    entity: Mapped[str] = mapped_column(String(20), nullable=False)
+    entity_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    changed_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        server_default=func.localtimestamp(),
+        nullable=False
+    )
+    
+    __table_args__ = (
+        # The feed reads by version; rows waiting for one are found by the sequencer
+        Index("ix_change_log_version", "version", unique=True),
+        Index(
+            "ix_change_log_unsequenced",
+            "seq",
+            postgresql_where=text("version IS NULL"),
+            sqlite_where=text("version IS NULL"),
+        ),
+        # Compaction looks for a later change to the same entity
+        Index("ix_change_log_entity", "entity", "entity_id", "version"),
+    )
+    
+    def __repr__(self) -> str:
+        return f"<ChangeLog(seq={self.seq}, version={self.version}, entity='{self.entity}', entity_id={self.entity_id})>"
@@ -0,0 +1,32 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, DateTime, Sequence, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+from app.core.database import Base
+
+
+# Global change counter shared by all tags (PostgreSQL only, SQLite counts from the table)
+entity_version_seq = Sequence("entity_version_seq", metadata=Base.metadata)
+
+
+class EntityVersion(Base):
+    """Latest change version per invalidation tag.
+    
+    Written by the invalidation bus, for entity tags in the transaction of
+    each change and for collection tags right after it, so workers that
+    missed a notification can find the tags that changed while they were
+    disconnected.
+    """
+    
+    __tablename__ = "entity_versions"
+    
+    tag: Mapped[str] = mapped_column(String(200), primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        server_default=func.localtimestamp(),
+        nullable=False,
+        index=True
+    )
+    
+    def __repr__(self) -> str:
+        return f"<EntityVersion(tag='{self.tag}', version={self.version})>"
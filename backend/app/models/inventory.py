@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import ForeignKey, DateTime, Integer, UniqueConstraint
+from sqlalchemy import ForeignKey, DateTime, Index, Integer, UniqueConstraint, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.core.database import Base
 
@@ -12,13 +12,11 @@ class Inventory(Base):
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     product_id: Mapped[int] = mapped_column(
         ForeignKey("products.id", ondelete="CASCADE"), 
-        nullable=False,
-        index=True
+        nullable=False
     )
     location_id: Mapped[int] = mapped_column(
         ForeignKey("locations.id", ondelete="CASCADE"), 
-        nullable=False,
-        index=True
+        nullable=False
     )
     quantity: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     reorder_level: Mapped[int] = mapped_column(Integer, default=10, nullable=False)
@@ -30,9 +28,19 @@ class Inventory(Base):
         nullable=False
     )
     
-    # Unique constraint: one inventory record per product per location
+    # Unique constraint: one inventory record per product per location; it also
+    # serves lookups by product. Lists are read most recently updated first.
     __table_args__ = (
         UniqueConstraint('product_id', 'location_id', name='uq_product_location'),
+        Index("ix_inventory_last_updated", "last_updated"),
+        Index("ix_inventory_location_updated", "location_id", "last_updated"),
+        # Partial: only the rows at or below their reorder level, for alerts
+        Index(
+            "ix_inventory_low_stock",
+            "quantity",
+            postgresql_where=text("quantity <= reorder_level"),
+            sqlite_where=text("quantity <= reorder_level"),
+        ),
     )
     
     # Relationships
@@ -0,0 +1,68 @@
+from datetime import datetime
+from typing import Any, Optional
+from enum import Enum
+from sqlalchemy import JSON, String, Text, Integer, BigInteger, ForeignKey, DateTime, Index, Enum as SQLEnum
+from sqlalchemy.orm import Mapped, mapped_column
+from app.core.database import Base
+
+
+class JobStatus(str, Enum):
+    """Lifecycle states of a background job."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+    EXPIRED = "expired"         # Succeeded, result file since removed
+
+
+class Job(Base):
+    """Background job record, kept across restarts.
+    
+    A worker claims a queued job by moving it to running and refreshes
+    ``heartbeat_at`` while it works; running jobs whose heartbeat stops are
+    queued again, until ``attempts`` reaches ``JOB_MAX_ATTEMPTS``.
+    """
+    
+    __tablename__ = "jobs"
+    
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    type: Mapped[str] = mapped_column(String(50), nullable=False)
+    status: Mapped[JobStatus] = mapped_column(
+        SQLEnum(JobStatus),
+        default=JobStatus.QUEUED,
+        nullable=False
+    )
+    params: Mapped[dict[str, Any]] = mapped_column(JSON, default=dict, nullable=False)
+    user_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("users.id", ondelete="SET NULL"),
+        nullable=True,
+        index=True
+    )
+    
+    # Progress
+    processed: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    total: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)  # Times claimed by a worker
+    
+    # Result file, relative to JOB_RESULTS_DIR, and the host that wrote it
+    result_file: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    result_node: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    result_size: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    media_type: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    filename: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    
+    # The dispatcher looks jobs up by status, then type
+    __table_args__ = (
+        Index("ix_jobs_status_type", "status", "type"),
+    )
+    
+    def __repr__(self) -> str:
+        return f"<Job(id={self.id}, type='{self.type}', status='{self.status}')>"
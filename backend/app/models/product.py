@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional
 from decimal import Decimal
-from sqlalchemy import String, Text, Numeric, ForeignKey, DateTime, Boolean
+from sqlalchemy import String, Text, Numeric, ForeignKey, DateTime, Boolean, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.core.database import Base
 
@@ -40,6 +40,12 @@ class Product(Base):
         nullable=False
     )
     
+    # Filtered lists are ordered by name
+    __table_args__ = (
+        Index("ix_products_category_name", "category_id", "name"),
+        Index("ix_products_supplier_name", "supplier_id", "name"),
+    )
+    
     # Relationships
     category = relationship("Category", back_populates="products")
     supplier = relationship("Supplier", back_populates="products")
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional
 from enum import Enum
-from sqlalchemy import String, Text, Integer, ForeignKey, DateTime, Enum as SQLEnum
+from sqlalchemy import String, Text, Integer, ForeignKey, DateTime, Index, Enum as SQLEnum
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.core.database import Base
 
@@ -23,13 +23,11 @@ class Transaction(Base):
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     product_id: Mapped[int] = mapped_column(
         ForeignKey("products.id", ondelete="CASCADE"), 
-        nullable=False,
-        index=True
+        nullable=False
     )
     location_id: Mapped[int] = mapped_column(
         ForeignKey("locations.id", ondelete="CASCADE"), 
-        nullable=False,
-        index=True
+        nullable=False
     )
     user_id: Mapped[int] = mapped_column(
         ForeignKey("users.id", ondelete="SET NULL"), 
@@ -39,8 +37,7 @@ class Transaction(Base):
     
     type: Mapped[TransactionType] = mapped_column(
         SQLEnum(TransactionType), 
-        nullable=False,
-        index=True
+        nullable=False
     )
     quantity: Mapped[int] = mapped_column(Integer, nullable=False)
     reference: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)  # PO number, invoice, etc.
@@ -59,6 +56,13 @@ class Transaction(Base):
         index=True
     )
     
+    # The ledger is read newest first, filtered by product, location or type
+    __table_args__ = (
+        Index("ix_transactions_product_created", "product_id", "created_at"),
+        Index("ix_transactions_location_created", "location_id", "created_at"),
+        Index("ix_transactions_type_created", "type", "created_at"),
+    )
+    
     # Relationships
     product = relationship("Product", back_populates="transactions")
     location = relationship("Location", back_populates="transactions", foreign_keys=[location_id])
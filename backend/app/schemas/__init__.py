@@ -30,6 +30,15 @@ from app.schemas.transaction import (
     TransactionBase, TransactionCreate,
     TransactionResponse, TransactionListResponse, TransactionFilter
 )
+from app.schemas.system import (
+    HistogramBucket, HistogramSnapshot, PoolStatsResponse,
+    SlowQueryStats, SlowQueryListResponse
+)
+from app.schemas.sync import SyncTombstones, SyncResponse
+from app.schemas.job import (
+    JobCreate, JobResponse, JobListResponse,
+    ExportJobParams, TransactionExportJobParams, InventoryReportJobParams
+)
 
 __all__ = [
     # User
@@ -55,4 +64,12 @@ __all__ = [
     # Transaction
     "TransactionBase", "TransactionCreate",
     "TransactionResponse", "TransactionListResponse", "TransactionFilter",
+    # System
+    "HistogramBucket", "HistogramSnapshot", "PoolStatsResponse",
+    "SlowQueryStats", "SlowQueryListResponse",
+    # Sync
+    "SyncTombstones", "SyncResponse",
+    # Job
+    "JobCreate", "JobResponse", "JobListResponse",
+    "ExportJobParams", "TransactionExportJobParams", "InventoryReportJobParams",
 ]
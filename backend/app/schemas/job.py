@@ -0,0 +1,55 @@
+from datetime import datetime
+from typing import Any, Literal, Optional
+from pydantic import BaseModel, Field
+from app.models.job import JobStatus
+from app.models.transaction import TransactionType
+
+
+# Submit schema; params are checked against the job type
+class JobCreate(BaseModel):
+    type: str = Field(..., max_length=50)
+    params: dict[str, Any] = {}
+
+
+# Response schema
+class JobResponse(BaseModel):
+    id: int
+    type: str
+    status: JobStatus
+    params: dict[str, Any]
+    processed: int
+    total: Optional[int] = None
+    progress: Optional[float] = None  # 0..1, when the total is known
+    error: Optional[str] = None
+    attempts: int = 0
+    result_size: Optional[int] = None
+    filename: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+# Job list response
+class JobListResponse(BaseModel):
+    items: list[JobResponse]
+    total: int
+    page: int
+    size: int
+
+
+# Params of the export job types
+class ExportJobParams(BaseModel):
+    format: Literal["csv", "msgpack", "arrow"] = "csv"
+
+
+class TransactionExportJobParams(ExportJobParams):
+    type: Optional[TransactionType] = None
+
+
+class InventoryReportJobParams(ExportJobParams):
+    location_id: Optional[int] = None
+    low_stock_only: bool = False
@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+from app.schemas.product import ProductResponse
+from app.schemas.inventory import InventoryResponse
+from app.schemas.location import LocationResponse
+
+
+# Ids deleted since the client's version
+class SyncTombstones(BaseModel):
+    products: list[int] = []
+    inventory: list[int] = []
+    locations: list[int] = []
+
+
+# Rows created or updated since the client's version, in their current state
+class SyncResponse(BaseModel):
+    version: int
+    has_more: bool
+    products: list[ProductResponse] = []
+    inventory: list[InventoryResponse] = []
+    locations: list[LocationResponse] = []
+    deleted: SyncTombstones
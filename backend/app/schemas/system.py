@@ -0,0 +1,45 @@
+from datetime import datetime
+from typing import Any, Optional
+from pydantic import BaseModel
+
+
+# Histogram bucket (cumulative count up to the bound)
+class HistogramBucket(BaseModel):
+    le: str
+    count: int
+
+
+class HistogramSnapshot(BaseModel):
+    buckets: list[HistogramBucket]
+    count: int
+    sum: float
+
+
+# Connection pool statistics
+class PoolStatsResponse(BaseModel):
+    pool_class: str
+    size: Optional[int] = None
+    checked_in: Optional[int] = None
+    checked_out: Optional[int] = None
+    overflow: Optional[int] = None
+    timeouts: int
+    wait_time: HistogramSnapshot
+
+
+# Slow statements, totalled per statement shape
+class SlowQueryStats(BaseModel):
+    statement: str
+    count: int
+    total_seconds: float
+    mean_seconds: float
+    max_seconds: float
+    last_seen: datetime
+    routes: dict[str, int]
+    params: Any = None  # Of the last execution, strings and bytes redacted
+    plan: Optional[list[str]] = None
+    plan_error: Optional[str] = None
+
+
+class SlowQueryListResponse(BaseModel):
+    threshold_seconds: float
+    items: list[SlowQueryStats]
@@ -0,0 +1,8 @@
+"""Services module initialization - domain logic shared by several routes."""
+from app.services.stock import StockMovement, apply_stock_transaction, commit_stock_movements
+
+__all__ = [
+    "StockMovement",
+    "apply_stock_transaction",
+    "commit_stock_movements",
+]
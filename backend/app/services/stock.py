@@ -0,0 +1,138 @@
+"""Stock movements, shared by the transactions API and scanner ingestion."""
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.broker import stock_broker
+from app.core.events import inventory_tags, invalidation_bus
+from app.core.refdata import Ref, reference_data
+from app.core.tracing import traced
+from app.models.transaction import Transaction, TransactionType
+from app.models.inventory import Inventory
+from app.models.product import Product
+from app.models.location import Location
+from app.schemas.transaction import TransactionCreate
+
+
+class StockMovement:
+    """A transaction applied to inventory in the session, not yet committed."""
+    
+    def __init__(
+        self,
+        transaction: Transaction,
+        product: Product,
+        location: Ref,
+        inventories: list[Inventory],
+        created_location: bool,
+    ):
+        self.transaction = transaction
+        self.product = product
+        self.location = location
+        self.inventories = inventories
+        self.created_location = created_location
+    
+    @property
+    def stale_tags(self) -> list[str]:
+        """Cache tags to publish once the movement is committed."""
+        tags = list(inventory_tags(*(inventory.location_id for inventory in self.inventories)))
+        if self.created_location:
+            tags.append("locations")
+        return tags
+
+
+@traced()
+async def apply_stock_transaction(
+    db: AsyncSession,
+    data: TransactionCreate,
+    user_id: Optional[int],
+) -> StockMovement:
+    """Update inventory for a transaction and add the transaction record.
+    
+    Raises ``HTTPException`` (400) when the product or location does not
+    exist or stock is insufficient. The caller commits.
+    """
+    # Validate product
+    product = (await db.execute(select(Product).where(Product.id == data.product_id))).scalar_one_or_none()
+    if not product:
+        raise HTTPException(status_code=400, detail="Product not found")
+    
+    # Get or create default location
+    location_id = data.location_id
+    created_location = False
+    if not location_id:
+        location = await reference_data.default_location()
+        if not location:
+            default = Location(name="Main Warehouse", type="warehouse")
+            db.add(default)
+            await db.flush()
+            location = Ref(default.id, default.name)
+            created_location = True
+        location_id = location.id
+    else:
+        location = await reference_data.locations.get(location_id)
+        if not location:
+            raise HTTPException(status_code=400, detail="Location not found")
+    if data.destination_location_id and not await reference_data.locations.get(data.destination_location_id):
+        raise HTTPException(status_code=400, detail="Destination location not found")
+    
+    # Get or create inventory record
+    inv_result = await db.execute(
+        select(Inventory).where(
+            (Inventory.product_id == data.product_id) & (Inventory.location_id == location_id)
+        )
+    )
+    inventory = inv_result.scalar_one_or_none()
+    
+    if not inventory:
+        inventory = Inventory(product_id=data.product_id, location_id=location_id, quantity=0)
+        db.add(inventory)
+    
+    changed_inventory = [inventory]
+    # Update inventory based on transaction type
+    if data.type == TransactionType.STOCK_IN or data.type == TransactionType.RETURN:
+        inventory.quantity += data.quantity
+    elif data.type == TransactionType.STOCK_OUT:
+        if inventory.quantity < data.quantity:
+            raise HTTPException(status_code=400, detail="Insufficient stock")
+        inventory.quantity -= data.quantity
+    elif data.type == TransactionType.ADJUSTMENT:
+        inventory.quantity = data.quantity  # Direct set for adjustments
+    elif data.type == TransactionType.TRANSFER:
+        if not data.destination_location_id:
+            raise HTTPException(status_code=400, detail="Destination required for transfer")
+        if inventory.quantity < data.quantity:
+            raise HTTPException(status_code=400, detail="Insufficient stock")
+        
+        inventory.quantity -= data.quantity
+        
+        # Get or create destination inventory
+        dest_inv = (await db.execute(
+            select(Inventory).where(
+                (Inventory.product_id == data.product_id) & 
+                (Inventory.location_id == data.destination_location_id)
+            )
+        )).scalar_one_or_none()
+        
+        if not dest_inv:
+            dest_inv = Inventory(product_id=data.product_id, location_id=data.destination_location_id, quantity=0)
+            db.add(dest_inv)
+        dest_inv.quantity += data.quantity
+        changed_inventory.append(dest_inv)
+    
+    # Create transaction record
+    transaction = Transaction(
+        product_id=data.product_id, location_id=location_id,
+        type=data.type, quantity=data.quantity, reference=data.reference,
+        notes=data.notes, destination_location_id=data.destination_location_id,
+        user_id=user_id
+    )
+    db.add(transaction)
+    return StockMovement(transaction, product, location, changed_inventory, created_location)
+
+
+async def commit_stock_movements(db: AsyncSession, *movements: StockMovement) -> None:
+    """Commit the movements, announcing them to caches and then to live stock streams."""
+    tags = [tag for movement in movements for tag in movement.stale_tags]
+    await invalidation_bus.commit(db, *tags)
+    stock_broker.publish_stock(*(inventory for movement in movements for inventory in movement.inventories))
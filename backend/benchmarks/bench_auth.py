@@ -0,0 +1,59 @@
+"""Micro-benchmark of the auth dependency path with and without the token cache.
+
+Usage: python -m benchmarks.bench_auth [iterations]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/bench_auth.db"
+)
+
+from app.api.deps import user_for_token  # noqa: E402
+from app.core.database import async_session_maker, init_db  # noqa: E402
+from app.core.security import create_access_token, decode_token, token_cache  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+
+def bench_decode(token: str, iterations: int, cached: bool) -> float:
+    """Return microseconds per ``decode_token`` call."""
+    token_cache.clear()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        if not cached:
+            token_cache.clear()
+        decode_token(token)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+async def bench_dependency(token: str, iterations: int, cached: bool) -> float:
+    """Return microseconds per ``user_for_token`` call against SQLite."""
+    token_cache.clear()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        if not cached:
+            token_cache.clear()
+        await user_for_token(token, async_session_maker)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+async def main(iterations: int) -> None:
+    await init_db()
+    async with async_session_maker() as db:
+        user = User(email="bench@stockmaster.com", hashed_password="x", full_name="Bench")
+        db.add(user)
+        await db.commit()
+        token = create_access_token(data={"sub": str(user.id)})
+
+    print(f"iterations: {iterations}")
+    for label, cached in (("before (no cache)", False), ("after (cached)", True)):
+        decode_us = bench_decode(token, iterations, cached)
+        dep_us = await bench_dependency(token, iterations, cached)
+        print(f"{label:20} decode_token: {decode_us:8.2f} us   user_for_token: {dep_us:8.2f} us")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
@@ -0,0 +1,91 @@
+"""Throughput and payload size of the export formats.
+
+Requests each export endpoint through the ASGI app, as a client would, once
+per format: the semicolon CSV, MessagePack and Arrow IPC. Reports rows per
+second end to end and the body size relative to CSV. The binary formats carry
+every field of the list response schema, the CSV only the spreadsheet columns,
+so sizes compare payloads as delivered rather than per field. They need the
+optional ``msgpack`` and ``pyarrow`` packages; missing ones are skipped.
+
+Usage: python -m benchmarks.bench_exports [iterations] [products]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/bench_exports.db"
+)
+
+import httpx  # noqa: E402
+from sqlalchemy import func, select  # noqa: E402
+
+from app.core.database import async_session_maker, engine, init_db  # noqa: E402
+from app.core.exports import ARROW, CSV, MSGPACK  # noqa: E402
+from app.core.security import create_access_token  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Product, Transaction  # noqa: E402
+from benchmarks.seed import SeedConfig, seed_database  # noqa: E402
+
+FORMATS = {"csv": (CSV, None), "msgpack": (MSGPACK, "msgpack"), "arrow": (ARROW, "pyarrow")}
+ENDPOINTS = {"products": (Product, "/api/v1/products/export/csv"),
+             "transactions": (Transaction, "/api/v1/transactions/export/csv")}
+
+
+def available(module) -> bool:
+    if module is None:
+        return True
+    try:
+        __import__(module)
+    except ImportError:
+        return False
+    return True
+
+
+async def measure(client, url: str, media_type: str, iterations: int) -> tuple[float, int]:
+    """Return wall seconds per export and the body size in bytes."""
+    headers = {"Accept": media_type}
+    response = await client.get(url, headers=headers)  # Warm up statement caches
+    response.raise_for_status()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        response = await client.get(url, headers=headers)
+    return (time.perf_counter() - start) / iterations, len(response.content)
+
+
+async def main(iterations: int, products: int) -> None:
+    await init_db()
+    admin_id = await seed_database(engine, SeedConfig(products=products, transactions=products * 10), "x")
+    token = create_access_token(data={"sub": str(admin_id)})
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", headers={"Authorization": f"Bearer {token}"}
+    ) as client:
+        print(f"iterations: {iterations}, products: {products}")
+        print(f"{'endpoint':14} {'format':8} {'rows':>8} {'ms':>9} {'rows/s':>11} {'bytes':>11} {'vs csv':>7}")
+        for name, (model, url) in ENDPOINTS.items():
+            async with async_session_maker() as db:
+                rows = await db.scalar(select(func.count(model.id)))
+            csv_size = None
+            for label, (media_type, module) in FORMATS.items():
+                if not available(module):
+                    print(f"{name:14} {label:8} skipped, '{module}' is not installed")
+                    continue
+                seconds, size = await measure(client, url, media_type, iterations)
+                csv_size = csv_size or size
+                print(
+                    f"{name:14} {label:8} {rows:8d} {seconds * 1000:9.1f} {rows / seconds:11.0f} "
+                    f"{size:11d} {size / csv_size:6.2f}x"
+                )
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    asyncio.run(main(
+        int(args[0]) if args else 10,
+        int(args[1]) if len(args) > 1 else 5000,
+    ))
@@ -0,0 +1,119 @@
+"""Scan throughput per station: WebSocket ingestion against REST posts.
+
+Serves the app with uvicorn on a local port and plays one scanner station
+sending stock-in scans by barcode, first as ``POST /transactions`` requests
+one after another, then over ``/scanner/ws``, both waiting for each ack
+before the next scan and keeping a window of unacknowledged scans in flight,
+which lets the server apply them in batches. Reports scans per second.
+
+Usage: python -m benchmarks.bench_scanner [scans] [window]
+"""
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import time
+
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/bench_scanner.db"
+)
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from websockets.asyncio.client import connect  # noqa: E402
+
+from app.core.database import engine, init_db  # noqa: E402
+from app.core.security import create_access_token  # noqa: E402
+from app.main import app  # noqa: E402
+from benchmarks.seed import BARCODE_BASE, SeedConfig, seed_database  # noqa: E402
+
+PRODUCTS = 2000
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def scans(count: int, rng: random.Random) -> list[dict]:
+    return [
+        {"seq": seq, "type": "stock_in", "barcode": str(BARCODE_BASE + rng.randint(1, PRODUCTS)), "quantity": 1}
+        for seq in range(1, count + 1)
+    ]
+
+
+async def rest(base: str, token: str, batch: list[dict]) -> float:
+    """Post each scan as a transaction, resolving the barcode first as a station would."""
+    headers = {"Authorization": f"Bearer {token}"}
+    async with httpx.AsyncClient(base_url=base, headers=headers) as client:
+        start = time.perf_counter()
+        for scan in batch:
+            found = await client.get("/api/v1/products", params={"search": scan["barcode"], "size": 1})
+            found.raise_for_status()
+            response = await client.post("/api/v1/transactions", json={
+                "product_id": found.json()["items"][0]["id"], "type": scan["type"], "quantity": scan["quantity"],
+            })
+            response.raise_for_status()
+        return time.perf_counter() - start
+
+
+async def websocket(base: str, token: str, batch: list[dict], window: int) -> float:
+    """Stream scans keeping up to ``window`` of them unacknowledged."""
+    url = base.replace("http", "ws", 1) + "/api/v1/scanner/ws"
+    async with connect(url, additional_headers={"Authorization": f"Bearer {token}"}) as ws:
+        assert json.loads(await ws.recv())["status"] == "ready"
+        start = time.perf_counter()
+        sent = acked = 0
+        while acked < len(batch):
+            while sent < len(batch) and sent - acked < window:
+                await ws.send(json.dumps(batch[sent]))
+                sent += 1
+            ack = json.loads(await ws.recv())
+            if ack["status"] != "ok":
+                raise RuntimeError(ack)
+            acked += 1
+        return time.perf_counter() - start
+
+
+async def main(count: int, window: int) -> None:
+    await init_db()
+    admin_id = await seed_database(engine, SeedConfig(products=PRODUCTS, transactions=PRODUCTS), "x")
+    token = create_access_token(data={"sub": str(admin_id)})
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning", lifespan="off"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    base = f"http://127.0.0.1:{port}"
+
+    rng = random.Random(42)
+    await rest(base, token, scans(20, rng))  # Warm up connections and statement caches
+    await websocket(base, token, scans(20, rng), window)
+
+    print(f"scans: {count}")
+    print(f"{'channel':24} {'seconds':>9} {'scans/s':>9}")
+    runs = {
+        "rest": lambda: rest(base, token, scans(count, rng)),
+        "websocket window=1": lambda: websocket(base, token, scans(count, rng), 1),
+        f"websocket window={window}": lambda: websocket(base, token, scans(count, rng), window),
+    }
+    for name, run in runs.items():
+        seconds = await run()
+        print(f"{name:24} {seconds:9.2f} {count / seconds:9.0f}")
+
+    server.should_exit = True
+    await serving
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    asyncio.run(main(
+        int(args[0]) if args else 2000,
+        int(args[1]) if len(args) > 1 else 100,
+    ))
@@ -0,0 +1,179 @@
+"""CPU cost of building 100-row list responses, model path versus row path.
+
+"before" loads ORM objects, builds one pydantic model per row, validates the
+page again against the response model and encodes it with the stdlib JSON
+encoder, as the list routes used to. "after" selects the response columns
+directly and serializes the rows with the fast encoder.
+
+Usage: python -m benchmarks.bench_serialization [iterations] [products]
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/bench_serialization.db"
+)
+
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import func, select  # noqa: E402
+from sqlalchemy.orm import selectinload  # noqa: E402
+
+from app.api.routes.inventory import INVENTORY_PROJECTION  # noqa: E402
+from app.api.routes.products import PRODUCT_PROJECTION  # noqa: E402
+from app.api.routes.transactions import TRANSACTION_PROJECTION  # noqa: E402
+from app.core.database import async_session_maker, engine, init_db  # noqa: E402
+from app.core.querytrack import capture_queries, track_engines  # noqa: E402
+from app.core.responses import dumps, row_dicts  # noqa: E402
+from app.models import Inventory, Product, Transaction  # noqa: E402
+from app.schemas import (  # noqa: E402
+    InventoryListResponse,
+    InventoryResponse,
+    ProductListResponse,
+    ProductResponse,
+    TransactionListResponse,
+    TransactionResponse,
+)
+from benchmarks.seed import SeedConfig, seed_database  # noqa: E402
+
+PAGE_SIZE = 100
+
+
+def encode_models(list_model, page) -> bytes:
+    """Validate against the response model and encode as FastAPI does by default."""
+    adapter = TypeAdapter(list_model)
+    validated = adapter.validate_python(page, from_attributes=True)
+    return json.dumps(adapter.dump_python(validated, mode="json")).encode()
+
+
+async def products_before(db) -> bytes:
+    result = await db.execute(
+        select(Product)
+        .options(selectinload(Product.category), selectinload(Product.supplier))
+        .order_by(Product.name)
+        .limit(PAGE_SIZE)
+    )
+    items = []
+    for product in result.scalars().all():
+        stock_result = await db.execute(
+            select(func.sum(Inventory.quantity)).where(Inventory.product_id == product.id)
+        )
+        items.append(ProductResponse(
+            id=product.id, sku=product.sku, name=product.name, description=product.description,
+            unit_price=product.unit_price, cost_price=product.cost_price, barcode=product.barcode,
+            unit=product.unit, image_url=product.image_url, category_id=product.category_id,
+            supplier_id=product.supplier_id, is_active=product.is_active,
+            created_at=product.created_at, updated_at=product.updated_at,
+            category_name=product.category.name if product.category else None,
+            supplier_name=product.supplier.name if product.supplier else None,
+            total_stock=stock_result.scalar() or 0,
+        ))
+    page = ProductListResponse(items=items, total=len(items), page=1, size=PAGE_SIZE)
+    return encode_models(ProductListResponse, page)
+
+
+async def transactions_before(db) -> bytes:
+    result = await db.execute(
+        select(Transaction)
+        .options(
+            selectinload(Transaction.product),
+            selectinload(Transaction.location),
+            selectinload(Transaction.user),
+        )
+        .order_by(Transaction.created_at.desc())
+        .limit(PAGE_SIZE)
+    )
+    items = [
+        TransactionResponse(
+            id=t.id, product_id=t.product_id, location_id=t.location_id,
+            type=t.type, quantity=t.quantity, reference=t.reference,
+            notes=t.notes, destination_location_id=t.destination_location_id,
+            user_id=t.user_id, created_at=t.created_at,
+            product_name=t.product.name if t.product else None,
+            product_sku=t.product.sku if t.product else None,
+            location_name=t.location.name if t.location else None,
+            user_name=t.user.full_name if t.user else None,
+        ) for t in result.scalars().all()
+    ]
+    page = TransactionListResponse(items=items, total=len(items), page=1, size=PAGE_SIZE)
+    return encode_models(TransactionListResponse, page)
+
+
+async def inventory_before(db) -> bytes:
+    result = await db.execute(
+        select(Inventory)
+        .options(selectinload(Inventory.product), selectinload(Inventory.location))
+        .order_by(Inventory.last_updated.desc())
+        .limit(PAGE_SIZE)
+    )
+    items = [
+        InventoryResponse(
+            id=inv.id, product_id=inv.product_id, location_id=inv.location_id,
+            quantity=inv.quantity, reorder_level=inv.reorder_level,
+            reorder_quantity=inv.reorder_quantity, last_updated=inv.last_updated,
+            product_name=inv.product.name if inv.product else None,
+            product_sku=inv.product.sku if inv.product else None,
+            location_name=inv.location.name if inv.location else None,
+            is_low_stock=inv.quantity <= inv.reorder_level,
+        ) for inv in result.scalars().all()
+    ]
+    page = InventoryListResponse(items=items, total=len(items), page=1, size=PAGE_SIZE)
+    return encode_models(InventoryListResponse, page)
+
+
+def rows_after(projection, order_by):
+    async def load(db) -> bytes:
+        result = await db.execute(projection.select().order_by(order_by).limit(PAGE_SIZE))
+        items = row_dicts(result)
+        return dumps({"items": items, "total": len(items), "page": 1, "size": PAGE_SIZE})
+    return load
+
+
+CASES = {
+    "products": (products_before, rows_after(PRODUCT_PROJECTION, Product.name)),
+    "transactions": (transactions_before, rows_after(TRANSACTION_PROJECTION, Transaction.created_at.desc())),
+    "inventory": (inventory_before, rows_after(INVENTORY_PROJECTION, Inventory.last_updated.desc())),
+}
+
+
+async def measure(load, iterations: int) -> tuple[float, float, int]:
+    """Return CPU ms and wall ms per response, and statements per response."""
+    async with async_session_maker() as db:
+        await load(db)  # Warm up statement caches
+        with capture_queries() as log:
+            await load(db)
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        for _ in range(iterations):
+            db.expunge_all()
+            await load(db)
+        cpu = (time.process_time() - cpu_start) / iterations * 1000
+        wall = (time.perf_counter() - wall_start) / iterations * 1000
+    return cpu, wall, log.count
+
+
+async def main(iterations: int, products: int) -> None:
+    await init_db()
+    track_engines()
+    await seed_database(engine, SeedConfig(products=products, transactions=products * 10), "x")
+
+    print(f"iterations: {iterations}, page size: {PAGE_SIZE}, products: {products}")
+    print(f"{'endpoint':14} {'path':7} {'cpu ms':>9} {'wall ms':>9} {'queries':>8}")
+    for name, (before, after) in CASES.items():
+        results = {}
+        for label, load in (("before", before), ("after", after)):
+            cpu, wall, queries = await measure(load, iterations)
+            results[label] = cpu
+            print(f"{name:14} {label:7} {cpu:9.3f} {wall:9.3f} {queries:8d}")
+        print(f"{'':14} {'speedup':7} {results['before'] / results['after']:8.1f}x")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    asyncio.run(main(
+        int(args[0]) if args else 200,
+        int(args[1]) if len(args) > 1 else 2000,
+    ))
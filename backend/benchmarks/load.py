@@ -0,0 +1,250 @@
+"""End-to-end load benchmark running the app in-process against a local database.
+
+Seeds a fresh database with synthetic data, then drives a weighted mix of
+catalog browsing, barcode scanning, stock posting and export requests through
+an async HTTP client. Results are written as JSON so runs can be compared:
+
+    python -m benchmarks.load --products 5000 --duration 30 --output before.json
+    python -m benchmarks.load --products 5000 --duration 30 --output after.json --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+
+@dataclass
+class Request:
+    endpoint: str
+    method: str
+    url: str
+    body: Optional[dict] = None
+
+
+@dataclass
+class EndpointResult:
+    latencies: list[float] = field(default_factory=list)
+    queries: list[int] = field(default_factory=list)
+    errors: int = 0
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def build_scenarios(config, prefix: str) -> dict[str, tuple[float, Callable[[random.Random], list[Request]]]]:
+    """Weighted workload scenarios, each producing one or more requests."""
+    products, locations = config.products, config.locations
+
+    def browse(rng):
+        page = rng.randint(1, max(1, products // 20))
+        return [
+            Request("GET /categories/all", "GET", f"{prefix}/categories/all"),
+            Request("GET /products", "GET", f"{prefix}/products?page={page}&size=20"),
+            Request("GET /products/{id}", "GET", f"{prefix}/products/{rng.randint(1, products)}"),
+        ]
+
+    def scan(rng):
+        barcode = 4600000000000 + rng.randint(1, products)
+        return [Request("GET /products?search", "GET", f"{prefix}/products?search={barcode}&size=5")]
+
+    def post_stock(rng):
+        return [Request("POST /transactions", "POST", f"{prefix}/transactions", {
+            "product_id": rng.randint(1, products),
+            "location_id": rng.randint(1, locations),
+            "type": "stock_in" if rng.random() < 0.6 else "adjustment",
+            "quantity": rng.randint(1, 20),
+            "reference": "BENCH",
+        })]
+
+    def reports(rng):
+        return [
+            Request("GET /transactions", "GET", f"{prefix}/transactions?page={rng.randint(1, 20)}&size=50"),
+            Request("GET /inventory/low-stock", "GET", f"{prefix}/inventory/low-stock"),
+            Request("GET /locations", "GET", f"{prefix}/locations"),
+        ]
+
+    def export(rng):
+        if rng.random() < 0.5:
+            return [Request("GET /products/export/csv", "GET", f"{prefix}/products/export/csv")]
+        return [Request("GET /transactions/export/csv", "GET", f"{prefix}/transactions/export/csv")]
+
+    return {
+        "browse": (config.weight_browse, browse),
+        "scan": (config.weight_scan, scan),
+        "post_stock": (config.weight_post, post_stock),
+        "reports": (config.weight_reports, reports),
+        "export": (config.weight_export, export),
+    }
+
+
+async def run_workload(config) -> dict:
+    import httpx
+
+    from app.core.config import settings
+    from app.core.database import engine
+    from app.core.querytrack import capture_queries
+    from app.core.security import create_access_token, get_password_hash
+    from app.main import app
+    from benchmarks.seed import SeedConfig, seed_database
+
+    results: dict[str, EndpointResult] = {}
+    scenarios = build_scenarios(config, settings.API_PREFIX)
+    names = list(scenarios)
+    weights = [scenarios[name][0] for name in names]
+
+    async with app.router.lifespan_context(app):
+        seed_start = time.perf_counter()
+        user_id = await seed_database(engine, SeedConfig(
+            products=config.products, locations=config.locations,
+            transactions=config.transactions, seed=config.seed,
+        ), get_password_hash("benchmark"))
+        seed_seconds = time.perf_counter() - seed_start
+
+        token = create_access_token(data={"sub": str(user_id)})
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport,
+            base_url="http://benchmark",
+            headers={"Authorization": f"Bearer {token}"},
+            timeout=None,
+        ) as client:
+            deadline = time.perf_counter() + config.duration
+            issued = 0
+
+            async def worker(worker_id: int):
+                nonlocal issued
+                rng = random.Random(config.seed * 1000 + worker_id)
+                while time.perf_counter() < deadline and (
+                    config.max_requests is None or issued < config.max_requests
+                ):
+                    scenario = rng.choices(names, weights)[0]
+                    for request in scenarios[scenario][1](rng):
+                        issued += 1
+                        result = results.setdefault(request.endpoint, EndpointResult())
+                        with capture_queries() as log:
+                            start = time.perf_counter()
+                            response = await client.request(request.method, request.url, json=request.body)
+                            await response.aread()
+                            elapsed = time.perf_counter() - start
+                        result.latencies.append(elapsed)
+                        result.queries.append(log.count)
+                        if response.status_code >= 400 and not (
+                            request.endpoint == "POST /transactions" and response.status_code == 400
+                        ):
+                            result.errors += 1
+
+            run_start = time.perf_counter()
+            await asyncio.gather(*(worker(i) for i in range(config.concurrency)))
+            run_seconds = time.perf_counter() - run_start
+
+    endpoints = {}
+    for endpoint, result in sorted(results.items()):
+        count = len(result.latencies)
+        endpoints[endpoint] = {
+            "requests": count,
+            "errors": result.errors,
+            "throughput_rps": round(count / run_seconds, 2),
+            "mean_ms": round(sum(result.latencies) / count * 1000, 3),
+            "p50_ms": round(percentile(result.latencies, 50) * 1000, 3),
+            "p95_ms": round(percentile(result.latencies, 95) * 1000, 3),
+            "p99_ms": round(percentile(result.latencies, 99) * 1000, 3),
+            "queries_per_request": round(sum(result.queries) / count, 2),
+            "max_queries": max(result.queries),
+        }
+    total_requests = sum(e["requests"] for e in endpoints.values())
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "database": config.database_url.split("://")[0],
+            "seed_seconds": round(seed_seconds, 3),
+            "config": {k: v for k, v in vars(config).items() if k != "database_url"},
+        },
+        "summary": {
+            "requests": total_requests,
+            "errors": sum(e["errors"] for e in endpoints.values()),
+            "duration_s": round(run_seconds, 3),
+            "throughput_rps": round(total_requests / run_seconds, 2),
+        },
+        "endpoints": endpoints,
+    }
+
+
+def print_report(report: dict, baseline: Optional[dict] = None) -> None:
+    header = f"{'endpoint':32} {'req':>6} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8}"
+    print(header)
+    print("-" * len(header))
+    for endpoint, stats in report["endpoints"].items():
+        line = (
+            f"{endpoint:32} {stats['requests']:>6} {stats['throughput_rps']:>8.1f} "
+            f"{stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f} "
+            f"{stats['queries_per_request']:>8.1f}"
+        )
+        previous = (baseline or {}).get("endpoints", {}).get(endpoint)
+        if previous and previous["p95_ms"]:
+            change = (stats["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"] * 100
+            line += f"   p95 {change:+.1f}%"
+        print(line)
+    summary = report["summary"]
+    print(f"\n{summary['requests']} requests in {summary['duration_s']}s "
+          f"({summary['throughput_rps']} req/s), {summary['errors']} errors")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="Defaults to a fresh SQLite file")
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--locations", type=int, default=5)
+    parser.add_argument("--transactions", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds to run the workload")
+    parser.add_argument("--max-requests", type=int, default=None)
+    parser.add_argument("--weight-browse", type=float, default=40)
+    parser.add_argument("--weight-scan", type=float, default=30)
+    parser.add_argument("--weight-post", type=float, default=20)
+    parser.add_argument("--weight-reports", type=float, default=8)
+    parser.add_argument("--weight-export", type=float, default=2)
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    parser.add_argument("--compare", default=None, help="Baseline JSON report to compare p95 against")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    config = parse_args(argv)
+    if config.database_url is None:
+        config.database_url = f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/benchmark.db"
+    # Settings are read at import time, so configure the app before importing it
+    os.environ["DATABASE_URL"] = config.database_url
+    os.environ.setdefault("QUERY_TRACKING", "false")
+
+    report = asyncio.run(run_workload(config))
+    baseline = None
+    if config.compare:
+        with open(config.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if config.output:
+        with open(config.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""Deterministic synthetic data for benchmarks and scale testing.
+
+Generates category trees, suppliers, products, locations, per-location
+inventory and a transaction ledger with skewed, production-like
+distributions: product popularity and location volume follow a Zipf law,
+and ledger activity grows over time. The same seed always produces the same
+rows. On PostgreSQL rows are streamed with COPY; other databases use batched
+executemany inserts.
+
+    python -m benchmarks.seed --database-url postgresql+asyncpg://... \\
+        --products 500000 --locations 300 --transactions 50000000
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import time
+from dataclasses import dataclass, fields
+from datetime import datetime, timedelta
+from decimal import Decimal
+from enum import Enum
+from typing import Iterable, Iterator, Optional
+
+from sqlalchemy import Table, insert, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.models import (
+    Category, Supplier, Product, Location, LocationType,
+    Inventory, Transaction, TransactionType, User, UserRole,
+)
+
+
+BATCH_SIZE = 5000
+COPY_BATCH_SIZE = 100_000
+
+BARCODE_BASE = 4600000000000
+
+# Share of ledger rows per transaction type
+TRANSACTION_MIX = (
+    (TransactionType.STOCK_OUT, 0.62),
+    (TransactionType.STOCK_IN, 0.28),
+    (TransactionType.ADJUSTMENT, 0.05),
+    (TransactionType.TRANSFER, 0.03),
+    (TransactionType.RETURN, 0.02),
+)
+
+
+@dataclass
+class SeedConfig:
+    categories: int = 20
+    category_depth: int = 3
+    suppliers: int = 10
+    products: int = 2000
+    locations: int = 5
+    stock_density: float = 1.0  # Share of locations stocking the most popular product
+    transactions: int = 20000
+    users: int = 5
+    days: int = 90
+    zipf_exponent: float = 1.1
+    seed: int = 42
+    anchor: str = ""  # ISO timestamp used as "now", empty for the current time
+
+
+class ZipfSampler:
+    """Draws ids 1..n with probability proportional to 1 / rank ** exponent.
+
+    Ranks are shuffled with the seed so popular ids are spread over the range.
+    """
+
+    def __init__(self, n: int, exponent: float, rng: random.Random):
+        self.ids = list(range(1, n + 1))
+        rng.shuffle(self.ids)
+        self.cum_weights = list(itertools.accumulate(1.0 / rank ** exponent for rank in range(1, n + 1)))
+        self.rng = rng
+
+    def sample(self, k: int) -> list[int]:
+        return self.rng.choices(self.ids, cum_weights=self.cum_weights, k=k)
+
+    def popularity(self) -> dict[int, float]:
+        """Stocking breadth per id: 1.0 for the top rank, decaying with sqrt(rank)."""
+        return {product_id: 1.0 / rank ** 0.5 for rank, product_id in enumerate(self.ids, start=1)}
+
+
+def _rng(config: SeedConfig, stream: str) -> random.Random:
+    """Independent generator per table, so table sizes do not affect each other."""
+    return random.Random(f"{config.seed}:{stream}")
+
+
+# Column order of the tuples produced by each generator
+USER_COLUMNS = ("id", "email", "hashed_password", "full_name", "role", "is_active", "created_at", "updated_at")
+CATEGORY_COLUMNS = ("id", "name", "description", "parent_id", "created_at", "updated_at")
+SUPPLIER_COLUMNS = (
+    "id", "name", "contact_person", "email", "phone", "address", "notes", "is_active", "created_at", "updated_at",
+)
+LOCATION_COLUMNS = ("id", "name", "type", "address", "phone", "is_active", "created_at", "updated_at")
+PRODUCT_COLUMNS = (
+    "id", "sku", "name", "description", "unit_price", "cost_price", "barcode", "unit", "image_url",
+    "is_active", "category_id", "supplier_id", "created_at", "updated_at",
+)
+INVENTORY_COLUMNS = (
+    "id", "product_id", "location_id", "quantity", "reorder_level", "reorder_quantity", "last_updated",
+)
+TRANSACTION_COLUMNS = (
+    "id", "product_id", "location_id", "user_id", "type", "quantity", "reference", "notes",
+    "destination_location_id", "created_at",
+)
+
+
+def users(config: SeedConfig, hashed_password: str, now: datetime) -> Iterator[tuple]:
+    yield (1, "bench@stockmaster.com", hashed_password, "Benchmark Admin", UserRole.ADMIN, True, now, now)
+    for i in range(2, config.users + 1):
+        role = UserRole.MANAGER if i % 4 == 0 else UserRole.STAFF
+        yield (i, f"user{i}@stockmaster.com", hashed_password, f"User {i}", role, True, now, now)
+
+
+def categories(config: SeedConfig, now: datetime) -> Iterator[tuple]:
+    """Category forest: a third of the categories are roots, the rest nest below."""
+    rng = _rng(config, "categories")
+    roots = max(1, config.categories // 3)
+    levels: list[list[int]] = [[]]
+    for i in range(1, config.categories + 1):
+        if i <= roots or config.category_depth <= 1:
+            parent_id = None
+            levels[0].append(i)
+        else:
+            depth = min(config.category_depth - 1, 1 + (i % (config.category_depth - 1)))
+            while len(levels) <= depth:
+                levels.append([])
+            candidates = levels[depth - 1] or levels[0]
+            parent_id = rng.choice(candidates)
+            levels[depth].append(i)
+        yield (i, f"Category {i}", None, parent_id, now, now)
+
+
+def suppliers(config: SeedConfig, now: datetime) -> Iterator[tuple]:
+    for i in range(1, config.suppliers + 1):
+        yield (i, f"Supplier {i}", f"Contact {i}", f"supplier{i}@example.com", None, None, None, True, now, now)
+
+
+def locations(config: SeedConfig, now: datetime) -> Iterator[tuple]:
+    for i in range(1, config.locations + 1):
+        location_type = LocationType.WAREHOUSE if i == 1 or i % 25 == 0 else LocationType.STORE
+        yield (i, f"Location {i}", location_type, f"Street {i}", None, True, now, now)
+
+
+def products(config: SeedConfig, now: datetime) -> Iterator[tuple]:
+    rng = _rng(config, "products")
+    category_ids = ZipfSampler(config.categories, config.zipf_exponent, _rng(config, "product-categories"))
+    supplier_ids = ZipfSampler(config.suppliers, config.zipf_exponent, _rng(config, "product-suppliers"))
+    for start in range(1, config.products + 1, BATCH_SIZE):
+        count = min(BATCH_SIZE, config.products + 1 - start)
+        batch_categories = category_ids.sample(count)
+        batch_suppliers = supplier_ids.sample(count)
+        for offset in range(count):
+            i = start + offset
+            cost = rng.randint(50, 50000)
+            yield (
+                i, f"SKU-{i:07d}", f"Product {i:07d}", None,
+                Decimal(cost * rng.randint(110, 180) // 100) / 100, Decimal(cost) / 100,
+                str(BARCODE_BASE + i), "pcs", None, True,
+                batch_categories[offset], batch_suppliers[offset], now, now,
+            )
+
+
+def inventory(config: SeedConfig, popularity: dict[int, float], now: datetime) -> Iterator[tuple]:
+    """Popular products are stocked in more locations than long-tail ones."""
+    rng = _rng(config, "inventory")
+    location_ids = list(range(1, config.locations + 1))
+    inventory_id = 0
+    for product_id in range(1, config.products + 1):
+        share = config.stock_density * popularity[product_id]
+        stocked = max(1, min(config.locations, round(config.locations * share)))
+        for location_id in sorted(rng.sample(location_ids, stocked)):
+            inventory_id += 1
+            reorder_level = rng.choice((5, 10, 20))
+            yield (
+                inventory_id, product_id, location_id,
+                max(0, int(rng.gauss(reorder_level * 4, reorder_level * 3))),
+                reorder_level, reorder_level * 5, now,
+            )
+
+
+def transactions(config: SeedConfig, product_sampler: ZipfSampler, now: datetime) -> Iterator[tuple]:
+    """Ledger rows, with volume growing linearly towards the present."""
+    rng = _rng(config, "transactions")
+    location_sampler = ZipfSampler(config.locations, config.zipf_exponent, _rng(config, "transaction-locations"))
+    types = [t for t, _ in TRANSACTION_MIX]
+    type_weights = list(itertools.accumulate(w for _, w in TRANSACTION_MIX))
+    span = config.days * 86400
+    for start in range(1, config.transactions + 1, COPY_BATCH_SIZE):
+        count = min(COPY_BATCH_SIZE, config.transactions + 1 - start)
+        batch_products = product_sampler.sample(count)
+        batch_locations = location_sampler.sample(count)
+        batch_types = rng.choices(types, cum_weights=type_weights, k=count)
+        for offset in range(count):
+            transaction_type = batch_types[offset]
+            location_id = batch_locations[offset]
+            destination = None
+            if transaction_type == TransactionType.TRANSFER and config.locations > 1:
+                destination = location_id % config.locations + 1
+            # sqrt of a uniform variate skews timestamps towards the present
+            age = span * (1.0 - rng.random() ** 0.5)
+            yield (
+                start + offset, batch_products[offset], location_id, rng.randint(1, config.users),
+                transaction_type, rng.randint(1, 24), f"DOC-{start + offset}", None,
+                destination, now - timedelta(seconds=age),
+            )
+
+
+def _copy_value(value):
+    if isinstance(value, Enum):
+        return value.name  # SQLAlchemy stores enum names
+    return value
+
+
+async def _write_rows(conn, table: Table, columns: tuple[str, ...], rows: Iterable[tuple]) -> int:
+    """Write rows with COPY on PostgreSQL, batched executemany elsewhere."""
+    written = 0
+    if conn.dialect.name == "postgresql":
+        raw = await conn.get_raw_connection()
+        driver = raw.driver_connection
+        for batch in _batched(rows, COPY_BATCH_SIZE):
+            await driver.copy_records_to_table(
+                table.name,
+                records=[tuple(_copy_value(v) for v in row) for row in batch],
+                columns=list(columns),
+            )
+            written += len(batch)
+        return written
+
+    statement = insert(table)
+    for batch in _batched(rows, BATCH_SIZE):
+        await conn.execute(statement, [dict(zip(columns, row)) for row in batch])
+        written += len(batch)
+    return written
+
+
+def _batched(rows: Iterable[tuple], size: int) -> Iterator[list[tuple]]:
+    iterator = iter(rows)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+async def reset_sequences(conn, tables: tuple[str, ...]) -> None:
+    """Move PostgreSQL id sequences past explicitly inserted ids."""
+    if conn.dialect.name != "postgresql":
+        return
+    for table in tables:
+        await conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {table}), 1))"
+        ))
+
+
+async def seed_database(
+    engine: AsyncEngine,
+    config: SeedConfig,
+    hashed_password: str,
+    verbose: bool = False,
+) -> int:
+    """Populate an empty database and return the id of the benchmark admin user."""
+    now = datetime.fromisoformat(config.anchor) if config.anchor else datetime.utcnow()
+    product_sampler = ZipfSampler(config.products, config.zipf_exponent, _rng(config, "popularity"))
+    popularity = product_sampler.popularity()
+
+    plan = (
+        (User, USER_COLUMNS, users(config, hashed_password, now)),
+        (Category, CATEGORY_COLUMNS, categories(config, now)),
+        (Supplier, SUPPLIER_COLUMNS, suppliers(config, now)),
+        (Location, LOCATION_COLUMNS, locations(config, now)),
+        (Product, PRODUCT_COLUMNS, products(config, now)),
+        (Inventory, INVENTORY_COLUMNS, inventory(config, popularity, now)),
+        (Transaction, TRANSACTION_COLUMNS, transactions(config, product_sampler, now)),
+    )
+    async with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            await conn.execute(text("SET LOCAL synchronous_commit = off"))
+        for model, columns, rows in plan:
+            table = model.__table__
+            start = time.perf_counter()
+            written = await _write_rows(conn, table, columns, rows)
+            if verbose:
+                elapsed = time.perf_counter() - start
+                print(f"{table.name:14} {written:>12,} rows  {elapsed:8.1f}s  "
+                      f"{written / max(elapsed, 1e-9):>12,.0f} rows/s")
+        await reset_sequences(
+            conn, ("users", "categories", "suppliers", "locations", "products", "inventory", "transactions")
+        )
+    return 1
+
+
+def parse_args(argv=None) -> tuple[SeedConfig, str, bool]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--no-create", action="store_true", help="Do not create or migrate the schema first")
+    for f in fields(SeedConfig):
+        parser.add_argument(f"--{f.name.replace('_', '-')}", type=type(f.default), default=f.default)
+    args = parser.parse_args(argv)
+    config = SeedConfig(**{f.name: getattr(args, f.name) for f in fields(SeedConfig)})
+    return config, args.database_url, not args.no_create
+
+
+async def _main(config: SeedConfig, database_url: str, create: bool) -> None:
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from app.core.database import engine_options
+    from app.core.migrations import upgrade_schema
+    from app.core.security import get_password_hash
+
+    engine = create_async_engine(database_url, **engine_options(database_url))
+    if create:
+        async with engine.connect() as conn:
+            await conn.run_sync(upgrade_schema)
+    start = time.perf_counter()
+    await seed_database(engine, config, get_password_hash("benchmark"), verbose=True)
+    print(f"done in {time.perf_counter() - start:.1f}s")
+    await engine.dispose()
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    config, database_url, create = parse_args(argv)
+    asyncio.run(_main(config, database_url, create))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Shared fixtures: the application on a throwaway SQLite database.
+
+Settings are read when ``app.main`` is first imported, so the environment is
+set up here before anything from ``app`` is imported. The database is a
+temporary file rather than ``:memory:``: an in-memory aiosqlite database is a
+single shared connection, where one session closing rolls back the others.
+"""
+import os
+import shutil
+import tempfile
+
+import pytest
+
+_tmp = tempfile.mkdtemp(prefix="stockmaster-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite+aiosqlite:///{os.path.join(_tmp, 'test.db')}",
+    "SNAPSHOT_DIR": os.path.join(_tmp, "snapshots"),
+    "JOB_RESULTS_DIR": os.path.join(_tmp, "job_results"),
+    "SLOW_QUERY_LOG_FILE": "",
+    "TRACING_ENABLED": "false",
+    "ADMISSION_ENABLED": "false",
+    "CACHE_ENABLED": "false",
+})
+
+import httpx  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+API = settings.API_PREFIX
+ADMIN = {"email": "admin@example.com", "password": "password1", "full_name": "Ad Min", "role": "admin"}
+
+# Seeded catalog: enough rows that a per-row query shows up as a repeat
+PRODUCTS = 25
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+async def client():
+    """Client for the running application, with its lifespan started."""
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            yield client
+    shutil.rmtree(_tmp, ignore_errors=True)
+
+
+async def login(client: httpx.AsyncClient, user: dict) -> dict[str, str]:
+    """Register the user when needed and return its authorization header."""
+    await client.post(f"{API}/auth/register", json=user)
+    response = await client.post(f"{API}/auth/login", json={"email": user["email"], "password": user["password"]})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture(scope="session")
+async def auth(client) -> dict[str, str]:
+    """Authorization header of an admin user."""
+    return await login(client, ADMIN)
+
+
+@pytest.fixture(scope="session")
+async def catalog(client, auth) -> dict[str, list[int]]:
+    """A category, a supplier, two locations, products with stock and some movements."""
+    ids: dict[str, list[int]] = {"categories": [], "suppliers": [], "locations": [], "products": []}
+    for path, name in (("categories", "Tools"), ("suppliers", "Acme"), ("locations", "Main"), ("locations", "Annex")):
+        response = await client.post(f"{API}/{path}", json={"name": name}, headers=auth)
+        assert response.status_code == 201, response.text
+        ids[path].append(response.json()["id"])
+    for i in range(PRODUCTS):
+        response = await client.post(f"{API}/products", json={
+            "sku": f"SKU-{i:03d}",
+            "name": f"Product {i}",
+            "barcode": f"400000000{i:04d}",
+            "category_id": ids["categories"][0],
+            "supplier_id": ids["suppliers"][0],
+            "unit_price": "2.50",
+            "initial_stock": i,
+        }, headers=auth)
+        assert response.status_code == 201, response.text
+        ids["products"].append(response.json()["id"])
+    for product_id in ids["products"][:10]:
+        response = await client.post(f"{API}/transactions", json={
+            "product_id": product_id, "type": "stock_in", "quantity": 5,
+        }, headers=auth)
+        assert response.status_code == 201, response.text
+    return ids
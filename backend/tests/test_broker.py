@@ -0,0 +1,32 @@
+"""Live stock streams resuming from a Last-Event-ID."""
+import pytest
+
+from app.core.broker import RESYNC, StockBroker
+
+
+pytestmark = pytest.mark.anyio
+
+
+def queued(subscription) -> list:
+    events = []
+    while not subscription.queue.empty():
+        events.append(subscription.queue.get_nowait())
+    return events
+
+
+async def test_resume_replays_missed_events():
+    broker = StockBroker(queue_size=10, replay_size=10)
+    broker.publish("stock", {"location_id": 1})
+    seen = broker.event_id(broker._recent[-1])
+    broker.publish("stock", {"location_id": 2})
+
+    assert [event.data for event in queued(broker.subscribe(last_event_id=seen))] == [{"location_id": 2}]
+
+
+@pytest.mark.parametrize("last_event_id", ["1", "0badcafe-1", "garbage"])
+async def test_ids_from_elsewhere_resync(last_event_id):
+    broker = StockBroker(queue_size=10, replay_size=10)
+    broker.publish("stock", {"location_id": 1})
+    broker.publish("stock", {"location_id": 2})
+
+    assert queued(broker.subscribe(last_event_id=last_event_id)) == [RESYNC]
@@ -0,0 +1,57 @@
+"""Requests whose client disconnects: reads are cancelled, writes run to their end."""
+import asyncio
+import json
+
+import pytest
+
+from app.core.events import invalidation_bus
+from app.main import app
+from tests.conftest import API
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def call(method: str, path: str, headers: dict[str, str], body: bytes, disconnect: asyncio.Event) -> list[dict]:
+    """Run a request through the application; the client disconnects once ``disconnect`` is set."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": b"", "client": ("127.0.0.1", 50000), "server": ("test", 80),
+        "headers": [(b"host", b"test"), (b"content-type", b"application/json")]
+        + [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+    }
+    requests = [{"type": "http.request", "body": body, "more_body": False}]
+    sent: list[dict] = []
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    return sent
+
+
+async def test_disconnect_during_write_still_delivers(client, auth, catalog, monkeypatch):
+    disconnect = asyncio.Event()
+    delivered: list[tuple[str, ...]] = []
+
+    async def hold(tags: tuple[str, ...], local: bool) -> None:
+        # Committed, delivering: the client goes away now
+        disconnect.set()
+        await asyncio.sleep(0.05)
+
+    async def record(tags: tuple[str, ...], local: bool) -> None:
+        delivered.append(tags)
+
+    monkeypatch.setattr(invalidation_bus, "_subscribers", [hold, *invalidation_bus._subscribers, record])
+    body = json.dumps({"product_id": catalog["products"][3], "type": "stock_in", "quantity": 2}).encode()
+    sent = await call("POST", f"{API}/transactions", auth, body, disconnect)
+
+    assert sent[0]["status"] == 201
+    assert any("inventory" in tags for tags in delivered)
@@ -0,0 +1,39 @@
+"""Polled collections answer 304 until the data behind them changes."""
+import pytest
+
+from tests.conftest import API
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_etag_follows_writes(client, auth, catalog):
+    first = await client.get(f"{API}/products", headers=auth)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    conditional = {**auth, "If-None-Match": etag}
+
+    response = await client.get(f"{API}/products", headers=conditional)
+    assert response.status_code == 304
+
+    # A stock movement changes the embedded stock levels
+    response = await client.post(f"{API}/transactions", json={
+        "product_id": catalog["products"][0], "type": "stock_in", "quantity": 1,
+    }, headers=auth)
+    assert response.status_code == 201, response.text
+    response = await client.get(f"{API}/products", headers=conditional)
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+async def test_etag_changes_on_delete(client, auth):
+    response = await client.post(f"{API}/categories", json={"name": "Short lived"}, headers=auth)
+    assert response.status_code == 201, response.text
+    category_id = response.json()["id"]
+    etag = (await client.get(f"{API}/categories/all", headers=auth)).headers["ETag"]
+
+    response = await client.delete(f"{API}/categories/{category_id}", headers=auth)
+    assert response.status_code == 204, response.text
+    response = await client.get(f"{API}/categories/all", headers={**auth, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
@@ -0,0 +1,105 @@
+"""Change announcements: entity versions commit with the change, collection versions right after."""
+import asyncio
+
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.exc import IntegrityError
+
+from app.core.database import async_session_maker, engine
+from app.core.events import invalidation_bus
+from app.models.entity_version import EntityVersion
+from app.models.supplier import Supplier
+from tests.conftest import API
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def tag_version(tag: str) -> int:
+    async with async_session_maker() as db:
+        version = await db.scalar(select(EntityVersion.version).where(EntityVersion.tag == tag))
+    return version or 0
+
+
+@pytest.fixture
+def delivered(monkeypatch) -> list[tuple[str, ...]]:
+    """Tags delivered to subscribers while the test runs."""
+    tags: list[tuple[str, ...]] = []
+
+    async def record(changed: tuple[str, ...], local: bool) -> None:
+        tags.append(changed)
+
+    monkeypatch.setattr(invalidation_bus, "_subscribers", [*invalidation_bus._subscribers, record])
+    return tags
+
+
+async def test_write_bumps_versions_and_delivers(client, auth, delivered):
+    before = await tag_version("suppliers")
+    response = await client.post(f"{API}/suppliers", json={"name": "Versioned"}, headers=auth)
+    assert response.status_code == 201, response.text
+
+    assert await tag_version("suppliers") > before
+    assert ("suppliers",) in delivered
+
+
+async def test_rolled_back_write_announces_nothing(client, delivered):
+    before = await tag_version("suppliers")
+    async with async_session_maker() as db:
+        # The versions are stamped, then the flush at commit violates NOT NULL
+        db.add(Supplier(name=None))
+        with pytest.raises(IntegrityError):
+            await invalidation_bus.commit(db, "suppliers")
+        await db.rollback()
+
+    assert await tag_version("suppliers") == before
+    assert delivered == []
+
+
+@pytest.fixture
+def transactions() -> list[list[tuple[str, tuple]]]:
+    """Statements of every transaction committed on the primary while the test runs."""
+    committed: list[list[tuple[str, tuple]]] = []
+    open_transactions: dict[int, list[tuple[str, tuple]]] = {}
+
+    def execute(conn, cursor, statement, parameters, context, executemany):
+        open_transactions.setdefault(id(conn), []).append((statement, tuple(parameters or ())))
+
+    def commit(conn):
+        committed.append(open_transactions.pop(id(conn), []))
+
+    def rollback(conn):
+        open_transactions.pop(id(conn), None)
+
+    listeners = (("before_cursor_execute", execute), ("commit", commit), ("rollback", rollback))
+    for name, listener in listeners:
+        event.listen(engine.sync_engine, name, listener)
+    yield committed
+    for name, listener in listeners:
+        event.remove(engine.sync_engine, name, listener)
+
+
+def stamped(statements: list[tuple[str, tuple]]) -> set[str]:
+    return {
+        parameter for statement, parameters in statements if "entity_versions" in statement
+        for parameter in parameters if isinstance(parameter, str)
+    }
+
+
+async def test_postings_to_different_locations_lock_no_shared_row(client, auth, catalog, transactions):
+    main, annex = catalog["locations"]
+    postings = await asyncio.gather(*(
+        client.post(f"{API}/transactions", json={
+            "product_id": product_id, "location_id": location_id, "type": "stock_in", "quantity": 1,
+        }, headers=auth)
+        for product_id, location_id in zip(catalog["products"][20:22], (main, annex))
+    ))
+    assert [response.status_code for response in postings] == [201, 201]
+
+    writes = [statements for statements in transactions if any("INSERT INTO transactions" in s for s, _ in statements)]
+    assert sorted(sorted(stamped(statements)) for statements in writes) == sorted(
+        [[f"inventory:location:{main}"], [f"inventory:location:{annex}"]]
+    )
+    # The shared collection tag is stamped in transactions of its own, after the postings commit
+    collection = [statements for statements in transactions if "inventory" in stamped(statements)]
+    assert len(collection) == 2
+    assert all(stamped(statements) == {"inventory"} and len(statements) == 1 for statements in collection)
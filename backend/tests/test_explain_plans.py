@@ -0,0 +1,92 @@
+"""The list and report queries are planned on their indexes.
+
+A database migrated from scratch is seeded and analyzed, then the planner is
+asked for each hot query of the routes: the ledger by product, location and
+type newest first, inventory lists, low-stock alerts, products by category
+and supplier, and the job dispatcher's lookup. A query passes when its plan
+uses the expected index and, for ordered lists, reads rows in index order
+instead of sorting them.
+"""
+from typing import NamedTuple
+
+import pytest
+from sqlalchemy import Select, func, select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.api.routes.inventory import INVENTORY_PROJECTION
+from app.api.routes.products import PRODUCT_PROJECTION
+from app.api.routes.transactions import TRANSACTION_PROJECTION
+from app.core.migrations import upgrade_schema
+from app.models import Inventory, Job, JobStatus, Product, Transaction, TransactionType
+from benchmarks.seed import SeedConfig, seed_database
+
+
+pytestmark = pytest.mark.anyio
+
+PAGE = 20
+
+
+class Case(NamedTuple):
+    query: Select
+    index: str
+    ordered: bool = True  # ORDER BY must be served by the index
+
+
+transactions = TRANSACTION_PROJECTION.select().order_by(Transaction.created_at.desc()).limit(PAGE)
+inventory = INVENTORY_PROJECTION.select().order_by(Inventory.last_updated.desc()).limit(PAGE)
+products = PRODUCT_PROJECTION.select().order_by(Product.name).limit(PAGE)
+
+CASES = {
+    "transactions": Case(transactions, "ix_transactions_created_at"),
+    "transactions by product": Case(
+        transactions.where(Transaction.product_id == 1), "ix_transactions_product_created"
+    ),
+    "transactions by location": Case(
+        transactions.where(Transaction.location_id == 1), "ix_transactions_location_created"
+    ),
+    "transactions by type": Case(
+        transactions.where(Transaction.type == TransactionType.STOCK_IN), "ix_transactions_type_created"
+    ),
+    "transaction count by product": Case(
+        select(func.count(Transaction.id)).where(Transaction.product_id == 1),
+        "ix_transactions_product_created", ordered=False,
+    ),
+    "inventory": Case(inventory, "ix_inventory_last_updated"),
+    "inventory by location": Case(inventory.where(Inventory.location_id == 1), "ix_inventory_location_updated"),
+    "low-stock alerts": Case(
+        select(Inventory).where(Inventory.quantity <= Inventory.reorder_level).order_by(Inventory.quantity),
+        "ix_inventory_low_stock",
+    ),
+    "products by category": Case(products.where(Product.category_id == 1), "ix_products_category_name"),
+    "products by supplier": Case(products.where(Product.supplier_id == 1), "ix_products_supplier_name"),
+    "queued jobs": Case(
+        select(Job.id, Job.params)
+        .where(Job.type == "products_export", Job.status == JobStatus.QUEUED)
+        .order_by(Job.id).limit(4),
+        "ix_jobs_status_type", ordered=False,
+    ),
+}
+
+
+@pytest.fixture(scope="module")
+async def planner(tmp_path_factory):
+    """A connection to a migrated, seeded and analyzed database of its own."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}")
+    async with engine.connect() as conn:
+        await conn.run_sync(upgrade_schema)
+    await seed_database(engine, SeedConfig(products=2000, transactions=40000), "x")
+    async with engine.connect() as conn:
+        await conn.execute(text("ANALYZE"))
+        yield conn
+    await engine.dispose()
+
+
+@pytest.mark.parametrize("name", CASES)
+async def test_query_uses_its_index(planner, name):
+    case = CASES[name]
+    sql = str(case.query.compile(planner.engine.sync_engine, compile_kwargs={"literal_binds": True}))
+    plan = [row[-1] for row in await planner.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+
+    assert any(case.index in line for line in plan), plan
+    if case.ordered:
+        assert not any("TEMP B-TREE FOR ORDER BY" in line for line in plan), plan
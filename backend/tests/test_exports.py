@@ -0,0 +1,15 @@
+"""Export format negotiation."""
+import pytest
+
+from tests.conftest import API
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize("accept", [None, "*/*", "text/csv", "application/json", "text/html,application/xhtml+xml;q=0.9"])
+async def test_export_falls_back_to_csv(client, auth, catalog, accept):
+    headers = {**auth, "Accept": accept} if accept else auth
+    response = await client.get(f"{API}/products/export/csv", headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("text/csv")
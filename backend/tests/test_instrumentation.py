@@ -0,0 +1,23 @@
+"""Route labels on request metrics."""
+import httpx
+import pytest
+
+from app.core.metrics import registry
+from app.main import app
+from tests.conftest import API
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_route_label_is_the_mounted_template(client, auth, catalog):
+    product_id = catalog["products"][0]
+    # Behind a proxy the request path carries the root path as well
+    transport = httpx.ASGITransport(app=app, root_path="/edge")
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as proxied:
+        response = await proxied.get(f"/edge{API}/products/{product_id}", headers=auth)
+    assert response.status_code == 200, response.text
+
+    metrics = registry.render()
+    assert f'route="{API}/products/{{product_id}}"' in metrics
+    assert 'route="/edge' not in metrics
@@ -0,0 +1,70 @@
+"""Background job dispatching and results.
+
+Stale jobs are retried a bounded number of times, and a result written on
+another host is not reported as expired.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app.core.database import async_session_maker
+from app.core.jobs import job_engine
+from app.models.job import Job, JobStatus
+from app.models.user import User
+from tests.conftest import ADMIN, API
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_stale_jobs_fail_after_their_last_attempt(client):
+    # Of a type no worker runs, so a requeued job stays queued
+    stale = datetime.utcnow() - job_engine.stale_seconds - timedelta(seconds=1)
+    async with async_session_maker() as db:
+        retried = Job(type="unregistered", status=JobStatus.RUNNING, heartbeat_at=stale, attempts=1)
+        exhausted = Job(type="unregistered", status=JobStatus.RUNNING, heartbeat_at=stale, attempts=job_engine.max_attempts)
+        db.add_all([retried, exhausted])
+        await db.commit()
+
+        await job_engine._dispatch()
+
+        await db.refresh(retried)
+        await db.refresh(exhausted)
+    assert (retried.status, retried.attempts, retried.heartbeat_at) == (JobStatus.QUEUED, 1, None)
+    assert exhausted.status == JobStatus.FAILED
+    assert exhausted.finished_at is not None
+    assert "attempt" in exhausted.error
+
+
+async def test_claim_counts_an_attempt(client, auth):
+    before = datetime.utcnow()
+    async with async_session_maker() as db:
+        job = await job_engine.submit(db, "products_export", {"format": "csv"}, None)
+        await job_engine._dispatch()
+        await db.refresh(job)
+    assert job.attempts == 1
+    assert job.started_at >= before
+
+
+@pytest.mark.parametrize(("node", "status_code"), [
+    # Written here and since removed
+    (None, 410),
+    # Written on a host whose results directory this one does not see
+    ("other-host", 503),
+])
+async def test_missing_result_by_where_it_was_written(client, auth, node, status_code):
+    async with async_session_maker() as db:
+        user_id = await db.scalar(select(User.id).where(User.email == ADMIN["email"]))
+        job = Job(
+            type="products_export",
+            status=JobStatus.SUCCEEDED,
+            user_id=user_id,
+            result_file="job-missing.csv",
+            result_node=node or job_engine.node,
+        )
+        db.add(job)
+        await db.commit()
+
+    response = await client.get(f"{API}/jobs/{job.id}/result", headers=auth)
+    assert response.status_code == status_code, response.text
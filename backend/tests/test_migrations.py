@@ -0,0 +1,18 @@
+"""Schema migrations and the startup check used when they are a deploy step."""
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.migrations import check_schema, upgrade_schema
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_check_schema_requires_the_latest_revision(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'schema.db'}")
+    async with engine.connect() as conn:
+        with pytest.raises(RuntimeError, match="python -m app.core.migrations"):
+            await conn.run_sync(check_schema)
+        await conn.run_sync(upgrade_schema)
+        await conn.run_sync(check_schema)
+    await engine.dispose()
@@ -0,0 +1,38 @@
+"""Statement budgets for the list and export endpoints.
+
+Each endpoint is requested once to warm the token and reference data caches,
+then again under its budget. No statement shape may repeat, so a query per
+row fails here long before it shows up in production.
+"""
+import pytest
+
+from app.core.querytrack import query_budget
+from tests.conftest import API
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize(("path", "budget"), [
+    # User, collection validators, count, page
+    ("/products", 4),
+    ("/products?search=Product&size=100", 4),
+    ("/products?fields=id,sku,name", 4),
+    # User, collection validators, locations with their stock
+    ("/locations", 3),
+    # User, count, page
+    ("/transactions", 3),
+    ("/inventory", 3),
+    # User, alerts, their products
+    ("/inventory/low-stock", 3),
+    # User, rows
+    ("/products/export/csv", 2),
+    ("/transactions/export/csv", 2),
+])
+async def test_query_budget(client, auth, catalog, path, budget):
+    response = await client.get(f"{API}{path}", headers=auth)
+    assert response.status_code == 200, response.text
+
+    with query_budget(budget, repeat_threshold=1):
+        response = await client.get(f"{API}{path}", headers=auth)
+    assert response.status_code == 200, response.text
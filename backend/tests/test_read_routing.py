@@ -0,0 +1,119 @@
+"""Reads go to the replica, except for clients that just wrote."""
+import asyncio
+import sqlite3
+
+import pytest
+from fastapi import Request
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core import database
+from app.core.cache import MemoryBackend, response_cache
+from app.core.coalesce import coalesced
+from app.core.config import settings
+from tests.conftest import API, login
+
+
+pytestmark = pytest.mark.anyio
+
+READER = {"email": "reader@example.com", "password": "password1", "full_name": "Rea Der", "role": "staff"}
+
+
+@pytest.fixture
+async def reader(client) -> dict[str, str]:
+    """Authorization header of a user who only reads."""
+    return await login(client, READER)
+
+
+@pytest.fixture
+async def replica(client, auth, reader, monkeypatch):
+    """Route reads to a copy of the primary that stops following it.
+
+    The copy has a category the primary lacks, so a response shows which
+    database served it.
+    """
+    primary_path = make_url(settings.DATABASE_URL).database
+    replica_path = f"{primary_path}.replica"
+    with sqlite3.connect(primary_path) as source, sqlite3.connect(replica_path) as target:
+        source.backup(target)
+        target.execute(
+            "INSERT INTO categories (name, created_at, updated_at) VALUES ('Replica only', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"
+        )
+    replica_engine = create_async_engine(f"sqlite+aiosqlite:///{replica_path}")
+    monkeypatch.setattr(database, "read_engine", replica_engine)
+    monkeypatch.setattr(database, "async_read_session_maker", async_sessionmaker(
+        replica_engine, class_=AsyncSession, expire_on_commit=False, autoflush=False,
+    ))
+    # Earlier tests wrote as the admin; start with no client pinned
+    monkeypatch.setattr(database, "primary_pins", database.PrimaryPins(settings.DB_PRIMARY_PIN_SECONDS))
+    yield
+    await replica_engine.dispose()
+
+
+async def category_names(client, headers) -> set[str]:
+    response = await client.get(f"{API}/categories/all", headers=headers)
+    assert response.status_code == 200, response.text
+    return {item["name"] for item in response.json()["items"]}
+
+
+async def test_reads_use_replica_until_client_writes(client, auth, reader, replica):
+    assert "Replica only" in await category_names(client, auth)
+    assert "Replica only" in await category_names(client, reader)
+
+    response = await client.post(f"{API}/categories", json={"name": "Written"}, headers=auth)
+    assert response.status_code == 201, response.text
+
+    # The writer reads its own write from the primary, user lookup included
+    names = await category_names(client, auth)
+    assert "Written" in names and "Replica only" not in names
+    # Other clients keep reading from the replica
+    names = await category_names(client, reader)
+    assert "Replica only" in names and "Written" not in names
+
+
+async def test_replica_reads_do_not_fill_the_cache(client, auth, reader, replica, monkeypatch):
+    monkeypatch.setattr(response_cache, "enabled", True)
+    monkeypatch.setattr(response_cache, "backend", MemoryBackend(100))
+
+    response = await client.post(f"{API}/categories", json={"name": "Cached"}, headers=auth)
+    assert response.status_code == 201, response.text
+    # A replica that has not caught up answers the reader after the versions moved
+    assert "Cached" not in await category_names(client, reader)
+
+    # The writer is not served what the replica returned
+    names = await category_names(client, auth)
+    assert "Cached" in names and "Replica only" not in names
+
+
+async def test_pins_are_keyed_on_the_user(client, auth, reader, replica):
+    response = await client.post(f"{API}/categories", json={"name": "Pinned user"}, headers=auth)
+    assert response.status_code == 201, response.text
+    assert not any(auth["Authorization"] in key for key in database.primary_pins._until)
+
+    # The same token sent with the scheme spelled differently is still the writer
+    same_user = {"Authorization": auth["Authorization"].replace("Bearer", "bearer", 1)}
+    names = await category_names(client, same_user)
+    assert "Pinned user" in names and "Replica only" not in names
+
+
+async def test_replica_reads_are_not_shared_with_pinned_clients(replica):
+    request = Request({
+        "type": "http", "method": "GET", "path": f"{API}/inventory/low-stock", "query_string": b"", "headers": [],
+    })
+    release = asyncio.Event()
+
+    def loader(source: str):
+        async def load():
+            await release.wait()
+            return source
+        return load
+
+    async with database.async_read_session_maker() as replica_db, database.async_session_maker() as primary_db:
+        calls = [
+            asyncio.create_task(coalesced(request, None, db, loader(source)))
+            for source, db in (("replica", replica_db), ("primary", primary_db))
+        ]
+        await asyncio.sleep(0)
+        release.set()
+        # Identical requests, but the pinned one runs its own read on the primary
+        assert await asyncio.gather(*calls) == ["replica", "primary"]
@@ -0,0 +1,76 @@
+"""Scanner sessions: authentication, and batches of scans with an ack each."""
+import json
+
+import pytest
+from sqlalchemy import select, text
+
+from app.api.routes import scanner
+from app.core.database import async_session_maker
+from app.main import app
+from app.models.user import User
+from tests.conftest import ADMIN, API
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def admin() -> User:
+    async with async_session_maker() as db:
+        return await db.scalar(select(User).where(User.email == ADMIN["email"]))
+
+
+async def test_database_error_fails_only_its_scan(client, auth, catalog, monkeypatch):
+    apply = scanner.apply_stock_transaction
+
+    async def apply_or_fail(db, data, user_id):
+        if data.quantity == 13:
+            await db.execute(text("SELECT * FROM no_such_table"))
+        return await apply(db, data, user_id)
+
+    monkeypatch.setattr(scanner, "apply_stock_transaction", apply_or_fail)
+    product_id = catalog["products"][0]
+    acks = await scanner._apply_scans([
+        {"seq": 1, "type": "stock_in", "product_id": product_id, "quantity": 1},
+        {"seq": 2, "type": "stock_in", "product_id": product_id, "quantity": 13},
+        {"seq": 3, "type": "stock_out", "product_id": product_id, "quantity": 1},
+    ], await admin())
+
+    assert [(ack["seq"], ack["status"]) for ack in acks] == [(1, "ok"), (2, "error"), (3, "ok")]
+    assert acks[1]["detail"] == "Scan could not be saved, resend"
+
+
+async def test_acks_report_the_level_after_each_scan(client, auth, catalog):
+    product_id = catalog["products"][0]
+    acks = await scanner._apply_scans([
+        {"seq": 1, "type": "stock_in", "product_id": product_id, "quantity": 3},
+        {"seq": 2, "type": "stock_out", "product_id": product_id, "quantity": 1},
+    ], await admin())
+
+    assert [ack["status"] for ack in acks] == ["ok", "ok"]
+    assert acks[1]["quantity"] == acks[0]["quantity"] - 1
+
+
+@pytest.mark.parametrize("token", [123, {}, ["x"]])
+async def test_token_must_be_a_string(client, token):
+    path = f"{API}/scanner/ws"
+    scope = {
+        "type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws", "path": path,
+        "raw_path": path.encode(), "root_path": "", "query_string": b"", "headers": [(b"host", b"test")],
+        "client": ("127.0.0.1", 50000), "server": ("test", 80), "subprotocols": [],
+    }
+    incoming = [
+        {"type": "websocket.connect"},
+        {"type": "websocket.receive", "text": json.dumps({"token": token})},
+    ]
+    sent: list[dict] = []
+
+    async def receive():
+        return incoming.pop(0) if incoming else {"type": "websocket.disconnect", "code": 1000}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+
+    assert [message["type"] for message in sent] == ["websocket.accept", "websocket.close"]
+    assert sent[1]["code"] == 1008
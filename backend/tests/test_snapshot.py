@@ -0,0 +1,54 @@
+"""Catalog snapshot diffs."""
+import asyncio
+import random
+from decimal import Decimal
+
+import pytest
+
+from app.core import snapshot
+from app.core.snapshot import SnapshotStore, apply_diff, encode_snapshot, make_diff
+
+
+def catalog(renamed: int = -1, repriced: int = -1) -> bytes:
+    products = [
+        (i, f"SKU-{i:05d}", f"Product {i}" + (" renamed" if i == renamed else ""), f"40{i:011d}", "pcs",
+         Decimal("9.99") if i == repriced else Decimal("1.50"), Decimal("1.00"), True)
+        for i in range(1, 2001)
+    ]
+    stock = [(i, 1, i % 50) for i in range(1, 2001)]
+    return encode_snapshot(1, products, stock, [(1, "Main")], built_at=0)
+
+
+@pytest.mark.parametrize("changes", [{}, {"repriced": 700}, {"renamed": 700}, {"renamed": 3, "repriced": 1999}])
+def test_diff_applies_and_stays_small(changes):
+    source, target = catalog(), catalog(**changes)
+    diff = make_diff(source, target, 1, 2)
+    assert apply_diff(source, diff) == target
+    # Offsets after a renamed product move, the records after it are copied
+    assert len(diff) < len(target) // 4
+
+
+def test_diff_finds_shifted_data():
+    rng = random.Random(1)
+    source = rng.randbytes(100_000)
+    target = source[:30_000] + b"inserted" + source[30_000:70_000] + source[70_007:]
+    diff = make_diff(source, target, 1, 2)
+    assert apply_diff(source, diff) == target
+    assert len(diff) < 2_000
+
+
+@pytest.mark.anyio
+async def test_concurrent_diff_requests_build_once(tmp_path, monkeypatch):
+    store = SnapshotStore(str(tmp_path), retain=10, rebuild_seconds=0)
+    store._write(store.path(1), catalog())
+    store._write(store.path(2), catalog(renamed=5))
+    builds = []
+
+    def counting_make_diff(*args):
+        builds.append(args[2:])
+        return make_diff(*args)
+
+    monkeypatch.setattr(snapshot, "make_diff", counting_make_diff)
+    paths = await asyncio.gather(*(store.diff(1, 2) for _ in range(5)))
+    assert len(set(paths)) == 1 and paths[0].exists()
+    assert builds == [(1, 2)]
@@ -0,0 +1,79 @@
+"""Delta-sync feed and change log compaction."""
+import pytest
+from sqlalchemy import func, select
+
+from app.core.changes import change_sequencer
+from app.core.database import async_session_maker
+from app.models.change_log import ChangeLog
+from tests.conftest import API
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def sync(client, auth, since: int) -> dict:
+    response = await client.get(f"{API}/sync", params={"since": since, "limit": 10000}, headers=auth)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def log_rows(entity: str, entity_id: int) -> int:
+    async with async_session_maker() as db:
+        return await db.scalar(
+            select(func.count()).select_from(ChangeLog)
+            .where(ChangeLog.entity == entity, ChangeLog.entity_id == entity_id)
+        )
+
+
+async def test_feed_follows_writes(client, auth, catalog):
+    full = await sync(client, auth, 0)
+    assert {item["id"] for item in full["products"]} >= set(catalog["products"])
+
+    product_id = catalog["products"][1]
+    response = await client.put(f"{API}/products/{product_id}", json={"name": "Synced"}, headers=auth)
+    assert response.status_code == 200, response.text
+
+    delta = await sync(client, auth, full["version"])
+    assert delta["version"] > full["version"]
+    assert [item["name"] for item in delta["products"] if item["id"] == product_id] == ["Synced"]
+    assert (await sync(client, auth, delta["version"]))["products"] == []
+
+
+async def test_compaction_keeps_latest_change(client, auth, catalog):
+    product_id = catalog["products"][2]
+    before = (await sync(client, auth, 0))["version"]
+    for name in ("First", "Second", "Third"):
+        response = await client.put(f"{API}/products/{product_id}", json={"name": name}, headers=auth)
+        assert response.status_code == 200, response.text
+    assert await log_rows("products", product_id) > 1
+
+    assert await change_sequencer.compact() > 0
+    assert await log_rows("products", product_id) == 1
+    # Clients behind the removed rows still get the entity, in its latest state
+    delta = await sync(client, auth, before)
+    assert [item["name"] for item in delta["products"] if item["id"] == product_id] == ["Third"]
+    full = await sync(client, auth, 0)
+    assert {item["id"] for item in full["products"]} >= set(catalog["products"])
+
+
+async def test_category_edit_is_expanded_outside_the_request(client, auth, catalog):
+    category_id = catalog["categories"][0]
+    product_id = catalog["products"][0]
+    before = (await sync(client, auth, 0))["version"]
+    await change_sequencer.stop()
+    try:
+        logged = await log_rows("products", product_id)
+        response = await client.put(f"{API}/categories/{category_id}", json={"name": "Hand tools"}, headers=auth)
+        assert response.status_code == 200, response.text
+        # The request logs the category once, not each of its products
+        assert await log_rows("category", category_id) == 1
+        assert await log_rows("products", product_id) == logged
+
+        assert await change_sequencer.expand() >= len(catalog["products"])
+        assert await log_rows("category", category_id) == 0
+    finally:
+        await change_sequencer.start()
+
+    delta = await sync(client, auth, before)
+    names = {item["id"]: item["category_name"] for item in delta["products"]}
+    assert {names[product_id] for product_id in catalog["products"]} == {"Hand tools"}